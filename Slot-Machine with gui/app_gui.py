@@ -1,12 +1,18 @@
 import random
 import time
 import os
+import sys
 import csv
 from datetime import datetime
 import tkinter as tk
 from tkinter import messagebox, simpledialog
 import threading
 
+# Shared session clock and event bus with the GSR recorder (repo root)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from event_bus import EventPublisher
+from session_clock import handshake, now, write_clock_file
+
 MAX_LINES = 3
 MIN_BET = 10
 ROWS = 3
@@ -68,7 +74,8 @@ class SessionLogger:
     def __init__(self, participant_id="", group_id=""):
         self.log = []
         self.path = get_session_log_path(participant_id)
-        self.start_time = time.time()
+        self.start_time = now()
+        self.clock_sync = None  # Offset to the GSR recorder's clock (handshake())
         self.previous_spin_time = None
         self.largest_win = 0
         self.largest_loss = 0
@@ -123,6 +130,7 @@ class SessionLogger:
                 "bet_escalation","loss_chasing","all_in","after_big_win","session_duration_sec"
             ])
             writer.writerows(self.log)
+        write_clock_file(self.path, handshake=self.clock_sync)
         print(f"Session log saved to {self.path}")
 
 
@@ -143,6 +151,7 @@ class SlotMachineGUI:
         self.prev_spin_time = None
         self.after_big_win = False
         self.logger = None
+        self.event_bus = EventPublisher()  # Spin outcomes to integrated_code.py
         self.game_started = False
         self.spinning = False
         
@@ -297,6 +306,9 @@ class SlotMachineGUI:
         
         # Initialize game
         self.logger = SessionLogger(participant_id=participant_id, group_id=group_id)
+        self.logger.clock_sync = handshake()
+        if self.logger.clock_sync is not None:
+            self.event_bus.offset_s = self.logger.clock_sync['offset_s']  # Controller times events
         self.balance = deposit
         self.initial_deposit = deposit
         self.prev_balance = deposit
@@ -306,6 +318,11 @@ class SlotMachineGUI:
         self.update_balance_display()
         self.spin_button.config(state=tk.NORMAL)
         self.status_label.config(text="Ready to play! Set your bet and spin!")
+        if self.logger.clock_sync is None:
+            print("Clock sync: no GSR recorder answered - spins use this clock only")
+        else:
+            print(f"Clock sync: offset {self.logger.clock_sync['offset_s'] * 1000:+.3f} ms, "
+                  f"round trip {self.logger.clock_sync['rtt_s'] * 1000:.3f} ms")
     
     def update_balance_display(self):
         self.balance_label.config(text=f"Balance: ${self.balance}")
@@ -360,8 +377,10 @@ class SlotMachineGUI:
     
     def perform_spin(self, bet, lines, total_bet):
         self.spin_count += 1
-        curr_time = time.time()
+        curr_time = now()
         time_since_last = curr_time - self.prev_spin_time if self.spin_count > 1 else None
+        self.event_bus.publish("spin", spin=self.spin_count, bet=bet, lines=lines,
+                               total_bet=total_bet, participant=self.logger.participant_id)
         
         # Animate spinning
         self.animate_spin()
@@ -372,6 +391,10 @@ class SlotMachineGUI:
         
         # Display result
         self.root.after(0, self.display_result, slots, winnings, winning_lines)
+        self.event_bus.publish("win" if winnings > 0 else "loss", spin=self.spin_count,
+                               bet=bet, lines=lines, total_bet=total_bet, winnings=winnings,
+                               balance=self.balance + winnings - total_bet,
+                               participant=self.logger.participant_id)
         
         # Update balance
         prev_prev_balance = self.prev_balance
@@ -485,7 +508,7 @@ class SlotMachineGUI:
     
     def quit_game(self):
         if self.logger:
-            session_end_time = time.time()
+            session_end_time = now()
             self.logger.log_quit(self.balance, self.spin_count, session_end_time)
             self.logger.save()
             messagebox.showinfo("Session Saved", 
@@ -493,6 +516,7 @@ class SlotMachineGUI:
                               f"Final Balance: ${self.balance}\n"
                               f"Total Spins: {self.spin_count}\n"
                               f"Log file: {self.logger.path}")
+        self.event_bus.close()
         self.root.quit()
 
 
@@ -0,0 +1,190 @@
+"""
+Exact Payout Tables for Any Reel Configuration
+
+PURPOSE:
+    Exact probability distribution of winnings per spin for 1..MAX_LINES
+    lines under the get_slot_machine_spin() rule (each column draws ROWS
+    symbols without replacement from its own full pool). Use it to design
+    conditions by changing symbol_count, symbol_value, ROWS, COLS or
+    MAX_LINES; every number is an exact Fraction and comes back in
+    milliseconds.
+
+METHOD:
+    - Draw positions within a column are exchangeable, so the probability
+      that given positions show given symbols depends only on the multiset
+      of those symbols. It is a falling-factorial product, memoized per
+      multiset (multiset_ways); all sums are exact integers over one
+      common denominator.
+    - Fix column 0's first L symbols t. Line r wins when every other column
+      agrees with t at row r. Columns are independent, so the winning set W
+      satisfies
+          P(W contains S) = P(one column matches t on S) ** (COLS - 1)
+      and P(W = S) follows by Moebius inversion over the 2^L masks.
+    - Permuting rows permutes W with them, so only one ordering of each
+      multiset t has to be evaluated (weighted by its number of orderings).
+    Work grows with C(symbols + L - 1, L) * 2^L and does not depend on COLS.
+
+USAGE:
+    python slot_exact.py                           # app_gui.py configuration
+    python slot_exact.py --counts A=1,B=3,C=6,D=10 --values A=20,B=6,C=3,D=1
+    python slot_exact.py --rows 5 --cols 5 --lines 5 --show-table
+    python slot_exact.py --compare 5000000         # check against slot_sim.py
+
+    from slot_exact import payout_table
+    table = payout_table()                 # one dict per line count
+    table[2]['distribution']               # {winnings per unit bet: Fraction}
+"""
+
+import argparse
+import time
+from collections import Counter, defaultdict
+from fractions import Fraction
+from functools import lru_cache
+from itertools import combinations_with_replacement
+from math import factorial, prod
+
+from app_gui import COLS, MAX_LINES, ROWS, symbol_count, symbol_value
+from slot_sim import parse_mapping
+
+
+@lru_cache(maxsize=None)
+def multiset_ways(counts, multiset):
+    """
+    Ordered ways for fixed positions of one column to hold the symbols of
+    multiset (sorted symbol codes), with counts[code] symbols in the pool.
+    Divided by falling(sum(counts), len(multiset)) it is a probability.
+    """
+    ways = 1
+    for code, n in Counter(multiset).items():
+        for i in range(n):
+            ways *= max(counts[code] - i, 0)
+    return ways
+
+
+def falling(n, k):
+    """n (n - 1) ... (n - k + 1)"""
+    return prod(range(n - k + 1, n + 1))
+
+
+def orderings(multiset):
+    """Distinct orderings of a multiset"""
+    return factorial(len(multiset)) // prod(factorial(n) for n in Counter(multiset).values())
+
+
+def winnings_distribution(counts, payouts, lines, cols):
+    """
+    Exact distribution of winnings per unit bet with lines lines.
+
+    Everything is kept as integers over the common denominator
+    falling(N, lines) ** cols (N = pool size) and turned into Fractions
+    at the end.
+
+    Returns: (distribution {winnings: Fraction}, hit probability)
+    """
+    total = sum(counts)
+    masks = range(1 << lines)
+    rows_of = [[r for r in range(lines) if mask >> r & 1] for mask in masks]
+    # P(one column matches on k given rows) = ways / falling(total, k); scale to falling(total, lines)
+    scale = [falling(total - k, lines - k) ** (cols - 1) for k in range(lines + 1)]
+    distribution = defaultdict(int)
+    hit = 0
+    for column0 in combinations_with_replacement(range(len(counts)), lines):
+        ways0 = multiset_ways(counts, column0)
+        if ways0 == 0:
+            continue
+        # P(W contains S), then P(W = S) by Moebius inversion over supersets
+        exact = [multiset_ways(counts, tuple(column0[r] for r in rows)) ** (cols - 1)
+                 * scale[len(rows)] for rows in rows_of]
+        for bit in range(lines):
+            for mask in masks:
+                if not mask >> bit & 1:
+                    exact[mask] -= exact[mask | 1 << bit]
+
+        weight = ways0 * orderings(column0)
+        hit += weight * (sum(exact) - exact[0])
+        for mask, p in enumerate(exact):
+            if p:
+                distribution[sum(payouts[column0[r]] for r in rows_of[mask])] += weight * p
+    denominator = falling(total, lines) ** cols
+    return ({w: Fraction(n, denominator) for w, n in sorted(distribution.items())},
+            Fraction(hit, denominator))
+
+
+def payout_table(counts=symbol_count, values=symbol_value, rows=ROWS, cols=COLS,
+                 max_lines=MAX_LINES):
+    """
+    Exact results for every line count 1..max_lines: list of dicts with
+    lines, distribution, rtp, hit_rate, variance, line_probability
+    (Fractions; winnings in units of the bet per line).
+    """
+    if max_lines > rows:
+        raise ValueError(f"max_lines ({max_lines}) cannot exceed rows ({rows})")
+    if rows > sum(counts.values()):
+        raise ValueError(f"{rows} rows need at least {rows} symbols per column")
+    missing = [s for s in counts if s not in values]
+    if missing:
+        raise ValueError(f"No payout value for symbols {missing}")
+    symbols = list(counts)
+    count_tuple = tuple(counts[s] for s in symbols)
+    payouts = [values[s] for s in symbols]
+
+    table = []
+    for lines in range(1, max_lines + 1):
+        distribution, hit = winnings_distribution(count_tuple, payouts, lines, cols)
+        mean = sum(w * p for w, p in distribution.items())
+        table.append({
+            'lines': lines,
+            'distribution': distribution,
+            'rtp': mean / lines,
+            'hit_rate': hit,
+            'variance': sum(w * w * p for w, p in distribution.items()) - mean * mean,
+            # One line wins when every column shows the same symbol in that row
+            'line_probability': Fraction(sum(n ** cols for n in count_tuple),
+                                         sum(count_tuple) ** cols),
+        })
+    return table
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exact slot-machine payout tables")
+    parser.add_argument('--counts', type=parse_mapping, default=symbol_count,
+                        help="Symbols per column pool, e.g. A=2,B=4,C=6,D=8")
+    parser.add_argument('--values', type=parse_mapping, default=symbol_value,
+                        help="Line payout multipliers, e.g. A=5,B=4,C=3,D=2")
+    parser.add_argument('--rows', type=int, default=ROWS)
+    parser.add_argument('--cols', type=int, default=COLS)
+    parser.add_argument('--lines', type=int, default=MAX_LINES, help="Largest line count")
+    parser.add_argument('--show-table', action='store_true',
+                        help="Print the full winnings distribution for each line count")
+    parser.add_argument('--compare', type=int, metavar='SPINS',
+                        help="Also run slot_sim.py with this many spins and compare")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    table = payout_table(args.counts, args.values, args.rows, args.cols, args.lines)
+    elapsed = time.perf_counter() - start
+
+    print(f"Pool {args.counts}, values {args.values}, {args.rows}x{args.cols} grid")
+    print(f"{'Lines':>5} {'RTP':>9} {'Hit rate':>9} {'Variance':>10}  RTP (exact)")
+    for r in table:
+        print(f"{r['lines']:>5} {float(r['rtp']) * 100:8.4f}% {float(r['hit_rate']) * 100:8.4f}% "
+              f"{float(r['variance']):10.4f}  {r['rtp']}")
+        if args.show_table:
+            for winnings, p in r['distribution'].items():
+                print(f"{'':>7}win {winnings:>4} x bet: {float(p):.6e}  ({p})")
+    print(f"\nSingle line wins with probability {table[0]['line_probability']} "
+          f"({float(table[0]['line_probability']) * 100:.4f}%); computed in {elapsed * 1000:.1f} ms")
+
+    if args.compare:
+        from slot_sim import simulate
+        print(f"\nMonte Carlo ({args.compare:,} spins):")
+        simulated = simulate(args.compare, args.counts, args.values, args.rows, args.cols,
+                             args.lines, workers=1)
+        for exact, sim in zip(table, simulated):
+            z = (sim['rtp'] - float(exact['rtp'])) / sim['rtp_se']
+            print(f"{exact['lines']:>5} RTP {sim['rtp'] * 100:8.4f}% ({z:+.2f} SE), "
+                  f"hit rate {sim['hit_rate'] * 100:8.4f}%, variance {sim['variance']:.4f}")
+
+
+if __name__ == "__main__":
+    main()
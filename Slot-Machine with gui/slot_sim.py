@@ -0,0 +1,217 @@
+"""
+Vectorized Monte Carlo Simulator for Slot-Machine Payout and Volatility
+
+PURPOSE:
+    get_slot_machine_spin() rebuilds the symbol list and calls list.remove()
+    for every cell of every spin, so estimating the return to player (RTP)
+    of a symbol_count / symbol_value configuration that way takes hours.
+    This simulator draws whole batches of grids as NumPy arrays with the
+    same rule - each column is ROWS symbols drawn without replacement from
+    the full symbol pool - and evaluates check_winnings() for every line
+    count on the whole batch at once:
+    - each column starts as the pool (uint8 symbol codes); a partial
+      Fisher-Yates shuffle of its first ROWS positions, vectorized over
+      the batch, gives the drawn symbols in draw order
+    - line r wins when every column shows the symbol of column 0 in row r;
+      with n lines the winnings are the cumulative sum over rows 0..n-1
+    Batches are sharded over processes, each with an independent stream
+    from numpy.random.SeedSequence.spawn(), so results are reproducible for
+    a given --seed whatever the number of workers.
+
+OUTPUT (per line count, winnings in units of the bet per line):
+    RTP          mean winnings / total bet (± standard error)
+    hit rate     share of spins with at least one winning line
+    variance     of winnings per spin (volatility)
+    P(line)      probability that a single line wins
+
+USAGE:
+    python slot_sim.py                          # app_gui.py configuration, 10M spins
+    python slot_sim.py --spins 50000000 --workers 4 --seed 7
+    python slot_sim.py --counts A=2,B=4,C=6,D=8 --values A=5,B=4,C=3,D=2
+    python slot_sim.py --check                  # compare with check_winnings()
+
+NOTE:
+    The ± column is one standard error; it shrinks as 1/sqrt(spins).
+    slot_exact.py computes the same quantities exactly.
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from app_gui import COLS, MAX_LINES, ROWS, check_winnings, symbol_count, symbol_value
+
+BATCH_SIZE = 200000  # Spins per array pass (~12 MB of uint8 pools at 3x20)
+SHARDS = 32          # Independent random streams; fixed so workers don't change results
+DEFAULT_SPINS = 10_000_000
+
+
+def symbol_codes(counts):
+    """Symbols in a fixed order and the pool of their codes"""
+    symbols = list(counts)
+    pool = np.repeat(np.arange(len(symbols), dtype=np.uint8), [counts[s] for s in symbols])
+    return symbols, pool
+
+
+def spin_batch(rng, n, pool, rows=ROWS, cols=COLS):
+    """
+    n grids as an (n, cols, rows) array of symbol codes; column c of spin i
+    is grids[i, c], like get_slot_machine_spin()[c].
+    """
+    size = len(pool)
+    if rows > size:
+        raise ValueError(f"{rows} rows need at least {rows} symbols per column, pool has {size}")
+    deck = np.broadcast_to(pool, (n, cols, size)).copy()
+    # Partial Fisher-Yates: position r receives a uniform pick of the rest
+    for r in range(rows):
+        pick = r + (rng.random((n, cols, 1)) * (size - r)).astype(np.intp)
+        picked = np.take_along_axis(deck, pick, axis=2)
+        np.put_along_axis(deck, pick, deck[:, :, r:r + 1], axis=2)
+        deck[:, :, r:r + 1] = picked
+    return deck[:, :, :rows]
+
+
+def batch_winnings(grids, payouts, max_lines=MAX_LINES):
+    """
+    Winnings per unit bet for 1..max_lines lines: (n, max_lines) array,
+    column n-1 being check_winnings(grid, n, 1, values)[0].
+    """
+    first = grids[:, 0, :max_lines]
+    line_wins = np.ones(first.shape, dtype=bool)                 # (n, max_lines)
+    for c in range(1, grids.shape[1]):
+        line_wins &= grids[:, c, :max_lines] == first
+    line_pay = payouts[first] * line_wins                        # Value of column 0's symbol
+    return np.cumsum(line_pay, axis=1), line_wins
+
+
+def simulate_shard(seed, spins, counts, values, rows=ROWS, cols=COLS,
+                   max_lines=MAX_LINES, batch_size=BATCH_SIZE):
+    """Sums over one shard: {'spins', 'sum', 'sum_sq', 'hits', 'line_wins'}"""
+    rng = np.random.default_rng(seed)
+    symbols, pool = symbol_codes(counts)
+    payouts = np.array([values[s] for s in symbols], dtype=np.int64)
+    totals = {'spins': 0, 'sum': np.zeros(max_lines), 'sum_sq': np.zeros(max_lines),
+              'hits': np.zeros(max_lines, np.int64), 'line_wins': np.zeros(max_lines, np.int64)}
+    remaining = spins
+    while remaining > 0:
+        n = min(batch_size, remaining)
+        winnings, line_wins = batch_winnings(spin_batch(rng, n, pool, rows, cols), payouts, max_lines)
+        totals['spins'] += n
+        totals['sum'] += winnings.sum(axis=0)
+        totals['sum_sq'] += (winnings.astype(np.float64) ** 2).sum(axis=0)
+        totals['hits'] += np.logical_or.accumulate(line_wins, axis=1).sum(axis=0)
+        totals['line_wins'] += line_wins.sum(axis=0)
+        remaining -= n
+    return totals
+
+
+def simulate(spins=DEFAULT_SPINS, counts=symbol_count, values=symbol_value, rows=ROWS,
+             cols=COLS, max_lines=MAX_LINES, seed=0, workers=1, shards=SHARDS):
+    """
+    Monte Carlo estimate for every line count 1..max_lines.
+
+    Returns: list of dicts (lines, rtp, rtp_se, hit_rate, variance,
+    line_probability), one per line count
+    """
+    if max_lines > rows:
+        raise ValueError(f"max_lines ({max_lines}) cannot exceed rows ({rows})")
+    shard_spins = [spins // shards + (i < spins % shards) for i in range(shards)]
+    seeds = np.random.SeedSequence(seed).spawn(shards)
+    args = [(s, n, dict(counts), dict(values), rows, cols, max_lines)
+            for s, n in zip(seeds, shard_spins) if n]
+
+    if workers <= 1:
+        parts = [simulate_shard(*a) for a in args]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(simulate_shard, *zip(*args)))
+
+    n = sum(p['spins'] for p in parts)
+    total = sum(p['sum'] for p in parts)
+    total_sq = sum(p['sum_sq'] for p in parts)
+    hits = sum(p['hits'] for p in parts)
+    line_wins = sum(p['line_wins'] for p in parts)
+
+    results = []
+    for i in range(max_lines):
+        lines = i + 1
+        mean = total[i] / n
+        variance = total_sq[i] / n - mean * mean
+        results.append({
+            'lines': lines,
+            'spins': n,
+            'rtp': mean / lines,
+            'rtp_se': np.sqrt(variance / n) / lines,
+            'hit_rate': hits[i] / n,
+            'variance': variance,
+            'line_probability': line_wins[i] / n,
+        })
+    return results
+
+
+def check(spins=20000, seed=0, counts=symbol_count, values=symbol_value, rows=ROWS, cols=COLS):
+    """Vectorized winnings must equal check_winnings() grid by grid"""
+    symbols, pool = symbol_codes(counts)
+    payouts = np.array([values[s] for s in symbols], dtype=np.int64)
+    grids = spin_batch(np.random.default_rng(seed), spins, pool, rows, cols)
+    winnings, _ = batch_winnings(grids, payouts, rows)
+    mismatches = 0
+    for grid, row in zip(grids.tolist(), winnings.tolist()):
+        columns = [[symbols[code] for code in column] for column in grid]
+        for lines in range(1, rows + 1):
+            if check_winnings(columns, lines, 1, values)[0] != row[lines - 1]:
+                mismatches += 1
+    return mismatches
+
+
+def parse_mapping(text):
+    """Parse "A=2,B=4" into {'A': 2, 'B': 4}"""
+    mapping = {}
+    for item in text.split(','):
+        symbol, value = item.split('=')
+        mapping[symbol.strip()] = int(value)
+    return mapping
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Monte Carlo RTP / volatility of the slot machine")
+    parser.add_argument('--spins', type=int, default=DEFAULT_SPINS)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="Worker processes (1 = serial, default: CPU count)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--counts', type=parse_mapping, default=symbol_count,
+                        help="Symbols per column pool, e.g. A=2,B=4,C=6,D=8")
+    parser.add_argument('--values', type=parse_mapping, default=symbol_value,
+                        help="Line payout multipliers, e.g. A=5,B=4,C=3,D=2")
+    parser.add_argument('--rows', type=int, default=ROWS)
+    parser.add_argument('--cols', type=int, default=COLS)
+    parser.add_argument('--lines', type=int, default=MAX_LINES, help="Largest line count")
+    parser.add_argument('--check', action='store_true',
+                        help="Compare vectorized winnings with check_winnings()")
+    args = parser.parse_args()
+
+    if args.check:
+        mismatches = check(counts=args.counts, values=args.values, rows=args.rows, cols=args.cols)
+        print(f"check_winnings comparison: {mismatches} mismatches")
+        return
+
+    print(f"Pool {args.counts}, values {args.values}, {args.rows}x{args.cols} grid")
+    start = time.perf_counter()
+    results = simulate(args.spins, args.counts, args.values, args.rows, args.cols,
+                       args.lines, args.seed, args.workers)
+    elapsed = time.perf_counter() - start
+
+    print(f"{'Lines':>5} {'RTP':>16} {'Hit rate':>9} {'Variance':>10} {'P(line)':>9}")
+    for r in results:
+        print(f"{r['lines']:>5} {r['rtp'] * 100:8.3f}% ±{r['rtp_se'] * 100:.3f} "
+              f"{r['hit_rate'] * 100:8.3f}% {r['variance']:10.4f} {r['line_probability'] * 100:8.4f}%")
+    print(f"\n{results[0]['spins']:,} spins in {elapsed:.1f} s "
+          f"({results[0]['spins'] / elapsed / 1e6:.1f} M spins/s, {args.workers} workers); "
+          f"variance in (bet per line)^2")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Acknowledged Command Tracking with Round-Trip Latency
+
+PURPOSE:
+    integrated_code.ino acks every motor update with "M<ch>:<bpm>" and every
+    sync with "Synced". CommandTracker records each outgoing command with
+    the ack it should produce, matches incoming acks to the oldest pending
+    command, and keeps round-trip latencies and timeouts. This shows whether
+    haptic changes reach the participant when the experimenter thinks so.
+
+USAGE:
+    tracker = CommandTracker(timeout=1.0)
+    reader = GSRReader(ser, on_line=tracker.on_line)
+
+    tracker.track(["M0:72", "M3:90"], label="U0B72;3B90")   # just before writing
+    tracker.expire()                                      # periodically
+    tracker.stats_text()          # "p50 4.1 ms | p95 9.8 ms | ..."
+    tracker.write_summary("GSR-data/experiments/..._commands.json")
+
+NOTE:
+    on_line() runs on the reader thread; everything is guarded by a lock.
+    Times are session_clock.now() seconds, the same clock GSRReader stamps lines with.
+"""
+
+import json
+import math
+import threading
+from collections import deque
+
+import session_clock
+
+# Histogram bin edges in milliseconds (last bin is open-ended)
+LATENCY_BINS_MS = [0, 5, 10, 20, 50, 100, 200, 500, 1000]
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(p / 100.0 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class CommandTracker:
+    """Matches acks to commands and keeps latency statistics"""
+
+    def __init__(self, timeout=1.0):
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._next_tag = 0
+        self.pending = {}  # ack text -> deque of (tag, send_time, label)
+        self.reset_stats()
+
+    def reset_stats(self):
+        """Start a fresh set of statistics (e.g. at the start of a recording)"""
+        with self._lock:
+            self.latencies = []  # seconds
+            self.sent = 0
+            self.acked = 0
+            self.timeouts = 0
+            self.unmatched_acks = 0
+            self.started = session_clock.now()
+
+    def track(self, expected_acks, label=""):
+        """
+        Register a command and the ack lines it should produce. Call it right
+        before writing so a fast ack cannot arrive before it is tracked.
+        """
+        now = session_clock.now()
+        with self._lock:
+            tag = self._next_tag
+            self._next_tag += 1
+            for ack in expected_acks:
+                self.pending.setdefault(ack, deque()).append((tag, now, label))
+                self.sent += 1
+        return tag
+
+    def on_line(self, arrival_time, line):
+        """Reader callback for every non-sample line"""
+        with self._lock:
+            queue = self.pending.get(line)
+            if not queue:
+                if line == "Synced" or (line.startswith("M") and ":" in line):
+                    self.unmatched_acks += 1
+                return
+            tag, send_time, label = queue.popleft()
+            self.latencies.append(arrival_time - send_time)
+            self.acked += 1
+
+    def expire(self, now=None):
+        """Count commands whose ack did not arrive within the timeout"""
+        now = session_clock.now() if now is None else now
+        with self._lock:
+            for queue in self.pending.values():
+                while queue and now - queue[0][1] > self.timeout:
+                    queue.popleft()
+                    self.timeouts += 1
+
+    @property
+    def in_flight(self):
+        with self._lock:
+            return sum(len(q) for q in self.pending.values())
+
+    def summary(self):
+        """Counts, percentiles (ms) and histogram since the last reset"""
+        with self._lock:
+            ms = sorted(l * 1000.0 for l in self.latencies)
+            counts = [0] * len(LATENCY_BINS_MS)
+            for value in ms:
+                i = len(LATENCY_BINS_MS) - 1
+                while i > 0 and value < LATENCY_BINS_MS[i]:
+                    i -= 1
+                counts[i] += 1
+            return {
+                'sent': self.sent,
+                'acked': self.acked,
+                'timeouts': self.timeouts,
+                'unmatched_acks': self.unmatched_acks,
+                'timeout_s': self.timeout,
+                'p50_ms': percentile(ms, 50),
+                'p95_ms': percentile(ms, 95),
+                'p99_ms': percentile(ms, 99),
+                'max_ms': ms[-1] if ms else None,
+                'histogram_ms': [
+                    {'from': lo, 'to': hi, 'count': c}
+                    for lo, hi, c in zip(LATENCY_BINS_MS, LATENCY_BINS_MS[1:] + [None], counts)
+                ],
+            }
+
+    def stats_text(self):
+        """One-line summary for the live panel"""
+        s = self.summary()
+        if s['p50_ms'] is None:
+            return f"Acks: none yet | sent {s['sent']} | timeouts {s['timeouts']}"
+        return (f"Ack p50 {s['p50_ms']:.1f} | p95 {s['p95_ms']:.1f} | "
+                f"p99 {s['p99_ms']:.1f} ms | {s['acked']}/{s['sent']} acked | "
+                f"timeouts {s['timeouts']}")
+
+    def write_summary(self, path):
+        """Write the summary as JSON"""
+        with open(path, 'w') as f:
+            json.dump(self.summary(), f, indent=2)
+        return path
@@ -4,16 +4,20 @@ Create comparison plots for GSR experiment analysis
 EASY CONFIGURATION - Edit the labels and titles below:
 """
 
-import pandas as pd
 import matplotlib.pyplot as plt
 import os
+from gsr_catalog import find_one, open_catalog
+from gsr_store import load_session
 
 # ============================================================================
 # CONFIGURATION - EDIT THESE TO CUSTOMIZE YOUR PLOTS
 # ============================================================================
 
+# Sessions are looked up in the catalog (gsr_catalog.py) by timestamp -
+# the full "YYYYMMDD_HHMMSS" or just its unique trailing digits
+
 # Plot 1: Dual comparison
-PLOT1_FILES = ["163147", "172831"]  # Last 3 digits of filenames
+PLOT1_FILES = ["163147", "172831"]  # Timestamps (or their last digits)
 PLOT1_LABELS = ["User_01 Intervention On", "User_01 Intervention Off"]  # Custom labels
 PLOT1_TITLE = "Slot Machine - User_01 Intervention On vs Off"  # Chart title
 PLOT1_OUTPUT = "User_01 Intervention On vs Off"  # Output filename
@@ -38,19 +42,21 @@ PLOT4_OUTPUT = "Iowa gambling task - User_01 vs User_02 vs User_03"
 
 # ============================================================================
 
-# Processed data directory
-PROCESSED_DIR = "GSR-data/processed"
 OUTPUT_DIR = "GSR-data/comparisons"
 
 # Create output directory
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
+catalog = None
+
 def load_processed_data(suffix):
-    """Load processed CSV file by last 3 digits"""
-    filename = f"processed_20251030_{suffix}.csv"
-    filepath = os.path.join(PROCESSED_DIR, filename)
-    df = pd.read_csv(filepath)
-    return df['Time (s)'].values, df['GSR Value'].values
+    """Load the processed session whose timestamp ends with suffix"""
+    global catalog
+    if catalog is None:
+        catalog = open_catalog()
+    session = find_one(catalog, kind='processed', timestamp=suffix)
+    data = load_session(session['path'], columns=['Time (s)', 'GSR Value'])
+    return data['Time (s)'], data['GSR Value']
 
 def create_dual_comparison(suffix1, suffix2, label1, label2, title, output_name):
     """Create comparison plot with two experiments"""
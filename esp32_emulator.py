@@ -0,0 +1,393 @@
+"""
+Virtual ESP32 - integrated_code.ino Emulator over a Pseudo-Terminal
+
+PURPOSE:
+    Lets the host tools run without hardware. Opens a pty and speaks the
+    integrated_code.ino protocol on it:
+        - "G:<seq>:<millis>:<value>" GSR samples (or binary frames) at a
+          configurable rate
+        - "CH:BPM:LUB:DUB:LUB_EN:DUB_EN" motor commands and "U..." multi-motor
+          update frames (motor_scheduler.py), acked with "M<ch>:<bpm>"
+        - "S" sync, answered with "Synced"
+    Motor beats are simulated like the firmware does and can inject
+    haptic-style spikes into the GSR signal, plus timing jitter. Sample
+    rates of 10x-100x the real 10 Hz can be used for load testing.
+
+USAGE:
+    Run an emulator and point a host script at it:
+        python esp32_emulator.py --rate 10
+        python integrated_code.py /dev/pts/N      (path printed above)
+
+    Measure throughput and dropped samples through GSRReader:
+        python esp32_emulator.py --rate 1000 --bench 10
+        python esp32_emulator.py --rate 1000 --bench 10 --binary --baud 115200
+
+OPTIONS:
+    --rate HZ         GSR samples per second (default 10)
+    --binary          Send binary frames (gsr_frames.py) instead of "G:" lines
+    --plain           Send bare values like gsr_monitor.ino (for gsr_plotter.py)
+    --spike N         Spike amplitude added on motor beats (default 800, 0 = off)
+    --jitter MS       Std-dev of random send delay per sample (default 0)
+    --baud N          Throttle output to a real UART's byte rate (default off)
+    --bench SECONDS   Run GSRReader against the emulator and report results
+
+NOTE:
+    Unix only (uses os.openpty).
+"""
+
+import argparse
+import math
+import os
+import random
+import re
+import select
+import threading
+import time
+import tty
+
+from gsr_frames import FRAME_SAMPLES, encode_frame
+
+UPDATE_FIELD = re.compile(r'([BLDld])(-?\d+)')
+LUB_DUB_DELAY = 0.150  # Seconds between lub and dub, as in the firmware
+MAX_PENDING = 64 * 1024  # Bytes buffered before samples are dropped
+
+
+class MotorState:
+    """Per-motor beat timing mirroring MotorConfig in integrated_code.ino"""
+
+    def __init__(self):
+        self.bpm = 60
+        self.lub_effect = 1
+        self.dub_effect = 3
+        self.lub_enabled = True
+        self.dub_enabled = True
+        self.last_beat = 0.0
+        self.in_lub_dub = False
+        self.lub_time = 0.0
+
+    def beats_until(self, now):
+        """Advance beat timing to now and return the number of effects fired"""
+        fired = 0
+        if self.bpm == 0:
+            return fired
+        interval = 60.0 / self.bpm
+        if not self.in_lub_dub and now - self.last_beat >= interval:
+            if self.lub_enabled and self.lub_effect:
+                fired += 1
+            self.lub_time = now
+            self.in_lub_dub = True
+        if self.in_lub_dub and now - self.lub_time >= LUB_DUB_DELAY:
+            if self.dub_enabled and self.dub_effect:
+                fired += 1
+            self.last_beat = now
+            self.in_lub_dub = False
+        return fired
+
+
+class ESP32Emulator:
+    """Emulates integrated_code.ino on the master side of a pty"""
+
+    def __init__(self, rate=10.0, binary=False, spike_amplitude=800,
+                 jitter_ms=0.0, baud=None, seed=None, plain=False):
+        self.rate = rate
+        self.binary = binary
+        self.plain = plain
+        self.spike_amplitude = spike_amplitude
+        self.jitter_ms = jitter_ms
+        self.baud = baud
+        self.rng = random.Random(seed)
+        self.motors = [MotorState() for _ in range(6)]
+
+        self.samples_generated = 0
+        self.samples_sent = 0
+        self.samples_dropped = 0
+        self.commands_received = 0
+        self.acks_sent = 0
+
+        self.master = None
+        self.slave = None
+        self.port = None
+        self._pending = b""
+        self._pending_samples = []  # (end offset in _pending, sample count)
+        self._bytes_budget = 0.0
+        self._last_budget_time = None
+        self._write_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._threads = []
+
+    # ===== PTY =====
+    def open(self):
+        """Create the pty; host tools open self.port like a serial device"""
+        self.master, self.slave = os.openpty()
+        tty.setraw(self.slave)
+        os.set_blocking(self.master, False)
+        self.port = os.ttyname(self.slave)
+        return self.port
+
+    def start(self):
+        if self.master is None:
+            self.open()
+        self.start_time = time.perf_counter()
+        self._write_text("Integrated GSR + Haptic System\n")
+        for ch in range(6):
+            self._write_text(f"Motor {ch}: OK\n")
+        self._write_text("Ready\n")
+        for target in (self._gsr_loop, self._command_loop):
+            t = threading.Thread(target=target, daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def stop(self):
+        self._stop_event.set()
+        for t in self._threads:
+            t.join(1.0)
+
+    def close(self):
+        self.stop()
+        for fd in (self.master, self.slave):
+            if fd is not None:
+                os.close(fd)
+        self.master = self.slave = None
+
+    def millis(self):
+        return int((time.perf_counter() - self.start_time) * 1000)
+
+    # ===== OUTPUT =====
+    def _write(self, data, samples=0):
+        """Queue bytes for the pty; drop samples if the host stops reading"""
+        with self._write_lock:
+            if samples and len(self._pending) + len(data) > MAX_PENDING:
+                self.samples_dropped += samples
+                return
+            self._pending += data
+            if samples:
+                self._pending_samples.append([len(self._pending), samples])
+            self._flush()
+
+    def _write_text(self, text):
+        self._write(text.encode())
+
+    def _flush(self):
+        """Write as much pending data as the pty (and baud limit) accepts"""
+        if not self._pending:
+            return
+        limit = len(self._pending)
+        if self.baud:
+            now = time.perf_counter()
+            if self._last_budget_time is not None:
+                self._bytes_budget += (now - self._last_budget_time) * self.baud / 10.0
+                self._bytes_budget = min(self._bytes_budget, self.baud / 10.0)
+            self._last_budget_time = now
+            limit = min(limit, int(self._bytes_budget))
+        if limit <= 0:
+            return
+        try:
+            written = os.write(self.master, self._pending[:limit])
+        except BlockingIOError:
+            return
+        self._bytes_budget -= written
+        self._pending = self._pending[written:]
+
+        # Count samples whose bytes have fully left the buffer
+        remaining = []
+        for entry in self._pending_samples:
+            entry[0] -= written
+            if entry[0] <= 0:
+                self.samples_sent += entry[1]
+            else:
+                remaining.append(entry)
+        self._pending_samples = remaining
+
+    # ===== GSR SIGNAL =====
+    def _gsr_value(self, t, spikes):
+        """Slow tonic drift with small SCR-like bumps, noise and spikes"""
+        value = 2000 + 150 * math.sin(2 * math.pi * t / 120.0)
+        value += 60 * max(0.0, math.sin(2 * math.pi * t / 17.0)) ** 8
+        value += self.rng.gauss(0, 8)
+        value += spikes * self.spike_amplitude * self.rng.uniform(0.5, 1.0)
+        return max(0, min(4095, int(value)))
+
+    def _gsr_loop(self):
+        period = 1.0 / self.rate
+        next_time = self.start_time
+        frame = []
+        frame_start_ms = 0
+        frame_seq = 0
+        seq = 0
+        while not self._stop_event.is_set():
+            next_time += period
+            delay = next_time - time.perf_counter()
+            if self.jitter_ms:
+                delay += abs(self.rng.gauss(0, self.jitter_ms)) / 1000.0
+            if delay > 0:
+                time.sleep(delay)
+
+            now = next_time - self.start_time
+            spikes = 0
+            for motor in self.motors:
+                spikes += motor.beats_until(now)
+            val = self._gsr_value(now, spikes if self.spike_amplitude else 0)
+            self.samples_generated += 1
+
+            if self.binary:
+                if not frame:
+                    frame_start_ms = int(now * 1000)
+                frame.append(val)
+                if len(frame) == FRAME_SAMPLES:
+                    interval_ms = max(1, min(255, round(period * 1000)))
+                    self._write(encode_frame(frame_seq, frame_start_ms, frame, interval_ms),
+                                samples=len(frame))
+                    frame_seq += 1
+                    frame = []
+            elif self.plain:
+                self._write(f"{val}\r\n".encode(), samples=1)
+            else:
+                self._write(f"G:{seq}:{int(now * 1000)}:{val}\r\n".encode(), samples=1)
+            seq += 1
+
+        with self._write_lock:
+            self._flush()
+
+    # ===== COMMANDS =====
+    def _command_loop(self):
+        buf = b""
+        while not self._stop_event.is_set():
+            ready, _, _ = select.select([self.master], [], [], 0.01)
+            with self._write_lock:
+                self._flush()
+            if not ready:
+                continue
+            try:
+                data = os.read(self.master, 4096)
+            except (BlockingIOError, OSError):
+                continue
+            buf += data
+            *lines, buf = buf.split(b"\n")
+            for line in lines:
+                self.handle_command(line.decode('utf-8', errors='ignore').strip())
+
+    def handle_command(self, line):
+        """Apply one command line the way integrated_code.ino does"""
+        if not line:
+            return
+        self.commands_received += 1
+        if line[0] == 'S':
+            now = time.perf_counter() - self.start_time
+            for motor in self.motors:
+                motor.last_beat = now
+                motor.in_lub_dub = False
+            self._write_text("Synced\n")
+            self.acks_sent += 1
+        elif line[0] == 'U':
+            self.handle_update_frame(line[1:])
+        elif line[0].isdigit():
+            try:
+                fields = [int(f) for f in line.split(':')]
+            except ValueError:
+                return
+            if len(fields) != 6 or not 0 <= fields[0] <= 5:
+                return
+            ch, bpm, lub, dub, lub_en, dub_en = fields
+            motor = self.motors[ch]
+            motor.bpm = max(0, min(200, bpm))
+            motor.lub_effect = max(0, min(123, lub))
+            motor.dub_effect = max(0, min(123, dub))
+            motor.lub_enabled = lub_en == 1
+            motor.dub_enabled = dub_en == 1
+            self._write_text(f"M{ch}:{bpm}\n")
+            self.acks_sent += 1
+
+    def handle_update_frame(self, body):
+        """Apply "U0B72L1;3B90" field updates, acking each motor"""
+        for part in body.split(';'):
+            if not part or not '0' <= part[0] <= '5':
+                return
+            ch = int(part[0])
+            motor = self.motors[ch]
+            for field, val in UPDATE_FIELD.findall(part[1:]):
+                val = int(val)
+                if field == 'B':
+                    motor.bpm = max(0, min(200, val))
+                elif field == 'L':
+                    motor.lub_effect = max(0, min(123, val))
+                elif field == 'D':
+                    motor.dub_effect = max(0, min(123, val))
+                elif field == 'l':
+                    motor.lub_enabled = val == 1
+                else:
+                    motor.dub_enabled = val == 1
+            self._write_text(f"M{ch}:{motor.bpm}\n")
+            self.acks_sent += 1
+
+
+def run_benchmark(emulator, seconds):
+    """Drive GSRReader against the emulator and report throughput"""
+    import serial
+    from gsr_reader import GSRReader
+
+    ser = serial.Serial(emulator.port, 115200, timeout=0.01)
+    reader = GSRReader(ser, binary=emulator.binary, capacity=1000000)
+    reader.start()
+    emulator.start()
+
+    time.sleep(seconds)
+    emulator.stop()
+    time.sleep(0.5)  # Let the reader drain what is still in flight
+    reader.stop()
+    ser.close()
+
+    received = reader.buffer.total
+    print("\n" + "=" * 60)
+    print("EMULATOR BENCHMARK")
+    print("=" * 60)
+    print(f"  Mode:            {'binary frames' if emulator.binary else 'G: lines'}")
+    print(f"  Target rate:     {emulator.rate:.0f} Hz for {seconds:.1f}s")
+    print(f"  Generated:       {emulator.samples_generated}")
+    print(f"  Dropped (link):  {emulator.samples_dropped}")
+    print(f"  Never sent:      {emulator.samples_generated - emulator.samples_sent - emulator.samples_dropped}")
+    print(f"  Received:        {received}")
+    print(f"  Lost (host):     {emulator.samples_sent - received}")
+    print(f"  Throughput:      {received / seconds:.0f} samples/s")
+    print(f"  Bad lines/frames: {reader.bad_lines}/{reader.bad_frames}")
+    print("=" * 60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Emulate integrated_code.ino on a pty")
+    parser.add_argument('--rate', type=float, default=10.0)
+    parser.add_argument('--binary', action='store_true')
+    parser.add_argument('--plain', action='store_true')
+    parser.add_argument('--spike', type=int, default=800)
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--baud', type=int, default=None)
+    parser.add_argument('--bench', type=float, default=None)
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    emulator = ESP32Emulator(rate=args.rate, binary=args.binary,
+                             spike_amplitude=args.spike, jitter_ms=args.jitter,
+                             baud=args.baud, seed=args.seed, plain=args.plain)
+    port = emulator.open()
+
+    if args.bench:
+        run_benchmark(emulator, args.bench)
+        emulator.close()
+        return
+
+    emulator.start()
+    print(f"Virtual ESP32 on: {port}")
+    print(f"Run e.g.: python integrated_code.py {port}")
+    print("Ctrl+C to stop\n")
+    try:
+        while True:
+            time.sleep(5)
+            print(f"Sent {emulator.samples_sent} samples, "
+                  f"{emulator.commands_received} commands, "
+                  f"{emulator.samples_dropped} dropped")
+    except KeyboardInterrupt:
+        print("\nStopped")
+    emulator.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+"""
+Local Event Bus from the Slot Machine to the GSR / Haptic Controller
+
+PURPOSE:
+    The slot game (Slot-Machine with gui/app_gui.py) and integrated_code.py
+    run as separate programs. The bus lets spin outcomes reach the
+    controller while the participant is still looking at the reels:
+    - EventPublisher sends one small JSON datagram per event to a UDP port
+      on 127.0.0.1 - never blocks, and costs nothing if nobody listens
+    - EventSubscriber receives them on its own thread, stamps the arrival
+      with its own session_clock.now() and calls on_event(event) right
+      there, so reactions do not wait for the Tk event loop
+    - EventLog appends each event as a marker line to <recording>_events.jsonl
+      next to the GSR recording, at its arrival time on the recording's
+      Time (s) axis
+    'sent' is stamped with the publisher's session_clock.now(). The two
+    programs anchor that clock separately, so the publisher also carries
+    the handshake offset_s (session_clock.handshake()) and the subscriber
+    moves 'sent' onto its own clock before taking applied - sent as the
+    publish-to-apply latency (p50/p95/p99). Events without an offset are
+    logged but not timed.
+
+EVENTS:
+    {"type": "spin" | "win" | "loss", "seq", "sent", "offset_s", "spin",
+     "bet", "lines", "total_bet", "winnings", "balance", "participant"}
+    Every spin publishes "spin" when the reels start and "win" or "loss"
+    when the outcome is known.
+
+USAGE:
+    bus = EventPublisher()                                  # slot machine
+    bus.offset_s = handshake()['offset_s']                  # once synced
+    bus.publish('win', spin=12, winnings=50)
+
+    subscriber = EventSubscriber(on_event=handle)           # controller
+    subscriber.start()
+    def handle(event):
+        ...                                                 # subscriber thread
+        subscriber.applied(event)                           # records latency
+    subscriber.stats_text()
+
+    python event_bus.py              # print events as they arrive
+    python event_bus.py --bench      # publish-to-apply latency on this machine
+"""
+
+import argparse
+import json
+import socket
+import threading
+import time
+
+from command_tracker import percentile
+from session_clock import now
+
+EVENT_HOST = '127.0.0.1'
+EVENT_PORT = 47801
+MAX_EVENT_BYTES = 4096
+MAX_LATENCIES = 10000  # Most recent latencies kept for the percentiles
+
+
+class EventPublisher:
+    """Fire-and-forget event sender"""
+
+    def __init__(self, host=EVENT_HOST, port=EVENT_PORT, offset_s=None):
+        self.address = (host, port)
+        self.offset_s = offset_s  # Subscriber clock - this clock (handshake), None if unknown
+        self.seq = 0
+        self.errors = 0
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._sock.setblocking(False)
+        self._lock = threading.Lock()
+
+    def publish(self, event_type, **fields):
+        """Send an event; returns it (with seq and sent time)"""
+        with self._lock:
+            event = dict(fields, type=event_type, seq=self.seq, offset_s=self.offset_s)
+            self.seq += 1
+            event['sent'] = now()
+            try:
+                self._sock.sendto(json.dumps(event).encode('utf-8'), self.address)
+            except OSError:
+                # No subscriber (Windows reports it), buffer full... the game goes on
+                self.errors += 1
+        return event
+
+    def close(self):
+        self._sock.close()
+
+
+class EventSubscriber(threading.Thread):
+    """Receives events and hands them to on_event on this thread"""
+
+    def __init__(self, on_event=None, host=EVENT_HOST, port=EVENT_PORT):
+        super().__init__(daemon=True)
+        self.on_event = on_event
+        self.received = 0
+        self.bad = 0
+        self.error = None
+        self._latencies = []
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            self._sock.bind((host, port))
+        except OSError as e:
+            # Another controller is already subscribed
+            self.error = e
+        self._sock.settimeout(0.5)
+
+    def run(self):
+        if self.error is not None:
+            return
+        while not self._stop_event.is_set():
+            try:
+                data, _ = self._sock.recvfrom(MAX_EVENT_BYTES)
+            except socket.timeout:
+                continue
+            except OSError as e:
+                if not self._stop_event.is_set():
+                    self.error = e
+                break
+            received = now()
+            try:
+                event = json.loads(data.decode('utf-8'))
+                event['received'] = received
+            except (ValueError, TypeError, UnicodeDecodeError):
+                self.bad += 1
+                continue
+            self.received += 1
+            if self.on_event is not None:
+                try:
+                    self.on_event(event)
+                except Exception as e:
+                    print(f"⚠️ Event handler failed on {event.get('type')}: {e}")
+
+    def applied(self, event, applied_time=None):
+        """
+        Record that event took effect; returns its latency in seconds, or
+        None when the publisher's clock offset is unknown
+        """
+        if event.get('offset_s') is None:
+            return None
+        sent = event['sent'] + event['offset_s']  # On this process's clock
+        latency = (now() if applied_time is None else applied_time) - sent
+        with self._lock:
+            self._latencies.append(latency)
+            if len(self._latencies) > 2 * MAX_LATENCIES:
+                del self._latencies[:-MAX_LATENCIES]
+        return latency
+
+    def latency_stats(self):
+        """p50/p95/p99/max publish-to-apply latency in milliseconds"""
+        with self._lock:
+            latencies = sorted(self._latencies[-MAX_LATENCIES:])
+        stats = {'events': self.received, 'applied': len(latencies)}
+        for p in (50, 95, 99):
+            value = percentile(latencies, p)
+            stats[f'p{p}_ms'] = None if value is None else value * 1000.0
+        stats['max_ms'] = latencies[-1] * 1000.0 if latencies else None
+        return stats
+
+    def stats_text(self):
+        stats = self.latency_stats()
+        if not stats['applied']:
+            return f"{stats['events']} events"
+        return (f"{stats['events']} events | p50 {stats['p50_ms']:.2f} ms | "
+                f"p95 {stats['p95_ms']:.2f} ms | p99 {stats['p99_ms']:.2f} ms")
+
+    def stop(self, timeout=1.0):
+        """Ask the thread to exit and wait for it (bounded, safe on the GUI thread)"""
+        self._stop_event.set()
+        self._sock.close()
+        if self.is_alive():
+            self.join(timeout)
+
+
+class EventLog:
+    """Thread-safe marker file next to a recording (one JSON object per line)"""
+
+    def __init__(self, path, start_time):
+        self.path = path
+        self.start_time = start_time
+        self.markers = 0
+        self._lock = threading.Lock()
+        self._file = open(path, 'a')
+
+    def write(self, event, **fields):
+        """Append event at its arrival time on the recording's Time (s) axis"""
+        line = json.dumps(dict(event, time_s=event['received'] - self.start_time, **fields))
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.write(line + '\n')
+            self._file.flush()
+            self.markers += 1
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def benchmark(count=2000, interval=0.002):
+    """Publish events to a local subscriber and report publish-to-apply latency"""
+    subscriber = EventSubscriber(on_event=lambda event: subscriber.applied(event))
+    if subscriber.error is not None:
+        print(f"Port {EVENT_PORT} is busy ({subscriber.error}) - stop the controller first")
+        return
+    subscriber.start()
+    publisher = EventPublisher(offset_s=0.0)  # Same process, same clock
+    for i in range(count):
+        publisher.publish('spin', spin=i)
+        time.sleep(interval)
+    time.sleep(0.2)
+    subscriber.stop()
+    print(f"Published {count}, received {subscriber.received}: {subscriber.stats_text()}, "
+          f"max {subscriber.latency_stats()['max_ms']:.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Slot-machine event bus")
+    parser.add_argument('--bench', action='store_true', help="Measure publish-to-apply latency")
+    args = parser.parse_args()
+
+    if args.bench:
+        benchmark()
+        return
+
+    def show(event):
+        latency = subscriber.applied(event)
+        timing = "unsynced" if latency is None else f"{latency * 1000:.2f} ms"
+        print(f"{event['type']:<5} spin {event.get('spin', '-')}  "
+              f"winnings {event.get('winnings', '-')}  ({timing})")
+
+    subscriber = EventSubscriber(on_event=show)
+    if subscriber.error is not None:
+        print(f"Cannot listen on {EVENT_HOST}:{EVENT_PORT}: {subscriber.error}")
+        return
+    subscriber.start()
+    print(f"Listening on {EVENT_HOST}:{EVENT_PORT} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        subscriber.stop()
+        print(subscriber.stats_text())
+
+
+if __name__ == "__main__":
+    main()
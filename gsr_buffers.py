@@ -0,0 +1,166 @@
+"""
+Typed NumPy Buffers for the Live GSR Path
+
+PURPOSE:
+    Replaces deques of Python ints/floats and lists of [time, phase, state,
+    value] rows in the live monitors.
+    1. NumpyRing - preallocated column ring buffer. Every sample is written
+       twice (at i and i + capacity), so the newest n samples are always one
+       contiguous slice: window() returns zero-copy views for plotting.
+    2. ChunkedColumns - append-only typed column store for recordings,
+       grown in fixed-size preallocated chunks (~30 bytes per sample instead
+       of ~200 bytes of Python objects).
+
+USAGE:
+    ring = NumpyRing(500, {'time': 'f8', 'value': 'u2'})
+    ring.extend(time=t_array, value=v_array)
+    times, values = ring.window()['time'], ring.window()['value']
+
+    store = ChunkedColumns({'time': 'f8', 'value': 'u2'})
+    store.extend(time=t_array, value=v_array)
+    store.column('value')        # one contiguous array for saving
+"""
+
+import threading
+
+import numpy as np
+
+
+class NumpyRing:
+    """Preallocated, thread-safe, mirrored column ring buffer"""
+
+    def __init__(self, capacity, columns):
+        self.capacity = capacity
+        self.dtypes = {name: np.dtype(dtype) for name, dtype in columns.items()}
+        self._data = {name: np.zeros(2 * capacity, dtype)
+                      for name, dtype in self.dtypes.items()}
+        self._total = 0  # Samples ever written (monotonic write position)
+        self._lock = threading.Lock()
+
+    @property
+    def total(self):
+        """Number of samples written since creation (or clear())"""
+        with self._lock:
+            return self._total
+
+    def __len__(self):
+        with self._lock:
+            return min(self._total, self.capacity)
+
+    def clear(self):
+        with self._lock:
+            self._total = 0
+
+    def append(self, **values):
+        """Add one sample given as scalars per column"""
+        with self._lock:
+            pos = self._total % self.capacity
+            for name, data in self._data.items():
+                data[pos] = data[pos + self.capacity] = values[name]
+            self._total += 1
+
+    def extend(self, **arrays):
+        """Add many samples given as equal-length arrays per column"""
+        n = len(next(iter(arrays.values())))
+        if n == 0:
+            return
+        with self._lock:
+            # Only the newest `capacity` samples can survive
+            skip = max(0, n - self.capacity)
+            total = self._total + skip
+            for name, data in self._data.items():
+                values = np.asarray(arrays[name])[skip:]
+                pos = total % self.capacity
+                first = min(len(values), self.capacity - pos)
+                for offset in (0, self.capacity):
+                    data[offset + pos:offset + pos + first] = values[:first]
+                    data[offset:offset + len(values) - first] = values[first:]
+            self._total += n
+
+    def _slice(self, n):
+        end = self._total % self.capacity + self.capacity
+        return slice(end - n, end)
+
+    def window(self, n=None):
+        """
+        Zero-copy views of the newest n samples (all buffered if None).
+        Views are only stable while nobody writes - use them from the thread
+        that writes, or copy.
+        """
+        with self._lock:
+            available = min(self._total, self.capacity)
+            n = available if n is None else min(n, available)
+            sl = self._slice(n)
+            return {name: data[sl] for name, data in self._data.items()}
+
+    def read_since(self, cursor):
+        """
+        Copy out samples written after cursor.
+
+        Returns: (columns, new_cursor, lost) where lost counts samples that
+        were overwritten before this consumer got to them.
+        """
+        with self._lock:
+            total = self._total
+            oldest = max(0, total - self.capacity)
+            lost = max(0, oldest - cursor)
+            n = total - max(cursor, oldest)
+            sl = self._slice(n)
+            columns = {name: data[sl].copy() for name, data in self._data.items()}
+        return columns, total, lost
+
+
+class ChunkedColumns:
+    """Append-only typed column store grown in preallocated chunks"""
+
+    def __init__(self, columns, chunk_size=65536):
+        self.dtypes = {name: np.dtype(dtype) for name, dtype in columns.items()}
+        self.chunk_size = chunk_size
+        self._chunks = []  # list of dicts of arrays
+        self._fill = 0     # Rows used in the last chunk
+        self._len = 0
+
+    def __len__(self):
+        return self._len
+
+    def _new_chunk(self):
+        self._chunks.append({name: np.empty(self.chunk_size, dtype)
+                             for name, dtype in self.dtypes.items()})
+        self._fill = 0
+
+    def extend(self, **arrays):
+        """Append equal-length arrays per column"""
+        n = len(next(iter(arrays.values())))
+        done = 0
+        while done < n:
+            if not self._chunks or self._fill == self.chunk_size:
+                self._new_chunk()
+            take = min(n - done, self.chunk_size - self._fill)
+            chunk = self._chunks[-1]
+            for name in self.dtypes:
+                chunk[name][self._fill:self._fill + take] = arrays[name][done:done + take]
+            self._fill += take
+            done += take
+        self._len += n
+
+    def chunks(self, name):
+        """Filled parts of every chunk of one column (views)"""
+        out = [chunk[name] for chunk in self._chunks[:-1]]
+        if self._chunks:
+            out.append(self._chunks[-1][name][:self._fill])
+        return out
+
+    def column(self, name):
+        """Whole column as one array"""
+        parts = self.chunks(name)
+        if not parts:
+            return np.empty(0, self.dtypes[name])
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+    def last(self, name):
+        return self._chunks[-1][name][self._fill - 1] if self._len else None
+
+    @property
+    def nbytes(self):
+        """Memory held by the allocated chunks"""
+        return sum(a.nbytes for chunk in self._chunks for a in chunk.values())
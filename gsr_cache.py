@@ -0,0 +1,136 @@
+"""
+Content-Hash Cache for Processed GSR Outputs
+
+PURPOSE:
+    Raw recordings never change once saved, but process_gsr_data.py used to
+    redo every file and redraw every plot on each run. The cache keys each
+    input on the SHA-256 of its bytes plus the pipeline parameters
+    (MEDIAN_FILTER_SIZE, RATE_CHANGE_THRESHOLD, TARGET_SAMPLE_RATE,
+    PIPELINE_VERSION). A file is skipped when its key is unchanged and all
+    of its outputs still exist. Its stored summary is reused instead.
+
+MANIFEST:
+    <output dir>/.cache.json, written atomically by the main process only:
+    {"entries": {input path: {"key", "outputs": [...], "result": {...}}}}
+    Hashes are remembered per (mtime, size), so unchanged inputs are not
+    re-read just to find out that they are unchanged.
+
+USAGE:
+    cache = ProcessingCache("GSR-data/processed/.cache.json")
+    result = cache.lookup(path)          # stored summary, or None
+    if result is None:
+        result = process_file(path)
+        cache.store(path, outputs=[csv_file, png_file], result=result)
+    cache.save()
+    print(cache.report())                # "Cache: 11 hits, 1 miss"
+
+NOTE:
+    Bump PIPELINE_VERSION in gsr_cleaning.py whenever a code change alters
+    the outputs; that invalidates every entry at once.
+"""
+
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from gsr_cleaning import (MEDIAN_FILTER_SIZE, PIPELINE_VERSION,
+                          RATE_CHANGE_THRESHOLD, TARGET_SAMPLE_RATE)
+
+PIPELINE_PARAMS = {
+    'median_filter_size': MEDIAN_FILTER_SIZE,
+    'rate_change_threshold': RATE_CHANGE_THRESHOLD,
+    'target_sample_rate': TARGET_SAMPLE_RATE,
+    'pipeline_version': PIPELINE_VERSION,
+}
+
+
+def file_hash(path, block_size=1 << 20):
+    """SHA-256 hex digest of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _plain(value):
+    """NumPy scalars in a result dict as JSON-friendly Python values"""
+    return value.item() if isinstance(value, np.generic) else value
+
+
+class ProcessingCache:
+    """Manifest of processed inputs, keyed on content hash + parameters"""
+
+    def __init__(self, manifest_path, params=None, reuse=True):
+        self.manifest_path = str(manifest_path)
+        self.params = dict(PIPELINE_PARAMS if params is None else params)
+        self.reuse = reuse  # False: every lookup misses, entries are rewritten
+        self.hits = 0
+        self.misses = 0
+        self.entries = {}
+        self._hashes = {}  # (path, mtime, size) -> content hash, this run
+        if os.path.exists(self.manifest_path):
+            try:
+                with open(self.manifest_path) as f:
+                    self.entries = json.load(f).get('entries', {})
+            except (OSError, ValueError):
+                self.entries = {}  # Unreadable manifest: rebuild it
+
+    def key(self, path):
+        """Cache key of an input: its content hash plus the parameters"""
+        path = str(path)
+        stat = os.stat(path)
+        entry = self.entries.get(path, {})
+        stamp = (path, stat.st_mtime, stat.st_size)
+        if entry.get('stat') == [stat.st_mtime, stat.st_size]:
+            content = entry['hash']
+        elif stamp in self._hashes:
+            content = self._hashes[stamp]
+        else:
+            content = self._hashes[stamp] = file_hash(path)
+        params = json.dumps(self.params, sort_keys=True)
+        return content, hashlib.sha256(f"{content}:{params}".encode()).hexdigest()
+
+    def lookup(self, path):
+        """Stored result if path is unchanged and its outputs exist, else None"""
+        path = str(path)
+        entry = self.entries.get(path)
+        if (self.reuse and entry is not None
+                and entry['key'] == self.key(path)[1]
+                and all(os.path.exists(p) for p in entry['outputs'])):
+            self.hits += 1
+            return entry['result']
+        self.misses += 1
+        return None
+
+    def store(self, path, outputs, result):
+        """Record the outputs and summary of a freshly processed input"""
+        path = str(path)
+        stat = os.stat(path)
+        content, key = self.key(path)
+        self.entries[path] = {
+            'key': key,
+            'hash': content,
+            'stat': [stat.st_mtime, stat.st_size],
+            'outputs': [str(p) for p in outputs],
+            'result': {k: _plain(v) for k, v in result.items()},
+        }
+
+    def prune(self, paths):
+        """Forget inputs that are not in paths (deleted or moved recordings)"""
+        keep = {str(p) for p in paths}
+        self.entries = {p: e for p, e in self.entries.items() if p in keep}
+
+    def save(self):
+        """Write the manifest atomically (temp file + rename)"""
+        os.makedirs(os.path.dirname(self.manifest_path) or '.', exist_ok=True)
+        tmp = self.manifest_path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump({'params': self.params, 'entries': self.entries}, f, indent=1)
+        os.replace(tmp, self.manifest_path)
+
+    def report(self):
+        return (f"Cache: {self.hits} hit{'s' if self.hits != 1 else ''}, "
+                f"{self.misses} miss{'es' if self.misses != 1 else ''}")
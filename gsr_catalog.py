@@ -0,0 +1,296 @@
+"""
+SQLite Catalog of GSR Recordings and Slot-Machine Sessions
+
+PURPOSE:
+    Finding data used to depend on filename conventions hardcoded in each
+    script. The catalog scans
+    - GSR-data/gsr_<timestamp>.csv                          (kind 'gsr')
+    - GSR-data/experiments/gsr_<id>_State<X>_<timestamp>.csv (kind 'experiment')
+    - GSR-data/processed/processed_[<id>_State<X>_]<timestamp>.csv,
+      cleaned_<id>_<timestamp>.csv                          (kind 'processed')
+    - Slot-Machine with gui/session_data/[<id>_]<timestamp>.csv (kind 'slot')
+    and stores participant, state, timestamp, duration, sample count and
+    phase boundaries in GSR-data/catalog.sqlite. started_at is the Unix
+    start time, taken from the first of
+    - the recording's *_clock.json (session_clock.py)
+    - the start_time in its .bin sidecar (session_writer.py); recordings
+      streamed to disk are named by their start time
+    - the filename timestamp minus the duration: older recordings were
+      named when they were saved, so their timestamp is the end
+    Re-indexing only re-reads files whose mtime or size changed.
+
+USAGE:
+    python gsr_catalog.py index
+    python gsr_catalog.py find --participant 62206 --state B --phase Trial
+
+    from gsr_catalog import open_catalog, find_sessions
+    catalog = open_catalog()                     # indexes incrementally
+    for s in find_sessions(catalog, participant='62206', state='B', phase='Trial'):
+        print(s['path'], s['duration_s'])
+"""
+
+import argparse
+import os
+import re
+import sqlite3
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from gsr_store import load_session
+from session_writer import read_meta
+from session_clock import read_clock_file
+
+CATALOG_PATH = "GSR-data/catalog.sqlite"
+CATALOG_VERSION = 3  # Bump when describe_* changes, so old rows are re-indexed
+SCAN_DIRS = [
+    ("GSR-data", "gsr"),
+    ("GSR-data/experiments", "experiment"),
+    ("GSR-data/processed", "processed"),
+    ("Slot-Machine with gui/session_data", "slot"),
+]
+
+TIMESTAMP = r'(?P<timestamp>\d{8}_\d{6})'
+FILENAME_PATTERNS = {
+    'gsr': [re.compile(rf'gsr_{TIMESTAMP}\.csv')],
+    'experiment': [re.compile(rf'gsr_(?P<participant>.+)_State(?P<state>[^_]+)_{TIMESTAMP}\.csv')],
+    'processed': [re.compile(rf'processed_{TIMESTAMP}\.csv'),
+                  re.compile(rf'processed_(?P<participant>.+)_State(?P<state>[^_]+)_{TIMESTAMP}\.csv'),
+                  re.compile(rf'cleaned_(?P<participant>.+)_{TIMESTAMP}\.csv')],
+    'slot': [re.compile(rf'(?:(?P<participant>.+)_)?{TIMESTAMP}\.csv')],
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    kind TEXT NOT NULL,
+    participant TEXT,
+    state TEXT,
+    group_id TEXT,
+    timestamp TEXT,
+    started_at REAL,
+    duration_s REAL,
+    samples INTEGER,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS phases (
+    session_id INTEGER NOT NULL REFERENCES sessions(id) ON DELETE CASCADE,
+    phase TEXT NOT NULL,
+    start_s REAL,
+    end_s REAL,
+    start_row INTEGER,
+    end_row INTEGER
+);
+CREATE INDEX IF NOT EXISTS sessions_participant ON sessions(participant, state);
+CREATE INDEX IF NOT EXISTS sessions_timestamp ON sessions(timestamp);
+CREATE INDEX IF NOT EXISTS phases_session ON phases(session_id, phase);
+"""
+
+
+def parse_filename(kind, name):
+    """Fields encoded in a filename, or None if it does not follow the convention"""
+    for pattern in FILENAME_PATTERNS[kind]:
+        match = pattern.fullmatch(name)
+        if match:
+            return {k: v for k, v in match.groupdict().items() if v is not None}
+    return None
+
+
+def phase_runs(times, phases):
+    """[(phase, start_s, end_s, start_row, end_row)] of consecutive phase labels"""
+    phases = np.asarray(phases, dtype=object)
+    if len(phases) == 0:
+        return []
+    change = np.ones(len(phases), dtype=bool)
+    change[1:] = phases[1:] != phases[:-1]
+    starts = np.flatnonzero(change).tolist()
+    ends = starts[1:] + [len(phases)]
+    return [(phases[s], float(times[s]), float(times[e - 1]), s, e)
+            for s, e in zip(starts, ends)]
+
+
+def describe_gsr(path, info):
+    """Session row fields and phase runs of a GSR recording"""
+    data = load_session(path)
+    times = data['Time (s)']
+    info['samples'] = len(times)
+    info['duration_s'] = float(times[-1] - times[0]) if len(times) else 0.0
+    clock = read_clock_file(path)
+    bin_path = str(path)[:-len('.csv')] + '.bin'
+    if clock is not None and clock.get('start_time') is not None:
+        info['started_at'] = clock['start_time']  # Session clock, not the filename's second
+    elif os.path.exists(bin_path):
+        # Streamed recording (named at its start) that never wrote a clock file
+        info['started_at'] = read_meta(bin_path)['start_time']
+    elif info.get('timestamp'):
+        # Named at save time: the filename is when the recording ended
+        info['started_at'] = (time.mktime(time.strptime(info['timestamp'], '%Y%m%d_%H%M%S'))
+                              - info['duration_s'])
+    if 'State' in data and len(times) and 'state' not in info:
+        info['state'] = str(data['State'][0])
+    runs = phase_runs(times, data['Phase']) if 'Phase' in data else []
+    return info, runs
+
+
+def describe_slot(path, info):
+    """Session row fields of a slot-machine session log"""
+    df = pd.read_csv(path, dtype={'participant_id': str, 'group_id': str})
+    info['samples'] = len(df)
+    if len(df):
+        info['started_at'] = float(df['timestamp'].iloc[0])
+        duration = df['session_duration_sec'].dropna()
+        info['duration_s'] = (float(duration.iloc[-1]) if len(duration)
+                              else float(df['timestamp'].iloc[-1] - df['timestamp'].iloc[0]))
+        if 'participant' not in info and 'participant_id' in df and pd.notna(df['participant_id'].iloc[0]):
+            info['participant'] = df['participant_id'].iloc[0]
+        if pd.notna(df['group_id'].iloc[0]):
+            info['group_id'] = df['group_id'].iloc[0]
+    return info, []
+
+
+def open_catalog(path=CATALOG_PATH, refresh=True, root='.'):
+    """Open (and by default incrementally update) the catalog"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.executescript(SCHEMA)
+    if conn.execute("PRAGMA user_version").fetchone()[0] != CATALOG_VERSION:
+        with conn:
+            conn.execute("DELETE FROM sessions")
+        conn.execute(f"PRAGMA user_version = {CATALOG_VERSION}")
+    if refresh:
+        index(conn, root)
+    return conn
+
+
+def index(conn, root='.', verbose=False):
+    """
+    Re-index files whose mtime or size changed and drop vanished files.
+    Returns: (indexed, unchanged, removed)
+    """
+    known = {row['path']: (row['mtime'], row['size'])
+             for row in conn.execute("SELECT path, mtime, size FROM sessions")}
+    seen = set()
+    indexed = unchanged = 0
+
+    for folder, kind in SCAN_DIRS:
+        for file in sorted(Path(root, folder).glob('*.csv')):
+            info = parse_filename(kind, file.name)
+            if info is None:
+                continue
+            path = str(file.relative_to(root)) if root != '.' else str(file)
+            seen.add(path)
+            stat = file.stat()
+            if known.get(path) == (stat.st_mtime, stat.st_size):
+                unchanged += 1
+                continue
+
+            info['kind'] = kind
+            try:
+                describe = describe_slot if kind == 'slot' else describe_gsr
+                info, runs = describe(file, info)
+            except (OSError, KeyError, ValueError, pd.errors.ParserError) as e:
+                if verbose:
+                    print(f"  ✗ {path}: {e}")
+                continue
+
+            with conn:
+                conn.execute("DELETE FROM sessions WHERE path = ?", (path,))
+                cur = conn.execute(
+                    "INSERT INTO sessions (path, kind, participant, state, group_id, timestamp,"
+                    " started_at, duration_s, samples, mtime, size)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (path, kind, info.get('participant'), info.get('state'), info.get('group_id'),
+                     info.get('timestamp'), info.get('started_at'), info.get('duration_s'),
+                     info.get('samples'), stat.st_mtime, stat.st_size))
+                conn.executemany(
+                    "INSERT INTO phases (session_id, phase, start_s, end_s, start_row, end_row)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    [(cur.lastrowid,) + run for run in runs])
+            indexed += 1
+            if verbose:
+                print(f"  + {path}")
+
+    removed = [p for p in known if p not in seen]
+    with conn:
+        conn.executemany("DELETE FROM sessions WHERE path = ?", [(p,) for p in removed])
+    return indexed, unchanged, len(removed)
+
+
+def find_sessions(conn, participant=None, state=None, kind=None, phase=None,
+                  timestamp=None, group_id=None):
+    """
+    Sessions matching every given filter, oldest first. timestamp matches a
+    full "YYYYMMDD_HHMMSS" or any trailing part of it (e.g. "163147").
+    """
+    clauses, params = [], []
+    for column, value in (('participant', participant), ('state', state),
+                          ('kind', kind), ('group_id', group_id)):
+        if value is not None:
+            clauses.append(f"{column} = ?")
+            params.append(value)
+    if timestamp is not None:
+        clauses.append("timestamp LIKE ?")
+        params.append(f"%{timestamp}")
+    if phase is not None:
+        clauses.append("EXISTS (SELECT 1 FROM phases p WHERE p.session_id = sessions.id AND p.phase = ?)")
+        params.append(phase)
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+    rows = conn.execute(f"SELECT * FROM sessions{where} ORDER BY timestamp, path", params)
+    return [dict(row) for row in rows]
+
+
+def find_one(conn, **filters):
+    """The single session matching filters; ValueError if none or several"""
+    matches = find_sessions(conn, **filters)
+    if len(matches) != 1:
+        raise ValueError(f"{len(matches)} sessions match {filters}"
+                         + "".join(f"\n  {m['path']}" for m in matches))
+    return matches[0]
+
+
+def session_phases(conn, session_id):
+    """Phase runs of one session, in order"""
+    rows = conn.execute("SELECT phase, start_s, end_s, start_row, end_row FROM phases"
+                        " WHERE session_id = ? ORDER BY start_row", (session_id,))
+    return [dict(row) for row in rows]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Index and search GSR / slot sessions")
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('index')
+    find = sub.add_parser('find')
+    for option in ('participant', 'state', 'kind', 'phase', 'timestamp', 'group-id'):
+        find.add_argument(f'--{option}')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    conn = open_catalog(refresh=False)
+    if args.command == 'index':
+        indexed, unchanged, removed = index(conn, verbose=True)
+        print(f"Indexed {indexed}, unchanged {unchanged}, removed {removed} "
+              f"in {(time.perf_counter() - start) * 1000:.0f} ms → {CATALOG_PATH}")
+        return
+
+    index(conn)
+    query_start = time.perf_counter()
+    sessions = find_sessions(conn, participant=args.participant, state=args.state,
+                             kind=args.kind, phase=args.phase, timestamp=args.timestamp,
+                             group_id=args.group_id)
+    query_ms = (time.perf_counter() - query_start) * 1000
+    for s in sessions:
+        phases = " → ".join(p['phase'] for p in session_phases(conn, s['id']))
+        print(f"{s['kind']:<10} {s['participant'] or '-':<8} {s['state'] or '-':<3} "
+              f"{s['timestamp'] or '-':<16} {s['duration_s'] or 0:>7.1f}s {s['samples'] or 0:>6} "
+              f"{phases:<25} {s['path']}")
+    print(f"{len(sessions)} sessions ({query_ms:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
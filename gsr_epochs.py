@@ -0,0 +1,236 @@
+"""
+Event-Locked GSR Epochs Around Slot-Machine Spins
+
+PURPOSE:
+    The slot machine (Slot-Machine with gui/app_gui.py) logs a Unix timestamp
+    for every spin, and the GSR recorder writes its own time base in another
+    process. This module joins the two:
+    1. Alignment - each slot session is paired with the GSR recording
+       (kind 'gsr' or 'experiment' in the catalog) of the same participant
+       that overlaps it most in wall-clock time. A recording's clock is
+       started_at (catalog) + Time (s); spins are moved onto it with the
+       handshake offset from the slot session's *_clock.json.
+    2. Epochs - every recording is cleaned (remove_spikes), resampled to a
+       uniform grid and concatenated into one study signal, with NaN gaps
+       between recordings (recordings left empty by cleaning are skipped).
+       Spin times are located on the grid with one np.searchsorted per
+       recording. sliding_window_view over the study signal is a zero-copy
+       (n, window) view; indexing it with the event positions gathers all
+       epochs of the study in a single copy, and the averages per event
+       type are a single masked mean over that array.
+
+EVENTS:
+    spin            every spin
+    win / loss      winnings > 0 / winnings == 0
+    loss_chasing    bet raised after a loss
+    after_big_win   spin following a big win
+    Epochs run from EPOCH_PRE seconds before to EPOCH_POST seconds after the
+    spin and are baseline-corrected by the mean of the pre-spin part.
+    Epochs that leave their recording are dropped.
+
+USAGE:
+    python gsr_epochs.py                         # → GSR-data/epoch_averages.csv
+    python gsr_epochs.py --participant 62206 --pre 2 --post 10
+
+    from gsr_epochs import study_epochs, average_epochs
+    lags, epochs, events = study_epochs(open_catalog())
+    averages = average_epochs(lags, epochs, events)
+
+NOTE:
+    Sessions recorded with session_clock.py align to about a millisecond.
+    Older recordings only have the filename timestamp of when they were
+    saved; their start is taken as that time minus their duration.
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from gsr_catalog import find_sessions, open_catalog
+from gsr_cleaning import TARGET_SAMPLE_RATE, remove_spikes, resample_uniform
+from gsr_store import load_session
+from session_clock import read_clock_file
+
+AVERAGES_FILE = "GSR-data/epoch_averages.csv"
+GSR_KINDS = ('gsr', 'experiment')
+EPOCH_PRE = 5.0    # Seconds before the spin
+EPOCH_POST = 15.0  # Seconds after the spin
+EVENT_TYPES = ['spin', 'win', 'loss', 'loss_chasing', 'after_big_win']
+
+
+def load_spins(path):
+    """Spin rows of a slot session log (without the SESSION END row)"""
+    df = pd.read_csv(path, dtype={'participant_id': str, 'group_id': str})
+    df = df[pd.to_numeric(df['spin_number'], errors='coerce').notna()]
+    spins = pd.DataFrame({
+        'spin_number': df['spin_number'].astype(int).to_numpy(),
+        'timestamp': df['timestamp'].astype(float).to_numpy(),
+        'winnings': df['winnings'].astype(float).to_numpy(),
+    })
+    for flag in ('loss_chasing', 'after_big_win'):
+        spins[flag] = df[flag].astype(str).str.lower().eq('true').to_numpy()
+    return spins
+
+
+def overlap(a_start, a_end, b_start, b_end):
+    """Seconds two intervals share (0 if disjoint)"""
+    return max(0.0, min(a_end, b_end) - max(a_start, b_start))
+
+
+def align_sessions(conn, participant=None):
+    """
+    [(slot session, spins, gsr session or None, overlap_s)] pairing each
+    slot session with the most overlapping GSR recording. Participants
+    must match when both files name one.
+    """
+    recordings = [s for kind in GSR_KINDS for s in find_sessions(conn, kind=kind)
+                  if s['started_at'] is not None]
+    pairs = []
+    for slot in find_sessions(conn, kind='slot', participant=participant):
+        spins = load_spins(slot['path'])
+        if spins.empty:
+            continue
+        clock = read_clock_file(slot['path'])
+        if clock is not None and clock.get('handshake'):
+            spins['timestamp'] += clock['handshake']['offset_s']  # Onto the recorder's clock
+        start, end = spins['timestamp'].iloc[0], spins['timestamp'].iloc[-1]
+        best, best_overlap = None, 0.0
+        for gsr in recordings:
+            if slot['participant'] and gsr['participant'] and slot['participant'] != gsr['participant']:
+                continue
+            shared = overlap(start - EPOCH_PRE, end + EPOCH_POST,
+                             gsr['started_at'], gsr['started_at'] + (gsr['duration_s'] or 0.0))
+            if shared > best_overlap:
+                best, best_overlap = gsr, shared
+        pairs.append((slot, spins, best, best_overlap))
+    return pairs
+
+
+def recording_signal(path, started_at, rate=TARGET_SAMPLE_RATE):
+    """Cleaned, uniformly resampled recording on the wall clock: (times, values)"""
+    data = load_session(path, columns=['Time (s)', 'GSR Value'])
+    times, values, _ = remove_spikes(data['Time (s)'], data['GSR Value'])
+    times, values = resample_uniform(times, values.astype(np.float64), rate)
+    return started_at + np.asarray(times, dtype=np.float64), np.asarray(values, dtype=np.float64)
+
+
+def study_epochs(conn, pre=EPOCH_PRE, post=EPOCH_POST, rate=TARGET_SAMPLE_RATE,
+                 participant=None, baseline=True):
+    """
+    Epochs around every aligned spin of the study.
+
+    Returns: (lags in seconds, epochs array (events x lags), events
+    DataFrame with one row per epoch)
+    """
+    before = int(round(pre * rate))
+    length = before + int(round(post * rate)) + 1
+    lags = (np.arange(length) - before) / rate
+
+    signals, event_frames = [], []
+    offset = 0
+    recording_offsets = {}
+    for slot, spins, gsr, shared in align_sessions(conn, participant):
+        if gsr is None:
+            continue
+        if gsr['path'] not in recording_offsets:
+            times, values = recording_signal(gsr['path'], gsr['started_at'], rate)
+            if len(times) == 0:
+                recording_offsets[gsr['path']] = None  # Nothing left after cleaning
+            else:
+                recording_offsets[gsr['path']] = (offset, times)
+                signals += [values, np.full(length, np.nan)]  # Gap: no epoch spans two recordings
+                offset += len(values) + length
+        if recording_offsets[gsr['path']] is None:
+            continue
+        start, times = recording_offsets[gsr['path']]
+        # Nearest grid sample to each spin
+        position = np.searchsorted(times, spins['timestamp'].to_numpy())
+        previous = np.clip(position - 1, 0, len(times) - 1)
+        position = np.clip(position, 0, len(times) - 1)
+        nearer = np.abs(times[previous] - spins['timestamp'].to_numpy()) < np.abs(
+            times[position] - spins['timestamp'].to_numpy())
+        position = np.where(nearer, previous, position)
+        inside = ((spins['timestamp'] >= times[0] - 0.5 / rate)
+                  & (spins['timestamp'] <= times[-1] + 0.5 / rate)).to_numpy()
+        events = spins[inside].assign(participant=slot['participant'], slot_session=slot['timestamp'],
+                                      recording=gsr['timestamp'])
+        events['window_start'] = start + position[inside] - before
+        event_frames.append(events)
+
+    columns = ['participant', 'slot_session', 'recording', 'spin_number', 'timestamp',
+               'winnings', 'loss_chasing', 'after_big_win']
+    if not event_frames:
+        return lags, np.empty((0, length)), pd.DataFrame(columns=columns)
+
+    study = np.concatenate(signals)
+    events = pd.concat(event_frames, ignore_index=True)
+    starts = events['window_start'].to_numpy()
+    keep = (starts >= 0) & (starts + length <= len(study))
+    windows = sliding_window_view(study, length)      # Zero-copy (n, length) view
+    epochs = windows[starts[keep]]                     # One gather (a copy) for every epoch
+    complete = ~np.isnan(epochs).any(axis=1)
+    epochs = epochs[complete]
+    events = events[keep][complete].reset_index(drop=True)
+    if baseline and before:
+        epochs = epochs - epochs[:, :before].mean(axis=1, keepdims=True)
+    return lags, epochs, events[columns]
+
+
+def event_masks(events):
+    """{event type: boolean mask over the epochs}"""
+    won = events['winnings'].to_numpy() > 0
+    return {
+        'spin': np.ones(len(events), dtype=bool),
+        'win': won,
+        'loss': ~won,
+        'loss_chasing': events['loss_chasing'].to_numpy(dtype=bool),
+        'after_big_win': events['after_big_win'].to_numpy(dtype=bool),
+    }
+
+
+def average_epochs(lags, epochs, events):
+    """Mean epoch per event type: DataFrame (event, n, one column per lag)"""
+    masks = event_masks(events)
+    selection = np.array([masks[name] for name in EVENT_TYPES], dtype=np.float64)
+    counts = selection.sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = (selection @ epochs) / counts[:, None]  # Every average in one product
+    table = pd.DataFrame(means, columns=[f"{lag:+.1f}s" for lag in lags])
+    table.insert(0, 'n', counts.astype(int))
+    table.insert(0, 'event', EVENT_TYPES)
+    return table
+
+
+def main():
+    parser = argparse.ArgumentParser(description="GSR epochs around slot-machine spins")
+    parser.add_argument('--participant')
+    parser.add_argument('--pre', type=float, default=EPOCH_PRE, help="Seconds before each spin")
+    parser.add_argument('--post', type=float, default=EPOCH_POST, help="Seconds after each spin")
+    parser.add_argument('--out', default=AVERAGES_FILE)
+    args = parser.parse_args()
+
+    conn = open_catalog()
+    print("Slot session        Participant  GSR recording       Overlap")
+    for slot, spins, gsr, shared in align_sessions(conn, args.participant):
+        print(f"{slot['timestamp']:<19} {slot['participant'] or '-':<12} "
+              f"{gsr['timestamp'] if gsr else '(none)':<19} {shared:6.0f} s  ({len(spins)} spins)")
+
+    start = time.perf_counter()
+    lags, epochs, events = study_epochs(conn, args.pre, args.post, participant=args.participant)
+    averages = average_epochs(lags, epochs, events)
+    elapsed = time.perf_counter() - start
+    averages.to_csv(args.out, index=False)
+
+    peak = averages.iloc[:, 2:].to_numpy()
+    print(f"\n{len(events)} epochs of {len(lags)} samples in {elapsed * 1000:.0f} ms → {args.out}")
+    for row, values in zip(averages.itertuples(), peak):
+        if row.n:
+            print(f"  {row.event:<14} n={row.n:<4} peak response {np.nanmax(values):+7.1f} "
+                  f"at {lags[np.nanargmax(values)]:+.1f} s")
+
+
+if __name__ == "__main__":
+    main()
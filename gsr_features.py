@@ -0,0 +1,157 @@
+"""
+Phase-Aware GSR Feature Extraction
+
+PURPOSE:
+    Turns every experiment recording (Baseline / Trial / Post phases written
+    by integrated_code.py) into one tidy table with a row per participant,
+    state and phase:
+        mean        mean cleaned GSR value
+        slope       least-squares trend, GSR units per second
+        auc         area above the phase minimum, GSR units x seconds
+        scr_count   skin conductance responses peaking in the phase
+                    (gsr_scr.detect_scrs)
+        scr_amplitude  mean amplitude of those responses
+        scr_rise_time  mean onset-to-peak time, seconds
+        pct_change  mean relative to the session's Baseline mean, in %
+    Sessions are found through the catalog (gsr_catalog.py) and cleaned
+    with gsr_cleaning.remove_spikes(). The features of all phases of all
+    sessions are then computed in one vectorized pass over the concatenated
+    samples, with np.add.reduceat / np.bincount per segment instead of a
+    loop per phase.
+
+USAGE:
+    python gsr_features.py                       # → GSR-data/features.csv (+ .gsrc)
+    python gsr_features.py --participant 62206
+
+    from gsr_features import study_features
+    table = study_features(open_catalog())      # pandas DataFrame
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from gsr_catalog import find_sessions, open_catalog, session_phases
+from gsr_cleaning import remove_spikes
+from gsr_scr import detect_scrs
+from gsr_store import csv_to_gsrc, load_session
+
+FEATURES_FILE = "GSR-data/features.csv"
+BASELINE_PHASE = "Baseline"
+KEY_COLUMNS = ['participant', 'state', 'timestamp', 'phase']
+
+
+def segment_features(times, values, starts, session_starts=None):
+    """
+    Features of contiguous segments of one concatenated signal;
+    starts[i] is the first sample of segment i, session_starts the first
+    sample of each recording (SCR detection restarts there). Returns a
+    dict of arrays.
+    """
+    times = np.asarray(times, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    starts = np.asarray(starts, dtype=np.int64)
+    n = np.diff(np.append(starts, len(values)))
+    segment_ids = np.repeat(np.arange(len(starts)), n)
+
+    total = np.add.reduceat(values, starts)
+    mean = total / n
+
+    # Slope from sums centred on each segment's first time
+    t = times - times[starts][segment_ids]
+    st = np.add.reduceat(t, starts)
+    stt = np.add.reduceat(t * t, starts)
+    stv = np.add.reduceat(t * values, starts)
+    denominator = n * stt - st * st
+    with np.errstate(invalid='ignore', divide='ignore'):
+        slope = np.where(denominator > 0, (n * stv - st * total) / denominator, np.nan)
+
+    # Trapezoids within a segment, then subtract the minimum over the duration
+    same = segment_ids[1:] == segment_ids[:-1]
+    areas = np.diff(times) * (values[1:] + values[:-1]) / 2
+    integral = np.bincount(segment_ids[:-1][same], areas[same], minlength=len(starts))
+    duration = times[starts + n - 1] - times[starts]
+    auc = integral - np.minimum.reduceat(values, starts) * duration
+
+    # Responses belong to the segment their peak falls in
+    scrs = detect_scrs(times, values, session_starts)
+    scr_segment = segment_ids[scrs['peak']]
+    scr_count = np.bincount(scr_segment, minlength=len(starts))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        scr_amplitude = np.bincount(scr_segment, scrs['amplitude'], minlength=len(starts)) / scr_count
+        scr_rise_time = np.bincount(scr_segment, scrs['rise_time'], minlength=len(starts)) / scr_count
+
+    return {
+        'start_s': times[starts],
+        'duration_s': duration,
+        'samples': n,
+        'mean': mean,
+        'slope': slope,
+        'auc': auc,
+        'scr_count': scr_count,
+        'scr_amplitude': scr_amplitude,
+        'scr_rise_time': scr_rise_time,
+    }
+
+
+def study_features(conn, **filters):
+    """Feature table for every experiment session matching filters"""
+    keys, times, values, starts, session_starts = [], [], [], [], []
+    offset = 0
+    for session in find_sessions(conn, kind='experiment', **filters):
+        runs = session_phases(conn, session['id'])
+        if not runs:
+            continue
+        data = load_session(session['path'], columns=['Time (s)', 'GSR Value'])
+        session_times, session_values, _ = remove_spikes(data['Time (s)'], data['GSR Value'])
+        session_starts.append(offset)
+        for run in runs:
+            keys.append((session['participant'], session['state'],
+                         session['timestamp'], run['phase']))
+            starts.append(offset + run['start_row'])
+        times.append(session_times)
+        values.append(session_values)
+        offset += len(session_times)
+
+    if not keys:
+        return pd.DataFrame(columns=KEY_COLUMNS)
+
+    # Phase runs tile each session, so the segments tile the whole signal
+    times = np.concatenate(times)
+    values = np.concatenate(values)
+    table = pd.concat([pd.DataFrame(keys, columns=KEY_COLUMNS),
+                       pd.DataFrame(segment_features(times, values, starts, session_starts))], axis=1)
+
+    # Percent change from the Baseline mean of the same session
+    session_key = ['participant', 'state', 'timestamp']
+    baseline = (table[table['phase'] == BASELINE_PHASE]
+                .groupby(session_key, dropna=False)['mean'].first()
+                .rename('baseline_mean'))
+    table = table.join(baseline, on=session_key)
+    table['pct_change'] = (table['mean'] - table['baseline_mean']) / table['baseline_mean'] * 100
+    return table.drop(columns='baseline_mean')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-phase GSR features for the whole study")
+    parser.add_argument('--participant')
+    parser.add_argument('--state')
+    parser.add_argument('--out', default=FEATURES_FILE)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    table = study_features(open_catalog(), participant=args.participant, state=args.state)
+    elapsed = time.perf_counter() - start
+    table.to_csv(args.out, index=False)
+    csv_to_gsrc(args.out)
+
+    with pd.option_context('display.width', 160, 'display.max_columns', None):
+        print(table.round(2).to_string(index=False))
+    print(f"\n{len(table)} phases from {table[['participant', 'timestamp']].drop_duplicates().shape[0]} "
+          f"sessions in {elapsed * 1000:.0f} ms → {args.out}")
+
+
+if __name__ == "__main__":
+    main()
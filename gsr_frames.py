@@ -0,0 +1,184 @@
+"""
+Binary GSR Frame Encoder / Vectorized Decoder
+
+PURPOSE:
+    Host side of the optional binary framing mode in integrated_code.ino.
+    Instead of one "G:<int>" line per sample, the ESP32 sends frames of
+    FRAME_SAMPLES packed 12-bit samples. One bulk ser.read() is decoded
+    into NumPy arrays in a handful of array operations, so the per-sample
+    cost on the host is tiny and the sample rate can go well beyond 10 Hz
+    on the same 115200 baud link.
+
+FRAME LAYOUT (little-endian):
+    [0xA5 0x5A][seq u16][t_ms u32][n u8][interval_ms u8]
+    [n x 12-bit samples, two per three bytes][crc16 u16]
+
+    CRC is CRC-16/CCITT-FALSE (poly 0x1021, init 0xFFFF) over everything
+    after the sync word. Text lines (acks, "Synced") may appear between
+    frames and are returned separately.
+
+USAGE:
+    from gsr_frames import decode_frames
+
+    buf = remainder + ser.read(ser.in_waiting or 1)
+    frames, text, remainder, bad = decode_frames(buf)
+    frames.samples      # (num_frames, FRAME_SAMPLES) uint16
+    frames.sample_times_ms()
+"""
+
+import struct
+from collections import namedtuple
+
+import numpy as np
+
+SYNC = b"\xa5\x5a"
+FRAME_SAMPLES = 8  # Must match FRAME_SAMPLES in integrated_code.ino
+HEADER_SIZE = 10
+
+
+def frame_size(n_samples=FRAME_SAMPLES):
+    """Total bytes in a frame carrying n_samples samples"""
+    return HEADER_SIZE + (n_samples * 3 + 1) // 2 + 2
+
+
+def _crc_table():
+    table = np.zeros(256, dtype=np.uint16)
+    for i in range(256):
+        crc = i << 8
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x1021) if crc & 0x8000 else (crc << 1)
+        table[i] = crc & 0xFFFF
+    return table
+
+
+CRC_TABLE = _crc_table()
+
+
+def crc16_ccitt(data):
+    """CRC-16/CCITT-FALSE of a bytes object"""
+    crc = 0xFFFF
+    for byte in data:
+        crc = ((crc << 8) & 0xFFFF) ^ int(CRC_TABLE[(crc >> 8) ^ byte])
+    return crc
+
+
+def crc16_rows(rows):
+    """CRC-16/CCITT-FALSE of every row of a (m, L) uint8 array at once"""
+    crc = np.full(rows.shape[0], 0xFFFF, dtype=np.uint16)
+    for j in range(rows.shape[1]):
+        crc = (crc << 8) ^ CRC_TABLE[(crc >> 8) ^ rows[:, j]]
+    return crc
+
+
+def pack12(samples):
+    """Pack 12-bit samples two per three bytes"""
+    samples = np.asarray(samples, dtype=np.uint16) & 0x0FFF
+    n = len(samples)
+    padded = np.zeros(n + (n % 2), dtype=np.uint16)
+    padded[:n] = samples
+    a = padded[0::2]
+    b = padded[1::2]
+    out = np.empty((len(a), 3), dtype=np.uint8)
+    out[:, 0] = a & 0xFF
+    out[:, 1] = (a >> 8) | ((b & 0x0F) << 4)
+    out[:, 2] = b >> 4
+    return out.tobytes()[:(n * 3 + 1) // 2]
+
+
+def unpack12(payload, n_samples):
+    """Unpack (m, nbytes) packed payload rows into (m, n_samples) uint16"""
+    m = payload.shape[0]
+    if m == 0:
+        return np.zeros((0, n_samples), dtype=np.uint16)
+    if n_samples % 2:
+        payload = np.concatenate([payload, np.zeros((m, 1), dtype=np.uint8)], axis=1)
+    triples = payload.reshape(m, -1, 3).astype(np.uint16)
+    out = np.empty((m, triples.shape[1] * 2), dtype=np.uint16)
+    out[:, 0::2] = triples[:, :, 0] | ((triples[:, :, 1] & 0x0F) << 8)
+    out[:, 1::2] = (triples[:, :, 1] >> 4) | (triples[:, :, 2] << 4)
+    return out[:, :n_samples]
+
+
+def encode_frame(seq, t_ms, samples, interval_ms):
+    """Build one frame exactly as integrated_code.ino does"""
+    body = struct.pack('<HIBB', seq & 0xFFFF, t_ms & 0xFFFFFFFF,
+                       len(samples), interval_ms) + pack12(samples)
+    return SYNC + body + struct.pack('<H', crc16_ccitt(body))
+
+
+class FrameBatch(namedtuple('FrameBatch', ['seq', 't_ms', 'interval_ms', 'samples'])):
+    """Decoded frames as parallel arrays (one row per frame)"""
+
+    def sample_times_ms(self):
+        """Device time of every sample, shape (num_frames, n)"""
+        offsets = np.arange(self.samples.shape[1], dtype=np.int64)
+        return self.t_ms[:, None].astype(np.int64) + offsets * self.interval_ms[:, None]
+
+
+def empty_batch(n_samples=FRAME_SAMPLES):
+    return FrameBatch(np.zeros(0, np.uint16), np.zeros(0, np.uint32),
+                      np.zeros(0, np.uint8), np.zeros((0, n_samples), np.uint16))
+
+
+def decode_frames(buf, n_samples=FRAME_SAMPLES):
+    """
+    Decode every complete frame in buf.
+
+    Returns: (frames, text, remainder, bad_frames)
+        frames     - FrameBatch of valid frames in stream order
+        text       - bytes between frames (acks, status lines)
+        remainder  - trailing bytes of a possibly incomplete frame; prepend
+                     them to the next read
+        bad_frames - sync words outside accepted frames whose frame failed
+                     the length or CRC check
+    """
+    size = frame_size(n_samples)
+    arr = np.frombuffer(buf, dtype=np.uint8)
+    if len(arr) < 2:
+        return empty_batch(n_samples), b"", bytes(buf), 0
+
+    starts = np.flatnonzero((arr[:-1] == 0xA5) & (arr[1:] == 0x5A))
+    complete = starts[starts + size <= len(arr)]
+    incomplete = starts[starts + size > len(arr)]
+
+    # Check length field and CRC of every candidate in one pass
+    rows = arr[complete[:, None] + np.arange(size)]
+    crc = rows[:, -2].astype(np.uint16) | (rows[:, -1].astype(np.uint16) << 8)
+    valid = (rows[:, 8] == n_samples) & (crc16_rows(rows[:, 2:-2]) == crc)
+
+    # Accept valid frames that do not overlap an earlier accepted frame
+    accepted = []
+    end = 0
+    for i in np.flatnonzero(valid):
+        if complete[i] >= end:
+            accepted.append(i)
+            end = complete[i] + size
+    accepted = np.array(accepted, dtype=np.int64)
+    # Sync bytes inside an accepted frame's payload are not failed frames
+    inside = np.zeros(len(complete), dtype=bool)
+    if len(accepted):
+        accepted_starts = complete[accepted]
+        owner = np.maximum(np.searchsorted(accepted_starts, complete, side='right') - 1, 0)
+        inside = (complete >= accepted_starts[owner]) & (complete < accepted_starts[owner] + size)
+    bad_frames = int(np.count_nonzero(~inside))
+
+    # Hold back bytes from the first sync word that might start a frame
+    pending = incomplete[incomplete >= end]
+    cut = int(pending[0]) if len(pending) else len(arr)
+    if cut == len(arr) and arr[-1] == 0xA5 and cut - 1 >= end:
+        cut -= 1  # First half of a sync word
+
+    covered = np.zeros(cut, dtype=bool)
+    if len(accepted):
+        idx = (complete[accepted][:, None] + np.arange(size)).ravel()
+        covered[idx[idx < cut]] = True
+    text = arr[:cut][~covered].tobytes()
+
+    good = rows[accepted]
+    frames = FrameBatch(
+        seq=good[:, 2].astype(np.uint16) | (good[:, 3].astype(np.uint16) << 8),
+        t_ms=good[:, 4:8].copy().view('<u4').ravel(),
+        interval_ms=good[:, 9].copy(),
+        samples=unpack12(good[:, HEADER_SIZE:-2], n_samples),
+    )
+    return frames, text, bytes(buf[cut:]), bad_frames
@@ -4,22 +4,29 @@ import matplotlib
 matplotlib.use('TkAgg')
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from matplotlib.animation import FuncAnimation
 import tkinter as tk
 from tkinter import ttk
 import serial
 import serial.tools.list_ports
-from collections import deque
+import sys
 import time
 import csv
 from datetime import datetime
 import os
-
-# Select port
-ports = list(serial.tools.list_ports.comports())
-for i, p in enumerate(ports):
-    print(f"{i}: {p}")
-ser = serial.Serial(ports[int(input("Port: "))].device, 115200, timeout=0.1)
+from gsr_buffers import ChunkedColumns, NumpyRing
+from live_plot import LivePlot
+
+FRAME_INTERVAL_MS = 33  # Plot refresh (~30 FPS)
+
+# Select port (or pass a device path, e.g. from esp32_emulator.py)
+if len(sys.argv) > 1:
+    port = sys.argv[1]
+else:
+    ports = list(serial.tools.list_ports.comports())
+    for i, p in enumerate(ports):
+        print(f"{i}: {p}")
+    port = ports[int(input("Port: "))].device
+ser = serial.Serial(port, 115200, timeout=0.1)
 print("Connected! Starting in 2 seconds...")
 time.sleep(2)
 print("Reading data...\n")
@@ -29,32 +36,31 @@ if not os.path.exists('GSR-data'):
     os.makedirs('GSR-data')
     print("Created GSR-data folder")
 
-# Data storage
-times = deque(maxlen=500)
-values = deque(maxlen=500)
+# Data storage (preallocated; the plot draws views of it)
+plot_ring = NumpyRing(500, {'time': 'f8', 'value': 'u2'})
 count = 0
 
 # Recording state
+RECORD_COLUMNS = {'time': 'f8', 'value': 'u2'}
 recording = False
-recorded_data = []
+recorded_data = ChunkedColumns(RECORD_COLUMNS)
 start_time = None
 
 def update(frame):
     global count, start_time
-    # Read ALL available data
+    # Read ALL available data, then store it in one batch
+    new_times, new_values, new_recording_times = [], [], []
     while ser.in_waiting:
         try:
             line = ser.readline().decode('utf-8').strip()
             val = int(line)
             count += 1
-            current_time = count * 0.1  # 10Hz sampling
-            times.append(current_time)
-            values.append(val)
+            new_times.append(count * 0.1)  # 10Hz sampling
+            new_values.append(val)
             
             # If recording, save to buffer
             if recording and start_time is not None:
-                recording_time = time.time() - start_time
-                recorded_data.append([recording_time, val])
+                new_recording_times.append(time.time() - start_time)
             
             # Only print occasionally to avoid terminal spam
             if count % 10 == 0:
@@ -62,29 +68,22 @@ def update(frame):
         except Exception as e:
             pass
     
-    ax.clear()
-    if len(values) > 0:
-        ax.plot(list(times), list(values), 'b-', linewidth=2)
-        
-        # Show current value
-        ax.text(0.02, 0.98, f'Current: {values[-1]}', 
-                transform=ax.transAxes, fontsize=14, 
-                verticalalignment='top', fontweight='bold',
-                bbox=dict(boxstyle='round', facecolor='lightblue', alpha=0.8))
-        
-        # Show recording indicator
-        if recording:
-            ax.text(0.98, 0.98, 'RECORDING ●', 
-                    transform=ax.transAxes, fontsize=14, 
-                    verticalalignment='top', horizontalalignment='right',
-                    fontweight='bold', color='red',
-                    bbox=dict(boxstyle='round', facecolor='white', alpha=0.8))
+    if new_values:
+        plot_ring.extend(time=new_times, value=new_values)
+    if new_recording_times:
+        recorded_data.extend(time=new_recording_times,
+                             value=new_values[-len(new_recording_times):])
     
-    ax.set_ylim(0, 4096)
-    ax.set_xlabel('Time (s)')
-    ax.set_ylabel('GSR Value')
-    ax.set_title('GSR Monitor')
-    ax.grid(True, alpha=0.3)
+    # Only the line and texts are redrawn each frame (live_plot.py)
+    window = plot_ring.window()
+    times, values = window['time'], window['value']
+    live_plot.update(times, values,
+                     f'Current: {values[-1]}' if len(values) > 0 else '',
+                     'RECORDING ●' if recording else '')
+
+def animate():
+    update(None)
+    root.after(FRAME_INTERVAL_MS, animate)
 
 def toggle_recording():
     """Start/stop recording"""
@@ -93,10 +92,9 @@ def toggle_recording():
     if not recording:
         # Start recording
         recording = True
-        recorded_data = []
+        recorded_data = ChunkedColumns(RECORD_COLUMNS)
         count = 0
-        times.clear()
-        values.clear()
+        plot_ring.clear()
         start_time = time.time()
         
         record_btn.config(text="STOP & SAVE", bg="red")
@@ -124,11 +122,12 @@ def save_data():
     with open(filename, 'w', newline='') as f:
         writer = csv.writer(f)
         writer.writerow(['Time (s)', 'GSR Value'])
-        writer.writerows(recorded_data)
+        writer.writerows(zip(recorded_data.column('time').tolist(),
+                             recorded_data.column('value').tolist()))
     
     print(f"\n✓ Saved to: {filepath}")
     print(f"  Samples: {len(recorded_data)}")
-    print(f"  Duration: {recorded_data[-1][0]:.1f}s\n")
+    print(f"  Duration: {recorded_data.last('time'):.1f}s\n")
 
 # Create GUI
 root = tk.Tk()
@@ -155,8 +154,9 @@ fig.tight_layout(pad=3.0)
 
 canvas = FigureCanvasTkAgg(fig, master=root)
 canvas.get_tk_widget().pack(side=tk.TOP, fill=tk.BOTH, expand=True)
+live_plot = LivePlot(fig, ax, window=50, fontsize=14, status_fontsize=14)
 
-ani = FuncAnimation(fig, update, interval=100, cache_frame_data=False)
+root.after(FRAME_INTERVAL_MS, animate)
 
 def on_closing():
     """Cleanup on exit"""
@@ -164,6 +164,7 @@ def on_closing():
     if recording:
         print("\nWindow closed while recording. Saving...")
         save_data()
+    print(f"Plot: {live_plot.stats_text()}")
     ser.close()
     root.destroy()
 
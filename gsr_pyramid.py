@@ -0,0 +1,134 @@
+"""
+Min/Max Decimation Pyramid for the Live GSR Plot
+
+PURPOSE:
+    Lets the live monitor show anything from the last 10 s to the whole
+    session without stopping the recording. Level 0 keeps every sample;
+    each higher level keeps the min and max of `factor` buckets of the level
+    below. Levels are updated incrementally as samples arrive, so adding a
+    sample is amortized O(1), and a query picks the finest level that fits
+    the requested span into max_points - drawing costs the same after 2
+    minutes or 2 hours.
+
+USAGE:
+    pyramid = MinMaxPyramid()
+    pyramid.extend(times, values)          # every frame, new samples only
+
+    x, y = pyramid.query(t0, max_points=2000)   # t0 .. newest sample
+    line.set_data(x, y)
+
+NOTE:
+    Coarse levels are drawn as a vertical min-max segment per bucket, so
+    spikes stay visible at every zoom level. Samples not yet folded into a
+    complete bucket are taken from the finer levels, so the newest data is
+    always on screen.
+"""
+
+import numpy as np
+
+
+class _Level:
+    """Growable t / min / max columns of one pyramid level"""
+
+    def __init__(self, capacity, value_dtype, raw=False):
+        self.raw = raw  # Level 0: one value per sample, lo is hi
+        self.n = 0
+        self.t = np.empty(capacity, np.float64)
+        self.lo = np.empty(capacity, value_dtype)
+        self.hi = self.lo if raw else np.empty(capacity, value_dtype)
+
+    def append(self, t, lo, hi):
+        end = self.n + len(t)
+        if end > len(self.t):
+            capacity = max(end, 2 * len(self.t))
+            self.t = np.resize(self.t, capacity)
+            self.lo = np.resize(self.lo, capacity)
+            self.hi = self.lo if self.raw else np.resize(self.hi, capacity)
+        self.t[self.n:end] = t
+        self.lo[self.n:end] = lo
+        if not self.raw:
+            self.hi[self.n:end] = hi
+        self.n = end
+
+    def points(self, start, end):
+        """Plot points for items start..end (two per bucket above level 0)"""
+        t = self.t[start:end]
+        if self.raw:
+            return t, self.lo[start:end]
+        return (np.repeat(t, 2),
+                np.column_stack((self.lo[start:end], self.hi[start:end])).ravel())
+
+
+class MinMaxPyramid:
+    """Incrementally built min/max pyramid over (time, value) samples"""
+
+    def __init__(self, factor=4, capacity=4096, value_dtype='u2'):
+        self.factor = factor
+        self.capacity = capacity
+        self.value_dtype = np.dtype(value_dtype)
+        self.clear()
+
+    def clear(self):
+        self.levels = [_Level(self.capacity, self.value_dtype, raw=True)]
+
+    def __len__(self):
+        return self.levels[0].n
+
+    @property
+    def latest(self):
+        """(time, value) of the newest sample, or None"""
+        level = self.levels[0]
+        return (level.t[level.n - 1], level.lo[level.n - 1]) if level.n else None
+
+    def extend(self, times, values):
+        """Add samples (times must be non-decreasing) and update every level"""
+        if len(times) == 0:
+            return
+        self.levels[0].append(times, values, values)
+
+        f = self.factor
+        k = 0
+        while self.levels[k].n - self._folded(k) * f >= f:
+            if k + 1 == len(self.levels):
+                self.levels.append(_Level(max(16, self.capacity // f ** (k + 1)),
+                                          self.value_dtype))
+            fine, coarse = self.levels[k], self.levels[k + 1]
+            start = coarse.n * f
+            end = start + (fine.n - start) // f * f
+            coarse.append(fine.t[start:end:f],
+                          fine.lo[start:end].reshape(-1, f).min(axis=1),
+                          fine.hi[start:end].reshape(-1, f).max(axis=1))
+            k += 1
+
+    def _folded(self, k):
+        """Buckets of level k+1 (each covering factor items of level k)"""
+        return self.levels[k + 1].n if k + 1 < len(self.levels) else 0
+
+    def query(self, t0=None, max_points=2000):
+        """
+        Points covering t0 (None = session start) up to the newest sample,
+        at most about max_points of them.
+
+        Returns: (times, values) arrays ready for Line2D.set_data()
+        """
+        for k, level in enumerate(self.levels):
+            start = 0
+            if t0 is not None:
+                # Include the bucket that straddles t0
+                start = max(0, np.searchsorted(level.t[:level.n], t0, side='right') - 1)
+            points = (level.n - start) * (1 if k == 0 else 2)
+            if points <= max_points or k == len(self.levels) - 1:
+                break
+
+        if k == 0:
+            return level.points(start, level.n)
+
+        # Chosen level, then the not-yet-folded tails of the finer levels,
+        # ending on the newest sample itself (buckets sit at their start time)
+        parts = [level.points(start, level.n)]
+        for j in range(k - 1, -1, -1):
+            tail = self.levels[j + 1].n * self.factor
+            parts.append(self.levels[j].points(tail, self.levels[j].n))
+        parts.append(self.levels[0].points(self.levels[0].n - 1, self.levels[0].n))
+        return (np.concatenate([p[0] for p in parts]),
+                np.concatenate([p[1] for p in parts]))
@@ -0,0 +1,169 @@
+"""
+Background Serial Reader for the Integrated GSR + Haptic ESP32
+
+PURPOSE:
+    Reads the ESP32 serial stream on a dedicated thread so that a slow
+    matplotlib redraw can never delay or batch GSR samples. Every line is
+    timestamped the moment it arrives (session_clock.now()) and pushed into
+    a thread-safe, preallocated NumPy ring buffer (gsr_buffers.py). The live
+    plot and the recorder each keep their own cursor into the buffer and
+    consume samples independently.
+
+USAGE:
+    from gsr_reader import GSRReader
+
+    reader = GSRReader(ser)
+    reader.start()
+
+    cursor = 0
+    samples, cursor, lost = reader.buffer.read_since(cursor)
+    samples['arrival'], samples['value']    # NumPy arrays, one per column
+
+    reader.stop()
+
+NOTE:
+    Lines that are not "G:" samples (acks, "Synced", startup messages) are
+    passed to the optional on_line(arrival_time, line) callback.
+    With binary=True the stream is decoded as binary frames (gsr_frames.py)
+    and text lines between frames are handled the same way.
+
+    Samples sent as "G:<seq>:<millis>:<value>" (or binary frames) carry the
+    device sequence number and timestamp; reader.clock estimates the device
+    clock offset/drift and gap is the number of samples missing right
+    before each one (gsr_timebase.py). Old "G:<value>" firmware gives
+    seq = device_ms = NO_DEVICE_TIME (-1) and gap = 0.
+"""
+
+import threading
+
+import numpy as np
+
+from gsr_buffers import NumpyRing
+from gsr_timebase import ClockSync, GapDetector
+from session_clock import now
+
+# Binary frames carry a 16-bit frame counter, so per-sample sequence
+# numbers wrap at 65536 * FRAME_SAMPLES
+FRAME_SEQ_MODULUS = 2 ** 16
+
+# Columns of reader.buffer; seq/device_ms are NO_DEVICE_TIME for old firmware
+SAMPLE_COLUMNS = {'arrival': 'f8', 'value': 'u2', 'seq': 'i8',
+                  'device_ms': 'i8', 'gap': 'u4'}
+NO_DEVICE_TIME = -1
+
+
+class GSRReader(threading.Thread):
+    """Thread that reads serial lines, parses "G:" samples and buffers them"""
+
+    def __init__(self, ser, capacity=10000, on_line=None, binary=False):
+        super().__init__(daemon=True)
+        self.ser = ser
+        self.buffer = NumpyRing(capacity, SAMPLE_COLUMNS)
+        self.on_line = on_line
+        self.binary = binary
+        self.bad_lines = 0
+        self.bad_frames = 0
+        self.clock = ClockSync()
+        self.gaps = GapDetector()
+        self.error = None
+        self._partial = b""
+        self._stop_event = threading.Event()
+
+    def run(self):
+        if self.binary:
+            self.run_binary()
+            return
+
+        while not self._stop_event.is_set():
+            try:
+                raw = self.ser.readline()
+            except Exception as e:
+                # Port closed or USB unplugged - stop reading
+                self.error = e
+                break
+
+            if not raw:
+                continue
+
+            # readline() returns whatever it has on timeout, so keep partial
+            # lines until their newline arrives
+            if not raw.endswith(b"\n"):
+                self._partial += raw
+                continue
+            arrival_time = now()
+            raw = self._partial + raw
+            self._partial = b""
+
+            self.handle_line(arrival_time, raw.decode('utf-8', errors='ignore').strip())
+
+    def run_binary(self):
+        """Read in bulk and decode binary frames"""
+        from gsr_frames import FRAME_SAMPLES, decode_frames
+
+        self.gaps = GapDetector(modulus=FRAME_SEQ_MODULUS * FRAME_SAMPLES)
+
+        pending = b""
+        while not self._stop_event.is_set():
+            try:
+                data = self.ser.read(self.ser.in_waiting or 1)
+            except Exception as e:
+                self.error = e
+                break
+
+            if not data:
+                continue
+            arrival_time = now()
+
+            frames, text, pending, bad = decode_frames(pending + data)
+            self.bad_frames += bad
+
+            # The last sample of the batch is the newest; place earlier ones
+            # back by their device-time distance from it
+            if len(frames.seq):
+                n = frames.samples.shape[1]
+                device_ms = frames.sample_times_ms().ravel().astype(np.int64)
+                seqs = (frames.seq.astype(np.int64)[:, None] * n + np.arange(n)).ravel()
+                self.buffer.extend(
+                    arrival=arrival_time - (device_ms[-1] - device_ms) / 1000.0,
+                    value=frames.samples.ravel(), seq=seqs, device_ms=device_ms,
+                    gap=self.gaps.check_many(seqs))
+                # Only the newest sample's arrival time is a real measurement
+                self.clock.add(int(device_ms[-1]), arrival_time)
+
+            if text:
+                lines = (self._partial + text).split(b"\n")
+                self._partial = lines.pop()
+                for raw in lines:
+                    self.handle_line(arrival_time, raw.decode('utf-8', errors='ignore').strip())
+
+    def handle_line(self, arrival_time, line):
+        """Parse one complete line stamped with its arrival time"""
+        if line.startswith('G:'):
+            fields = line[2:].split(':')
+            try:
+                if len(fields) == 3:
+                    seq, device_ms, val = (int(f) for f in fields)
+                elif len(fields) == 1:
+                    seq, device_ms, val = None, None, int(fields[0])
+                else:
+                    raise ValueError(line)
+            except ValueError:
+                # Garbled or merged line
+                self.bad_lines += 1
+                return
+            gap = 0
+            if seq is None:
+                seq = device_ms = NO_DEVICE_TIME
+            else:
+                self.clock.add(device_ms, arrival_time)
+                gap = self.gaps.check(seq)
+            self.buffer.append(arrival=arrival_time, value=val, seq=seq,
+                               device_ms=device_ms, gap=gap)
+        elif line and self.on_line is not None:
+            self.on_line(arrival_time, line)
+
+    def stop(self, timeout=1.0):
+        """Ask the thread to exit and wait for it"""
+        self._stop_event.set()
+        if self.is_alive():
+            self.join(timeout)
@@ -0,0 +1,215 @@
+"""
+Skin Conductance Response (SCR) Detector - Batch and Streaming
+
+PURPOSE:
+    Finds phasic responses (onset, peak, amplitude, rise time) in a GSR
+    signal. The same rule runs in two modes that give identical detections:
+    - detect_scrs(): vectorized over whole recordings, several sessions at
+      once (study analysis, gsr_features.py)
+    - SCRDetector: O(1) work per sample (live markers in integrated_code.py)
+
+DETECTION RULE (all integer arithmetic on ADC values, hence exact in both modes):
+    rise[i] = x[i] - x[i - window]    change of the window-sample moving sum
+    A Schmitt trigger on rise: a response starts when rise >= rise_on and
+    ends when rise <= rise_off (rise_off < rise_on, so noise around the
+    threshold does not split one response into several).
+    onset      last trough before the start: the latest sample at rest
+               (rise <= 0, not inside a response) - the moving sum is
+               lowest there
+    peak       first maximum of the moving sum between start and end
+    amplitude  (sum[peak] - sum[onset]) / window, kept if >= min_amplitude
+               (peak_value is the moving average at the peak)
+    rise time  time[peak] - time[onset]
+    A response is reported when it ends; one still rising when the data
+    stop is not reported.
+
+USAGE:
+    events = detect_scrs(times, values)                 # dict of arrays
+    events = detect_scrs(times, values, session_starts=[0, 3000, 6100])
+
+    detector = SCRDetector()
+    for t, x in samples:
+        event = detector.update(t, x)                   # dict or None
+        if event:
+            mark(event['peak_time'], event['amplitude'])
+
+NOTE:
+    Parameters are in samples and ADC units; the defaults suit the 10 Hz
+    text protocol. Values must be integers (raw or gsr_cleaning output).
+"""
+
+from collections import deque
+
+import numpy as np
+
+SCR_WINDOW = 5          # Samples in the moving sum
+SCR_RISE_ON = 10        # Rise over the window that starts a response
+SCR_RISE_OFF = -2       # Rise over the window that ends it
+SCR_MIN_AMPLITUDE = 20  # Smallest reported amplitude, GSR units
+EVENT_FIELDS = ['onset', 'peak', 'end', 'onset_time', 'peak_time', 'peak_value',
+                'amplitude', 'rise_time', 'session']
+FLOAT_FIELDS = {'onset_time', 'peak_time', 'peak_value', 'amplitude', 'rise_time'}
+
+
+def _as_ints(values):
+    values = np.asarray(values)
+    if values.dtype.kind == 'f':
+        values = np.rint(values)
+    return values.astype(np.int64)
+
+
+def detect_scrs(times, values, session_starts=None, window=SCR_WINDOW,
+                rise_on=SCR_RISE_ON, rise_off=SCR_RISE_OFF,
+                min_amplitude=SCR_MIN_AMPLITUDE):
+    """
+    SCRs in one signal or several concatenated sessions (session_starts =
+    index of each session's first sample). Nothing carries over between
+    sessions.
+
+    Returns: dict of equal-length arrays (EVENT_FIELDS); indices refer to
+    the concatenated input.
+    """
+    if rise_off >= rise_on:
+        raise ValueError("rise_off must be below rise_on")
+    times = np.asarray(times, dtype=np.float64)
+    x = _as_ints(values)
+    n = len(x)
+    starts = np.asarray([0] if session_starts is None else session_starts, dtype=np.int64)
+    lengths = np.diff(np.append(starts, n))
+    session = np.repeat(np.arange(len(starts)), lengths)
+    local = np.arange(n) - starts[session]
+
+    # Moving sum within each session and its change
+    csum = np.concatenate(([0], np.cumsum(x)))
+    idx = np.arange(n)
+    valid_sum = local >= window - 1
+    moving = np.zeros(n, np.int64)
+    moving[valid_sum] = csum[idx[valid_sum] + 1] - csum[idx[valid_sum] + 1 - window]
+    valid = local >= window
+    rise = np.zeros(n, np.int64)
+    rise[valid] = x[valid] - x[idx[valid] - window]
+
+    # Schmitt trigger: inside a response when the last "on" is after the last "off"
+    on = valid & (rise >= rise_on)
+    off = (valid & (rise <= rise_off)) | (local == 0)
+    last_on = np.maximum.accumulate(np.where(on, idx, -1))
+    last_off = np.maximum.accumulate(np.where(off, idx, -1))
+    active = last_on > last_off
+
+    edges = np.diff(np.concatenate(([False], active, [False])).astype(np.int8))
+    begin = np.flatnonzero(edges == 1)
+    end = np.flatnonzero(edges == -1)  # First sample after the response
+    # The ending sample must exist and belong to the same session
+    done = (end < n)
+    done[done] = session[end[done]] == session[begin[done]]
+    begin, end = begin[done], end[done]
+    if len(begin) == 0:
+        return {name: np.empty(0, np.float64 if name in FLOAT_FIELDS else np.int64)
+                for name in EVENT_FIELDS}
+
+    # Onset: latest rest sample before the start (or the first full window)
+    rest = (valid & (rise <= 0) & ~active) | (local == window - 1)
+    last_rest = np.maximum.accumulate(np.where(rest, idx, -1))
+    onset = last_rest[begin - 1]
+
+    # Peak: first maximum of the moving sum over begin..end inclusive
+    span = end + 1 - begin
+    first = np.cumsum(span) - span
+    span_idx = np.arange(span.sum()) - np.repeat(first - begin, span)
+    span_sum = moving[span_idx]
+    peak_value = np.maximum.reduceat(span_sum, first)
+    candidates = np.where(span_sum == np.repeat(peak_value, span), span_idx, n)
+    peak = np.minimum.reduceat(candidates, first)
+
+    amplitude_sum = moving[peak] - moving[onset]
+    keep = amplitude_sum >= min_amplitude * window
+    onset, peak, end = onset[keep], peak[keep], end[keep]
+    return {
+        'onset': onset,
+        'peak': peak,
+        'end': end,
+        'onset_time': times[onset],
+        'peak_time': times[peak],
+        'peak_value': moving[peak] / window,
+        'amplitude': amplitude_sum[keep] / window,
+        'rise_time': times[peak] - times[onset],
+        'session': session[peak],
+    }
+
+
+class SCRDetector:
+    """Streaming form of detect_scrs(): constant work per sample"""
+
+    def __init__(self, window=SCR_WINDOW, rise_on=SCR_RISE_ON, rise_off=SCR_RISE_OFF,
+                 min_amplitude=SCR_MIN_AMPLITUDE):
+        if rise_off >= rise_on:
+            raise ValueError("rise_off must be below rise_on")
+        self.window = window
+        self.rise_on = rise_on
+        self.rise_off = rise_off
+        self.min_amplitude = min_amplitude
+        self.reset()
+
+    def reset(self):
+        """Start a new session"""
+        self.index = -1
+        self.count = 0
+        self._recent = deque(maxlen=self.window + 1)
+        self._sum = 0
+        self._active = False
+        self._rest = None  # (index, time, moving sum)
+        self._peak = None
+
+    def update(self, t, value):
+        """Add one sample; returns the SCR it completes (dict) or None"""
+        x = int(round(value))
+        self.index += 1
+        i = self.index
+        self._recent.append(x)
+        self._sum += x
+        if len(self._recent) > self.window:
+            self._sum -= self._recent[0]
+        if i < self.window - 1:
+            return None
+        if i == self.window - 1:
+            self._rest = (i, t, self._sum)
+            return None
+
+        rise = x - self._recent[0]
+        if not self._active:
+            if rise >= self.rise_on:
+                self._active = True
+                self._onset = self._rest
+                self._peak = (i, t, self._sum)
+            elif rise <= 0:
+                self._rest = (i, t, self._sum)
+            return None
+
+        if self._sum > self._peak[2]:
+            self._peak = (i, t, self._sum)
+        if rise > self.rise_off:
+            return None
+
+        # Response over
+        self._active = False
+        if rise <= 0:
+            self._rest = (i, t, self._sum)
+        onset_i, onset_t, onset_sum = self._onset
+        peak_i, peak_t, peak_sum = self._peak
+        if peak_sum - onset_sum < self.min_amplitude * self.window:
+            return None
+        self.count += 1
+        return {'onset': onset_i, 'peak': peak_i, 'end': i,
+                'onset_time': onset_t, 'peak_time': peak_t,
+                'peak_value': peak_sum / self.window,
+                'amplitude': (peak_sum - onset_sum) / self.window,
+                'rise_time': peak_t - onset_t}
+
+    def extend(self, times, values):
+        """Add samples; returns the list of completed SCRs"""
+        events = []
+        for t, x in zip(np.asarray(times).tolist(), np.asarray(values).tolist()):
+            event = self.update(t, x)
+            if event:
+                events.append(event)
+        return events
@@ -0,0 +1,344 @@
+"""
+Columnar Binary Session Store (.gsrc)
+
+PURPOSE:
+    Every GSR session is CSV text. Each analysis script re-parses the
+    floats with pandas, and Phase/State strings repeat on every row. A
+    .gsrc file keeps the same table as typed binary columns behind a small
+    JSON header. Sessions open with one mmap, so loading costs microseconds
+    instead of a CSV parse.
+    - integer columns (GSR Value, Seq, Gap): uint16 when they fit, else int64
+    - float columns (Time (s), processed values): float64
+    - text columns (Phase, State): run-length encoded segments
+    - blank cells (Device Time/Seq of old firmware): null bitmap
+    Conversion is lossless: writing a .gsrc back out reproduces the original
+    CSV byte for byte, and the converter checks that before keeping a file.
+
+FILE LAYOUT:
+    b"GSRCOL1\\0", u32 header length, header JSON, zero padding to 64 bytes,
+    then one 64-byte aligned block per array. Each column in the header
+    stores its kind, dtype and the offset/count of its blocks, relative to
+    the data start.
+
+USAGE:
+    python gsr_store.py to-gsrc [GSR-data ...]    # convert every CSV found
+    python gsr_store.py to-csv file.gsrc [out.csv]
+    python gsr_store.py info file.gsrc
+
+    from gsr_store import load_session, open_session
+    data = load_session("GSR-data/gsr_20251030_163147.csv")  # uses .gsrc if fresh
+    times, values = data['Time (s)'], data['GSR Value']
+
+    session = open_session("....gsrc")     # zero-copy typed views
+    session.column('GSR Value')            # uint16 memmap view
+    session.segments('Phase')              # [(start_row, end_row, 'Baseline'), ...]
+"""
+
+import csv
+import io
+import json
+import os
+import re
+import struct
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+MAGIC = b"GSRCOL1\0"
+ALIGN = 64
+INT_PATTERN = re.compile(r'-?\d+')
+
+
+def gsrc_path(csv_path):
+    return str(Path(csv_path).with_suffix('.gsrc'))
+
+
+def _align(n):
+    return (n + ALIGN - 1) // ALIGN * ALIGN
+
+
+# ===== WRITING =====
+
+def _classify(texts):
+    """
+    Pick the smallest lossless encoding for one column of CSV strings.
+    Returns: (column header dict, {block name: array})
+    """
+    blank = texts == ''
+    filled = texts[~blank]
+    blocks = {}
+    if blank.any():
+        blocks['nulls'] = np.packbits(blank)
+
+    as_list = filled.tolist()
+    if all(INT_PATTERN.fullmatch(t) for t in as_list):
+        ints = np.zeros(len(texts), dtype=np.int64)
+        ints[~blank] = [int(t) for t in as_list]
+        if [str(v) for v in ints[~blank].tolist()] == as_list:
+            fits = len(ints) == 0 or (ints.min() >= 0 and ints.max() <= 0xFFFF)
+            blocks['values'] = ints.astype(np.uint16) if fits else ints
+            return {'kind': 'int'}, blocks
+
+    try:
+        floats = np.full(len(texts), np.nan)
+        floats[~blank] = [float(t) for t in as_list]
+        if [repr(v) for v in floats[~blank].tolist()] == as_list:
+            blocks['values'] = floats
+            return {'kind': 'float'}, blocks
+    except ValueError:
+        pass
+
+    # Text: run-length encode
+    blocks.pop('nulls', None)
+    change = np.ones(len(texts), dtype=bool)
+    change[1:] = texts[1:] != texts[:-1]
+    starts = np.flatnonzero(change)
+    categories, codes = np.unique(texts[starts], return_inverse=True)
+    blocks['starts'] = starts.astype(np.int64)
+    blocks['codes'] = codes.astype(np.uint16)
+    return {'kind': 'rle', 'categories': categories.tolist()}, blocks
+
+
+def _line_terminator(path):
+    with open(path, 'rb') as f:
+        first = f.readline()
+    return '\r\n' if first.endswith(b'\r\n') else '\n'
+
+
+def write_gsrc(table, path, line_terminator='\n'):
+    """
+    Write a table of CSV strings ({column name: array of str}, in order)
+    as a .gsrc file.
+    """
+    names = list(table)
+    rows = len(table[names[0]]) if names else 0
+    columns = []
+    payload = []  # (relative offset, bytes)
+    offset = 0
+    for name in names:
+        info, blocks = _classify(np.asarray(table[name], dtype=object).astype(str))
+        info['name'] = name
+        for block_name, array in blocks.items():
+            data = np.ascontiguousarray(array).tobytes()
+            info[block_name] = {'offset': offset, 'count': len(array),
+                                'dtype': array.dtype.str}
+            payload.append((offset, data))
+            offset = _align(offset + len(data))
+        columns.append(info)
+
+    header = json.dumps({'version': 1, 'rows': rows, 'line_terminator': line_terminator,
+                         'columns': columns}).encode('utf-8')
+    data_start = _align(len(MAGIC) + 4 + len(header))
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(MAGIC + struct.pack('<I', len(header)) + header)
+        for block_offset, data in payload:
+            f.write(b'\0' * (data_start + block_offset - f.tell()))
+            f.write(data)
+    os.replace(tmp, path)
+
+
+def read_csv_text(csv_path):
+    """Read a CSV as strings exactly as written, column by column"""
+    df = pd.read_csv(csv_path, dtype=str, keep_default_na=False)
+    return {name: df[name].values for name in df.columns}
+
+
+def csv_to_gsrc(csv_path, out_path=None, verify=True):
+    """
+    Convert one CSV to .gsrc. With verify=True the .gsrc is written back to
+    CSV in memory and must match the original bytes, else it is removed
+    and ValueError is raised.
+    """
+    out_path = out_path or gsrc_path(csv_path)
+    write_gsrc(read_csv_text(csv_path), out_path, _line_terminator(csv_path))
+    if verify:
+        with open(csv_path, 'rb') as f:
+            original = f.read()
+        if open_session(out_path).to_csv_bytes() != original:
+            os.remove(out_path)
+            raise ValueError(f"{csv_path}: round trip is not byte-identical")
+    return out_path
+
+
+# ===== READING =====
+
+class GSRSession:
+    """Memory-mapped .gsrc file"""
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._map = np.memmap(self.path, dtype=np.uint8, mode='r')
+        prefix = bytes(self._map[:len(MAGIC) + 4])
+        if prefix[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path}: not a .gsrc file")
+        header_len, = struct.unpack_from('<I', prefix, len(MAGIC))
+        start = len(MAGIC) + 4
+        self.header = json.loads(bytes(self._map[start:start + header_len]).decode('utf-8'))
+        self._data_start = _align(start + header_len)
+        self._columns = {c['name']: c for c in self.header['columns']}
+
+    def __len__(self):
+        return self.header['rows']
+
+    @property
+    def columns(self):
+        return list(self._columns)
+
+    def __contains__(self, name):
+        return name in self._columns
+
+    def _block(self, info):
+        dtype = np.dtype(info['dtype'])
+        start = self._data_start + info['offset']
+        return self._map[start:start + info['count'] * dtype.itemsize].view(dtype)
+
+    def nulls(self, name):
+        """Boolean mask of blank cells, or None if the column has none"""
+        info = self._columns[name]
+        if 'nulls' not in info:
+            return None
+        return np.unpackbits(self._block(info['nulls']), count=len(self)).astype(bool)
+
+    def column(self, name):
+        """
+        Stored values: a zero-copy read-only view for int/float columns
+        (blank cells hold 0 / NaN), category codes expanded for text columns.
+        """
+        info = self._columns[name]
+        if info['kind'] != 'rle':
+            return self._block(info['values'])
+        starts = self._block(info['starts'])
+        lengths = np.diff(np.append(starts, len(self)))
+        return np.repeat(self._block(info['codes']), lengths)
+
+    def segments(self, name):
+        """Runs of a text column as [(start_row, end_row, value), ...]"""
+        info = self._columns[name]
+        starts = self._block(info['starts']).tolist()
+        codes = self._block(info['codes']).tolist()
+        ends = starts[1:] + [len(self)]
+        return [(s, e, info['categories'][c]) for s, e, c in zip(starts, ends, codes)]
+
+    def values(self, name, start=0, end=None):
+        """Column (or rows start..end of it) as pandas.read_csv would return it"""
+        info = self._columns[name]
+        if info['kind'] == 'rle':
+            categories = np.array(info['categories'], dtype=object)
+            return categories[self.column(name)[start:end]]
+        values = self.column(name)[start:end]
+        nulls = self.nulls(name)
+        if nulls is not None:
+            nulls = nulls[start:end]
+        if info['kind'] == 'int':
+            if nulls is None:
+                return values.astype(np.int64)
+            values = values.astype(np.float64)
+            values[nulls] = np.nan
+        return values
+
+    def text(self, name):
+        """Column as the original CSV strings"""
+        info = self._columns[name]
+        if info['kind'] == 'rle':
+            return self.values(name).tolist()
+        fmt = str if info['kind'] == 'int' else repr
+        texts = [fmt(v) for v in self.column(name).tolist()]
+        nulls = self.nulls(name)
+        if nulls is not None:
+            for i in np.flatnonzero(nulls).tolist():
+                texts[i] = ''
+        return texts
+
+    def to_csv_bytes(self):
+        out = io.StringIO(newline='')
+        writer = csv.writer(out, lineterminator=self.header['line_terminator'])
+        writer.writerow(self.columns)
+        writer.writerows(zip(*(self.text(name) for name in self.columns)))
+        return out.getvalue().encode('utf-8')
+
+    def write_csv(self, path):
+        with open(path, 'wb') as f:
+            f.write(self.to_csv_bytes())
+
+
+def open_session(path):
+    return GSRSession(path)
+
+
+def load_session(path, columns=None):
+    """
+    Load a session as {column: array} with the dtypes pandas would give.
+    A .csv path uses its sibling .gsrc when that is at least as new; float
+    text is parsed exactly (round trip) either way, so both give the same
+    numbers. This is not pandas' default parser, which can be off by an
+    ulp, so results differ from a plain pd.read_csv() in the last digits.
+    """
+    path = str(path)
+    gsrc = path if path.endswith('.gsrc') else gsrc_path(path)
+    if os.path.exists(gsrc) and (gsrc == path or os.path.getmtime(gsrc) >= os.path.getmtime(path)):
+        session = GSRSession(gsrc)
+        return {name: session.values(name) for name in (columns or session.columns)}
+
+    df = pd.read_csv(path, usecols=columns, float_precision='round_trip')
+    return {name: df[name].values for name in df.columns}
+
+
+# ===== COMMAND LINE =====
+
+def _csv_files(paths):
+    for p in map(Path, paths):
+        if p.is_dir():
+            yield from sorted(p.rglob('*.csv'))
+        else:
+            yield p
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] not in ('to-gsrc', 'to-csv', 'info'):
+        print(__doc__)
+        return
+    command, args = sys.argv[1], sys.argv[2:]
+
+    if command == 'to-gsrc':
+        converted = skipped = failed = 0
+        csv_bytes = gsrc_bytes = 0
+        for csv_file in _csv_files(args or ['GSR-data']):
+            out = gsrc_path(csv_file)
+            if os.path.exists(out) and os.path.getmtime(out) >= os.path.getmtime(csv_file):
+                skipped += 1
+                continue
+            try:
+                csv_to_gsrc(str(csv_file), out)
+            except (ValueError, KeyError, pd.errors.ParserError) as e:
+                print(f"  ✗ {csv_file}: {e}")
+                failed += 1
+                continue
+            converted += 1
+            csv_bytes += os.path.getsize(csv_file)
+            gsrc_bytes += os.path.getsize(out)
+        print(f"Converted {converted}, up to date {skipped}, failed {failed}")
+        if converted:
+            print(f"  CSV {csv_bytes / 1e6:.2f} MB → gsrc {gsrc_bytes / 1e6:.2f} MB")
+
+    elif command == 'to-csv':
+        source = args[0]
+        out = args[1] if len(args) > 1 else str(Path(source).with_suffix('.csv'))
+        open_session(source).write_csv(out)
+        print(f"✓ Wrote {out}")
+
+    elif command == 'info':
+        start = time.perf_counter()
+        session = open_session(args[0])
+        opened = (time.perf_counter() - start) * 1e6
+        print(f"{args[0]}: {len(session)} rows, opened in {opened:.0f} µs")
+        for c in session.header['columns']:
+            detail = c['values']['dtype'] if 'values' in c else f"{len(c['categories'])} values, {c['starts']['count']} runs"
+            print(f"  {c['name']:<18} {c['kind']:<6} {detail}{' (has blanks)' if 'nulls' in c else ''}")
+
+
+if __name__ == "__main__":
+    main()
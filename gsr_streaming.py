@@ -0,0 +1,362 @@
+"""
+Streaming, Chunked GSR Cleaning for Long Recordings
+
+PURPOSE:
+    process_file() loads a whole recording and holds the original, filtered
+    and resampled copies at once. That is fine for a 5 minute trial, but not
+    for multi-hour or high-rate recordings. This module runs the same
+    pipeline as a chain of generators over fixed-size chunks. Peak memory
+    is bounded by the chunk size, and the output is bit-identical to
+    remove_spikes() + resample_uniform() on the whole recording:
+    1. median_filter_chunks() - medfilt with kernel_size // 2 samples of
+       overlap carried across chunk edges (zero padding only at the real
+       start and end, as medfilt does)
+    2. despike_chunks() - the rate-of-change mask continues from the last
+       filtered sample. Spikes are held back until the next good sample
+       arrives, so they are filled from the same pair of good samples as in
+       the in-memory version. Trailing spikes are extrapolated at the end.
+    3. resample_chunks() - the linspace grid is generated piecewise with
+       numpy's own arithmetic, and each grid point is interpolated as soon
+       as the samples around it are final
+
+USAGE:
+    from gsr_streaming import process_stream
+    stats = process_stream("GSR-data/gsr_....csv", "processed.csv", chunk_size=65536)
+
+    # or chain the stages yourself
+    chunks = read_chunks(path, chunk_size=65536)
+    cleaned = despike_chunks(median_filter_chunks(chunks), counts={})
+    for times, values in resample_chunks(cleaned, stop=last_time(path)):
+        ...
+
+    python gsr_streaming.py --verify [files...]   # compare with the in-memory path
+"""
+
+import argparse
+import csv
+import io
+import os
+import sys
+import time
+import warnings
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from scipy.signal import medfilt
+
+from gsr_cleaning import (MEDIAN_FILTER_SIZE, RATE_CHANGE_THRESHOLD, TARGET_SAMPLE_RATE,
+                          interp_linear, remove_spikes, resample_uniform, spike_mask)
+from gsr_store import GSRSession, gsrc_path
+
+CHUNK_SIZE = 65536  # Samples per chunk
+TIME_COLUMN = 'Time (s)'
+VALUE_COLUMN = 'GSR Value'
+
+
+# ===== INPUT =====
+
+def _fresh_gsrc(path):
+    """Sibling .gsrc of a CSV if load_session() would use it, else None"""
+    path = str(path)
+    gsrc = path if path.endswith('.gsrc') else gsrc_path(path)
+    if os.path.exists(gsrc) and (gsrc == path or os.path.getmtime(gsrc) >= os.path.getmtime(path)):
+        return gsrc
+    return None
+
+
+def read_chunks(path, chunk_size=CHUNK_SIZE):
+    """
+    (times, values) chunks of a recording, with the dtypes load_session()
+    gives. A fresh .gsrc is sliced from its memory map; a CSV is parsed
+    chunk by chunk.
+    """
+    gsrc = _fresh_gsrc(path)
+    if gsrc:
+        session = GSRSession(gsrc)
+        for start in range(0, len(session), chunk_size):
+            end = start + chunk_size
+            yield (session.values(TIME_COLUMN, start, end),
+                   session.values(VALUE_COLUMN, start, end))
+        return
+
+    reader = pd.read_csv(path, usecols=[TIME_COLUMN, VALUE_COLUMN],
+                         float_precision='round_trip', chunksize=chunk_size)
+    with reader:
+        for df in reader:
+            yield df[TIME_COLUMN].values, df[VALUE_COLUMN].values
+
+
+def last_time(path, tail_bytes=4096):
+    """Time of the last sample, read from the end of the file only"""
+    gsrc = _fresh_gsrc(path)
+    if gsrc:
+        return float(GSRSession(gsrc).column(TIME_COLUMN)[-1])
+
+    with open(path, 'rb') as f:
+        header = next(csv.reader([f.readline().decode('utf-8')]))
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        f.seek(max(0, size - tail_bytes))
+        lines = [line for line in f.read().decode('utf-8').splitlines() if line.strip()]
+    if size <= tail_bytes:
+        lines = lines[1:]  # The whole file was read, header included
+    if not lines:
+        raise ValueError(f"{path}: no samples")
+    row = next(csv.reader([lines[-1]]))
+    return float(row[header.index(TIME_COLUMN)])
+
+
+# ===== PIPELINE STAGES =====
+
+def _medfilt(window, kernel_size):
+    with warnings.catch_warnings():
+        # Short windows at the ends are zero-padded, exactly as intended
+        warnings.simplefilter('ignore', UserWarning)
+        return medfilt(window, kernel_size=kernel_size)
+
+
+def median_filter_chunks(chunks, kernel_size=MEDIAN_FILTER_SIZE):
+    """medfilt over a chunked stream; output chunks lag by kernel_size // 2"""
+    half = kernel_size // 2
+    left = None        # Last `half` raw values already filtered (left context)
+    pend_t = pend_v = None
+
+    for times, values in chunks:
+        values = np.asarray(values)
+        if pend_v is None:
+            pend_t, pend_v = np.asarray(times), values
+            left = values[:0]
+        else:
+            pend_t = np.concatenate((pend_t, times))
+            pend_v = np.concatenate((pend_v, values))
+
+        ready = len(pend_v) - half  # Samples with their full right context
+        if ready <= 0:
+            continue
+        window = np.concatenate((left, pend_v))
+        filtered = _medfilt(window, kernel_size)[len(left):len(left) + ready]
+        yield pend_t[:ready], filtered
+        left = window[:len(left) + ready][-half:] if half else window[:0]
+        pend_t, pend_v = pend_t[ready:], pend_v[ready:]
+
+    if pend_v is not None and len(pend_v):
+        window = np.concatenate((left, pend_v))
+        yield pend_t, _medfilt(window, kernel_size)[len(left):]
+
+
+def despike_chunks(chunks, threshold=RATE_CHANGE_THRESHOLD, counts=None):
+    """
+    Rate-of-change spike filling over a stream of median-filtered chunks.
+    counts (a dict) receives 'samples' and 'spikes' totals.
+    """
+    counts = {} if counts is None else counts
+    counts['samples'] = counts['spikes'] = 0
+    prev = None                                 # Last filtered value, for the mask
+    good_x = np.empty(0, np.float64)            # Last two good (index, value) pairs
+    good_v = None
+    held_t = held_v = None                      # Samples from the first unfilled spike on
+    base = 0                                    # Global index of held_t[0]
+
+    for times, values in chunks:
+        n = len(values)
+        if n == 0:
+            continue
+        mask = spike_mask(values if prev is None else np.concatenate(([prev], values)),
+                          threshold)
+        mask = mask if prev is None else mask[1:]
+        prev = values[-1]
+        counts['spikes'] += int(np.count_nonzero(mask))
+        counts['samples'] += n
+
+        if held_v is None:
+            held_t, held_v = np.asarray(times), values.copy()
+            held_mask = mask
+        else:
+            held_t = np.concatenate((held_t, times))
+            held_v = np.concatenate((held_v, values))
+            held_mask = np.concatenate((np.ones(held_count, bool), mask))
+
+        good = np.flatnonzero(~held_mask)
+        if good_v is None:
+            good_v = held_v[:0]
+        if len(good) == 0:
+            held_count = len(held_v)
+            continue
+
+        # Everything up to the last good sample can be finalised now
+        ready = good[-1] + 1
+        spikes = np.flatnonzero(held_mask[:ready])
+        if len(spikes):
+            xp = np.concatenate((good_x, (base + good).astype(np.float64)))
+            fp = np.concatenate((good_v, held_v[good]))
+            held_v[spikes] = interp_linear((base + spikes).astype(np.float64), xp, fp)
+        good_x = np.concatenate((good_x, (base + good[-2:]).astype(np.float64)))[-2:]
+        good_v = np.concatenate((good_v, held_v[good[-2:]]))[-2:]
+
+        yield held_t[:ready], held_v[:ready]
+        held_t, held_v = held_t[ready:], held_v[ready:]
+        held_count = len(held_v)
+        base += ready
+
+    if held_v is not None and len(held_v):
+        # Trailing spikes: extrapolate from the last two good samples
+        if len(good_x) > 1:
+            held_v[:] = interp_linear(np.arange(base, base + len(held_v), dtype=np.float64),
+                                      good_x, good_v)
+        yield held_t, held_v
+
+
+def grid_points(start, stop, num, i0, i1):
+    """Points i0..i1 of np.linspace(start, stop, num), computed the same way"""
+    if num == 1:
+        return np.arange(i0, i1, dtype=np.float64) * (stop - start) + start
+    div = num - 1
+    delta = np.subtract(stop, start, dtype=np.float64)
+    step = delta / div
+    y = np.arange(i0, i1, dtype=np.float64)
+    if step == 0:
+        y = y / div * delta  # linspace's denormal branch
+    else:
+        y = y * step
+    y += start
+    if i1 == num and i1 > i0:
+        y[-1] = stop
+    return y
+
+
+def resample_chunks(chunks, stop, target_hz=TARGET_SAMPLE_RATE):
+    """
+    Uniform resampling of a cleaned stream whose last time is stop. Grid
+    points are emitted once both samples around them are known.
+    """
+    start = num = None
+    done = 0                      # Grid points emitted
+    carry_t = carry_v = None      # Last two samples of the previous chunk
+
+    for times, values in chunks:
+        if len(times) == 0:
+            continue
+        if carry_t is None:
+            carry_t, carry_v = times[:0], values[:0]
+        xp = np.concatenate((carry_t, times))
+        fp = np.concatenate((carry_v, values))
+        carry_t, carry_v = xp[-2:], fp[-2:]
+        if len(xp) < 2:
+            continue
+        if start is None:
+            start = xp[0]
+            num = int((stop - start) * target_hz) + 1
+
+        # Grid points up to the newest sample (at least the one at start)
+        grid_end = done
+        while grid_end < num:
+            end = min(num, grid_end + max(1024, len(xp)))
+            block = grid_points(start, stop, num, grid_end, end)
+            covered = int(np.searchsorted(block, xp[-1], side='right'))
+            grid_end += covered
+            if covered < len(block):
+                break
+        if grid_end > done:
+            x = grid_points(start, stop, num, done, grid_end)
+            yield x, interp_linear(x, xp, fp)
+            done = grid_end
+
+    if carry_t is None:
+        return
+    if start is None:
+        # Fewer than two samples: resample_uniform() returns them unchanged
+        yield carry_t, carry_v
+        return
+    if done < num:
+        x = grid_points(start, stop, num, done, num)
+        yield x, interp_linear(x, carry_t, carry_v)
+
+
+# ===== WHOLE FILES =====
+
+def process_stream(path, output_file, chunk_size=CHUNK_SIZE, target_hz=TARGET_SAMPLE_RATE):
+    """
+    Clean and resample one recording chunk by chunk, appending to output_file
+    as CSV (same bytes as the in-memory pipeline written with pandas).
+
+    Returns: dict with samples, spikes, final_samples, duration, mean_gsr, std_gsr
+    """
+    counts = {}
+    stop = last_time(path)
+    stages = resample_chunks(
+        despike_chunks(median_filter_chunks(read_chunks(path, chunk_size)), counts=counts),
+        stop, target_hz)
+
+    final = 0
+    total = total_sq = 0.0
+    last_t = None
+    tmp = str(output_file) + '.tmp'
+    with open(tmp, 'w', newline='') as f:
+        header = True
+        for times, values in stages:
+            pd.DataFrame({TIME_COLUMN: times, VALUE_COLUMN: values}).to_csv(
+                f, index=False, header=header)
+            header = False
+            final += len(values)
+            total += float(np.sum(values, dtype=np.float64))
+            total_sq += float(np.sum(np.square(values, dtype=np.float64)))
+            last_t = times[-1]
+        if header:
+            pd.DataFrame({TIME_COLUMN: [], VALUE_COLUMN: []}).to_csv(f, index=False)
+    os.replace(tmp, output_file)
+
+    mean = total / final if final else float('nan')
+    return {
+        'samples': counts.get('samples', 0),
+        'spikes': counts.get('spikes', 0),
+        'final_samples': final,
+        'duration': last_t,
+        'mean_gsr': mean,
+        'std_gsr': float(np.sqrt(max(0.0, total_sq / final - mean ** 2))) if final else float('nan'),
+    }
+
+
+def _in_memory_csv(path):
+    data = pd.read_csv(path, usecols=[TIME_COLUMN, VALUE_COLUMN], float_precision='round_trip')
+    times, values, spikes = remove_spikes(data[TIME_COLUMN].values, data[VALUE_COLUMN].values)
+    times, values = resample_uniform(times, values, TARGET_SAMPLE_RATE)
+    out = io.StringIO()
+    pd.DataFrame({TIME_COLUMN: times, VALUE_COLUMN: values}).to_csv(out, index=False)
+    return out.getvalue(), spikes
+
+
+def verify(paths, chunk_sizes=(1, 2, 3, 7, 100, 4096, CHUNK_SIZE)):
+    """Compare streamed output with the in-memory pipeline, byte for byte"""
+    ok = True
+    tmp = Path(os.environ.get('TMPDIR', '/tmp')) / f"gsr_stream_verify_{os.getpid()}.csv"
+    for path in paths:
+        expected, spikes = _in_memory_csv(path)
+        for chunk_size in chunk_sizes:
+            start = time.perf_counter()
+            stats = process_stream(path, tmp, chunk_size)
+            elapsed = time.perf_counter() - start
+            same = tmp.read_text() == expected and stats['spikes'] == spikes
+            ok &= same
+            print(f"  {'✓' if same else '✗'} {Path(path).name} chunk={chunk_size:<6} "
+                  f"{stats['final_samples']:>7} samples {elapsed * 1000:7.1f} ms")
+    if tmp.exists():
+        tmp.unlink()
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streaming GSR cleaning")
+    parser.add_argument('--verify', action='store_true',
+                        help="Check streamed output against the in-memory pipeline")
+    parser.add_argument('files', nargs='*')
+    args = parser.parse_args()
+    if not args.verify:
+        parser.print_help()
+        return
+    files = args.files or sorted(str(p) for p in Path('GSR-data').glob('gsr_*.csv'))
+    sys.exit(0 if verify(files) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Device Timebase for GSR Samples
+
+PURPOSE:
+    The ESP32 stamps every GSR sample with millis() and a sequence number.
+    This module turns those into a trustworthy host timebase:
+    1. ClockSync estimates the offset and drift between the ESP32 clock and
+       the host clock from sample arrival times
+    2. GapDetector finds dropped or merged samples from sequence numbers
+
+METHOD:
+    Serial delivery only ever adds delay, so for each block of a few
+    seconds the sample with the smallest (arrival - device time) is the one
+    that arrived fastest. A straight line through those block minima gives
+    host_time = device_time + offset + drift * device_time. The offset
+    includes the minimum USB/serial latency, which cannot be separated
+    without a round trip.
+
+USAGE:
+    from gsr_timebase import ClockSync, GapDetector
+
+    clock = ClockSync()
+    gaps = GapDetector()
+    for each sample:
+        clock.add(device_ms, arrival_time)
+        missing = gaps.check(seq)
+    host_time = clock.to_host(device_ms)
+
+    ClockSync is thread-safe: GSRReader add()s on its thread while the
+    session writer calls to_host() on another.
+"""
+
+import threading
+from collections import deque
+
+import numpy as np
+
+
+class ClockSync:
+    """Online offset + drift estimate between device millis() and host time"""
+
+    def __init__(self, block_seconds=5.0, max_blocks=240):
+        self.block_seconds = block_seconds
+        self.blocks = deque(maxlen=max_blocks)  # (device_s, min offset)
+        self._block_start = None
+        self._best = None
+        self._fit = None
+        self._lock = threading.Lock()
+
+    def add(self, device_ms, arrival_time):
+        """Add one sample's device time (ms) and host arrival time (s)"""
+        device_s = device_ms / 1000.0
+        offset = arrival_time - device_s
+
+        with self._lock:
+            if self._block_start is None or device_s - self._block_start >= self.block_seconds:
+                if self._best is not None:
+                    self.blocks.append(self._best)
+                self._block_start = device_s
+                self._best = None
+            elif device_s < self._block_start:
+                # Device clock went backwards - ESP32 was reset
+                self._clear()
+                self._block_start = device_s
+
+            if self._best is None or offset < self._best[1]:
+                self._best = (device_s, offset)
+                self._fit = None
+
+    def reset(self):
+        with self._lock:
+            self._clear()
+
+    def _clear(self):
+        self.blocks.clear()
+        self._block_start = None
+        self._best = None
+        self._fit = None
+
+    def fit(self):
+        """Return (offset, drift) so host = device + offset + drift * device"""
+        with self._lock:
+            if self._fit is not None:
+                return self._fit
+
+            points = list(self.blocks)
+            if self._best is not None:
+                points.append(self._best)
+            if not points:
+                return 0.0, 0.0
+            if len(points) == 1:
+                self._fit = (points[0][1], 0.0)
+                return self._fit
+
+            # Least-squares line through the block minima (at most max_blocks + 1)
+            n = len(points)
+            mean_x = sum(p[0] for p in points) / n
+            mean_y = sum(p[1] for p in points) / n
+            sxx = sum((p[0] - mean_x) ** 2 for p in points)
+            sxy = sum((p[0] - mean_x) * (p[1] - mean_y) for p in points)
+            drift = sxy / sxx if sxx > 0 else 0.0
+            self._fit = (mean_y - drift * mean_x, drift)
+            return self._fit
+
+    @property
+    def drift_ppm(self):
+        return self.fit()[1] * 1e6
+
+    def to_host(self, device_ms):
+        """Host time (s, same clock as the arrival times) of a device time"""
+        offset, drift = self.fit()
+        device_s = device_ms / 1000.0
+        return device_s + offset + drift * device_s
+
+
+class GapDetector:
+    """Counts samples missing between consecutive sequence numbers"""
+
+    def __init__(self, modulus=2 ** 32):
+        self.modulus = modulus
+        self.expected = None
+        self.dropped = 0
+        self.resets = 0
+
+    def check(self, seq):
+        """Return how many samples are missing right before seq"""
+        if self.expected is None:
+            self.expected = (seq + 1) % self.modulus
+            return 0
+
+        missing = (seq - self.expected) % self.modulus
+        self.expected = (seq + 1) % self.modulus
+        if missing > self.modulus // 2:
+            # Sequence went backwards - duplicate or ESP32 reset
+            self.resets += 1
+            return 0
+        self.dropped += missing
+        return missing
+
+    def check_many(self, seqs):
+        """Vectorized check() over an array of sequence numbers"""
+        seqs = np.asarray(seqs, dtype=np.int64)
+        if len(seqs) == 0:
+            return np.zeros(0, dtype=np.int64)
+        expected = np.empty_like(seqs)
+        expected[0] = seqs[0] if self.expected is None else self.expected
+        expected[1:] = (seqs[:-1] + 1) % self.modulus
+        missing = (seqs - expected) % self.modulus
+        backwards = missing > self.modulus // 2
+        self.resets += int(backwards.sum())
+        missing[backwards] = 0
+        self.expected = int(seqs[-1] + 1) % self.modulus
+        self.dropped += int(missing.sum())
+        return missing
+
+    def reset(self):
+        self.expected = None
+        self.dropped = 0
+        self.resets = 0
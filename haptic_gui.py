@@ -33,16 +33,22 @@ import serial
 import serial.tools.list_ports
 import tkinter as tk
 from tkinter import ttk
+import sys
 import time
-
-# Select port
-ports = list(serial.tools.list_ports.comports())
-print("Available ports:")
-for i, p in enumerate(ports):
-    print(f"{i}: {p}")
-
-port_num = int(input("Select port number: "))
-ser = serial.Serial(ports[port_num].device, 115200, timeout=0.01)
+from motor_scheduler import MotorCommandScheduler
+
+# Select port (or pass a device path, e.g. from esp32_emulator.py)
+if len(sys.argv) > 1:
+    port = sys.argv[1]
+else:
+    ports = list(serial.tools.list_ports.comports())
+    print("Available ports:")
+    for i, p in enumerate(ports):
+        print(f"{i}: {p}")
+
+    port_num = int(input("Select port number: "))
+    port = ports[port_num].device
+ser = serial.Serial(port, 115200, timeout=0.01)
 print("Waiting for ESP32...")
 time.sleep(2)
 print("Starting GUI...\n")
@@ -52,6 +58,11 @@ root = tk.Tk()
 root.title("6-Motor Haptic Control - Advanced")
 root.geometry("900x700")
 
+# mux_test.ino only understands full "CH:BPM:..." lines, so changed motors
+# are sent as one line each, batched into a single write per 50 ms
+motor_scheduler = MotorCommandScheduler(send=ser.write, schedule=root.after,
+                                        multi_frame=False)
+
 # Motor state variables
 motor_vars = []
 for i in range(6):
@@ -64,26 +75,30 @@ for i in range(6):
         'dub_enabled': tk.BooleanVar(value=True)
     })
 
+def effect_value(var):
+    """Effect number from an entry, or None while it is not a valid number"""
+    try:
+        return int(var.get())
+    except ValueError:
+        return None
+
 def update_motor(ch):
-    """Send motor configuration to ESP32"""
+    """Queue motor configuration; motor_scheduler coalesces and sends it"""
     if not motor_vars[ch]['enabled'].get():
         # Motor off
-        ser.write(f"{ch}:0:0:0:0:0\n".encode())
+        motor_scheduler.set_motor(ch, 0, 0, 0, 0, 0)
     else:
         bpm = motor_vars[ch]['bpm'].get()
-        lub_effect = motor_vars[ch]['lub_effect'].get()
-        dub_effect = motor_vars[ch]['dub_effect'].get()
+        lub_effect = effect_value(motor_vars[ch]['lub_effect'])
+        dub_effect = effect_value(motor_vars[ch]['dub_effect'])
         lub_en = 1 if motor_vars[ch]['lub_enabled'].get() else 0
         dub_en = 1 if motor_vars[ch]['dub_enabled'].get() else 0
         
-        # Format: CH:BPM:LUB_EFFECT:DUB_EFFECT:LUB_EN:DUB_EN
-        cmd = f"{ch}:{bpm}:{lub_effect}:{dub_effect}:{lub_en}:{dub_en}\n"
-        ser.write(cmd.encode())
-        print(f"Motor {ch}: BPM={bpm}, Lub={lub_effect}({lub_en}), Dub={dub_effect}({dub_en})")
+        motor_scheduler.set_motor(ch, bpm, lub_effect, dub_effect, lub_en, dub_en)
 
 def sync_motors():
     """Synchronize all motors"""
-    ser.write(b"S\n")
+    motor_scheduler.sync()
     print("Motors synchronized!")
 
 # Header
@@ -214,6 +229,8 @@ sync_btn.pack()
 root.after(100, lambda: [update_motor(i) for i in range(6)])
 
 def on_closing():
+    motor_scheduler.flush()
+    print(f"Motor commands: {motor_scheduler.stats_text()}")
     ser.close()
     root.destroy()
 
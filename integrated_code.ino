@@ -12,9 +12,23 @@
  * SERIAL PROTOCOL:
  *   FROM PYTHON:
  *     - "CH:BPM:LUB:DUB:LUB_EN:DUB_EN" - Motor config
+ *     - "U<ch><fields>;<ch><fields>..." - Changed fields of several motors,
+ *       fields: B<bpm> L<lub effect> D<dub effect> l<lub en> d<dub en>
+ *       e.g. "U0B72;3B90D5" (sent by motor_scheduler.py)
  *     - "S" - Sync all motors
+ *   Commands are newline-terminated and read without blocking.
  *   TO PYTHON:
- *     - "G:value" - GSR reading (e.g., "G:2650")
+ *     - "G:seq:millis:value" - GSR reading (e.g., "G:1532:153200:2650")
+ *       seq counts up by one per sample so the host can detect drops
+ *
+ * BINARY FRAMES (set BINARY_FRAMES to 1, and BINARY_FRAMES = True in
+ * integrated_code.py):
+ *   GSR samples are sent in batches instead of "G:" lines. Text lines
+ *   (acks, "Synced") are still sent as text between frames.
+ *   Frame layout (little-endian, decoded by gsr_frames.py):
+ *     [0xA5 0x5A][seq u16][t_ms u32][n u8][interval_ms u8]
+ *     [n x 12-bit samples, packed 2 per 3 bytes][crc16 u16]
+ *   CRC is CRC-16/CCITT-FALSE over everything after the sync word.
  */
 
 #include <Wire.h>
@@ -40,9 +54,36 @@ struct MotorConfig {
 MotorConfig motors[6];
 const int lubDubDelay = 150;
 
+// Serial protocol: 0 = "G:value" text lines, 1 = binary frames
+#define BINARY_FRAMES 0
+
 // GSR timing
 unsigned long lastGSRSend = 0;
+#if BINARY_FRAMES
+const int GSR_INTERVAL = 10;   // Sample every 10ms (100Hz)
+const int GSR_AVG_READS = 4;   // Readings averaged per sample (no delay)
+const int GSR_AVG_DELAY = 0;
+#else
 const int GSR_INTERVAL = 100;  // Send GSR every 100ms (10Hz)
+const int GSR_AVG_READS = 10;
+const int GSR_AVG_DELAY = 5;
+#endif
+
+// Sample sequence number for "G:" lines
+unsigned long gsrSeq = 0;
+
+// Binary frame batching
+#define FRAME_SAMPLES 8
+#define FRAME_SIZE (10 + (FRAME_SAMPLES * 3 + 1) / 2 + 2)
+uint16_t frameSamples[FRAME_SAMPLES];
+uint8_t frameCount = 0;
+uint16_t frameSeq = 0;
+unsigned long frameStartMs = 0;
+
+// Serial command line buffer
+#define CMD_BUF_SIZE 160
+char cmdBuf[CMD_BUF_SIZE];
+int cmdLen = 0;
 
 void tcaselect(uint8_t i) {
   Wire.beginTransmission(TCAADDR);
@@ -50,6 +91,53 @@ void tcaselect(uint8_t i) {
   Wire.endTransmission();
 }
 
+uint16_t crc16_ccitt(const uint8_t *data, size_t len) {
+  uint16_t crc = 0xFFFF;
+  for (size_t i = 0; i < len; i++) {
+    crc ^= (uint16_t)data[i] << 8;
+    for (uint8_t b = 0; b < 8; b++) {
+      crc = (crc & 0x8000) ? (crc << 1) ^ 0x1021 : crc << 1;
+    }
+  }
+  return crc;
+}
+
+void sendFrame() {
+  uint8_t buf[FRAME_SIZE];
+  buf[0] = 0xA5;
+  buf[1] = 0x5A;
+  buf[2] = frameSeq & 0xFF;
+  buf[3] = frameSeq >> 8;
+  buf[4] = frameStartMs & 0xFF;
+  buf[5] = (frameStartMs >> 8) & 0xFF;
+  buf[6] = (frameStartMs >> 16) & 0xFF;
+  buf[7] = (frameStartMs >> 24) & 0xFF;
+  buf[8] = FRAME_SAMPLES;
+  buf[9] = GSR_INTERVAL;
+
+  // Pack two 12-bit samples into three bytes
+  int pos = 10;
+  for (int i = 0; i < FRAME_SAMPLES; i += 2) {
+    uint16_t a = frameSamples[i] & 0x0FFF;
+    uint16_t b = (i + 1 < FRAME_SAMPLES) ? frameSamples[i + 1] & 0x0FFF : 0;
+    buf[pos++] = a & 0xFF;
+    if (i + 1 < FRAME_SAMPLES) {
+      buf[pos++] = (a >> 8) | ((b & 0x0F) << 4);
+      buf[pos++] = b >> 4;
+    } else {
+      buf[pos++] = a >> 8;
+    }
+  }
+
+  uint16_t crc = crc16_ccitt(buf + 2, FRAME_SIZE - 4);
+  buf[FRAME_SIZE - 2] = crc & 0xFF;
+  buf[FRAME_SIZE - 1] = crc >> 8;
+  Serial.write(buf, FRAME_SIZE);
+
+  frameSeq++;
+  frameCount = 0;
+}
+
 void setup() {
   Serial.begin(115200);
   Wire.begin();
@@ -98,22 +186,88 @@ void triggerEffect(uint8_t ch, uint8_t effect) {
   drv.go();
 }
 
+void ackMotor(int ch, int bpm) {
+  Serial.print("M");
+  Serial.print(ch);
+  Serial.print(":");
+  Serial.println(bpm);
+}
+
+// "U0B72L1;3B90" - update only the listed fields of each motor
+void processUpdateFrame(char *p) {
+  while (*p) {
+    if (*p < '0' || *p > '5') return;
+    int ch = *p++ - '0';
+    while (*p && *p != ';') {
+      char field = *p++;
+      int val = strtol(p, &p, 10);
+      switch (field) {
+        case 'B': motors[ch].bpm = constrain(val, 0, 200); break;
+        case 'L': motors[ch].lub_effect = constrain(val, 0, 123); break;
+        case 'D': motors[ch].dub_effect = constrain(val, 0, 123); break;
+        case 'l': motors[ch].lub_enabled = (val == 1); break;
+        case 'd': motors[ch].dub_enabled = (val == 1); break;
+        default: return;
+      }
+    }
+    ackMotor(ch, motors[ch].bpm);
+    if (*p == ';') p++;
+  }
+}
+
+void processCommand(char *cmd) {
+  if (cmd[0] == 'S') {
+    // SYNC command
+    unsigned long syncNow = millis();
+    for (int i = 0; i < 6; i++) {
+      motors[i].lastBeat = syncNow;
+      motors[i].inLubDub = false;
+    }
+    Serial.println("Synced");
+  } else if (cmd[0] == 'U') {
+    processUpdateFrame(cmd + 1);
+  } else if (cmd[0] >= '0' && cmd[0] <= '9') {
+    // Motor config: "CH:BPM:LUB_EFFECT:DUB_EFFECT:LUB_EN:DUB_EN"
+    int ch, bpm, lub_eff, dub_eff, lub_en, dub_en;
+    if (sscanf(cmd, "%d:%d:%d:%d:%d:%d", &ch, &bpm, &lub_eff, &dub_eff, &lub_en, &dub_en) == 6
+        && ch >= 0 && ch <= 5) {
+      motors[ch].bpm = constrain(bpm, 0, 200);
+      motors[ch].lub_effect = constrain(lub_eff, 0, 123);
+      motors[ch].dub_effect = constrain(dub_eff, 0, 123);
+      motors[ch].lub_enabled = (lub_en == 1);
+      motors[ch].dub_enabled = (dub_en == 1);
+      ackMotor(ch, bpm);
+    }
+  }
+  // Unknown commands are ignored
+}
+
 void loop() {
   unsigned long now = millis();
   
   // ===== GSR READING & SENDING =====
   if (now - lastGSRSend >= GSR_INTERVAL) {
-    // Average 10 readings
+    // Average several readings
     long sum = 0;
-    for (int i = 0; i < 10; i++) {
+    for (int i = 0; i < GSR_AVG_READS; i++) {
       sum += analogRead(GSR_PIN);
-      delay(5);
+      if (GSR_AVG_DELAY > 0) delay(GSR_AVG_DELAY);
     }
-    int gsr_avg = sum / 10;
+    int gsr_avg = sum / GSR_AVG_READS;
     
-    // Send GSR data with "G:" prefix
+#if BINARY_FRAMES
+    if (frameCount == 0) frameStartMs = now;
+    frameSamples[frameCount++] = gsr_avg;
+    if (frameCount == FRAME_SAMPLES) sendFrame();
+#else
+    // Send GSR data with "G:" prefix, sequence number and sample time
     Serial.print("G:");
+    Serial.print(gsrSeq++);
+    Serial.print(":");
+    Serial.print(now);
+    Serial.print(":");
     Serial.println(gsr_avg);
+#endif
     
     lastGSRSend = now;
   }
@@ -144,58 +298,17 @@ void loop() {
   }
   
   // ===== SERIAL COMMAND PROCESSING =====
-  if (Serial.available()) {
-    char cmd = Serial.peek();
-    
-    if (cmd == 'S') {
-      // SYNC command
-      Serial.read();
-      unsigned long syncNow = millis();
-      for (int i = 0; i < 6; i++) {
-        motors[i].lastBeat = syncNow;
-        motors[i].inLubDub = false;
-      }
-      Serial.println("Synced");
-    } else if (cmd >= '0' && cmd <= '9') {
-      // Motor config: "CH:BPM:LUB_EFFECT:DUB_EFFECT:LUB_EN:DUB_EN"
-      int ch = Serial.parseInt();
-      if (Serial.read() == ':') {
-        int bpm = Serial.parseInt();
-        if (Serial.read() == ':') {
-          int lub_eff = Serial.parseInt();
-          if (Serial.read() == ':') {
-            int dub_eff = Serial.parseInt();
-            if (Serial.read() == ':') {
-              int lub_en = Serial.parseInt();
-              if (Serial.read() == ':') {
-                int dub_en = Serial.parseInt();
-                
-                // Consume remaining newline
-                while (Serial.available() && Serial.peek() == '\n') {
-                  Serial.read();
-                }
-                
-                if (ch >= 0 && ch <= 5) {
-                  motors[ch].bpm = constrain(bpm, 0, 200);
-                  motors[ch].lub_effect = constrain(lub_eff, 0, 123);
-                  motors[ch].dub_effect = constrain(dub_eff, 0, 123);
-                  motors[ch].lub_enabled = (lub_en == 1);
-                  motors[ch].dub_enabled = (dub_en == 1);
-                  
-                  // Send acknowledgment (optional - can comment out to reduce serial traffic)
-                  Serial.print("M");
-                  Serial.print(ch);
-                  Serial.print(":");
-                  Serial.println(bpm);
-                }
-              }
-            }
-          }
-        }
+  // Collect characters without blocking; handle a command per full line
+  while (Serial.available()) {
+    char c = Serial.read();
+    if (c == '\n' || c == '\r') {
+      if (cmdLen > 0) {
+        cmdBuf[cmdLen] = '\0';
+        processCommand(cmdBuf);
+        cmdLen = 0;
       }
-    } else {
-      // Unknown command, consume it
-      Serial.read();
+    } else if (cmdLen < CMD_BUF_SIZE - 1) {
+      cmdBuf[cmdLen++] = c;
     }
   }
 }
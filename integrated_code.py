@@ -14,89 +14,219 @@ HARDWARE:
 USAGE:
     1. Upload integrated_code.ino to ESP32
     2. Run: python integrated_code.py
+       (or python integrated_code.py <port> - e.g. an esp32_emulator.py pty)
     3. Left side: GSR plot with recording
     4. Right side: 6-motor haptic controls
 
 FEATURES:
-    - Real-time GSR plotting
-    - Record GSR data to CSV (GSR-data folder)
+    - Background serial reader (gsr_reader.py) - samples are stamped on
+      arrival, independent of plot redraws
+    - Real-time GSR plotting at ~30 FPS with blitting (live_plot.py)
+    - Zoom from the last 10 s to the whole session while recording
+      (min/max pyramid, gsr_pyramid.py)
+    - Skin conductance responses marked live on the plot (gsr_scr.py)
+    - Record GSR data to CSV (GSR-data folder), streamed to disk while
+      recording with a recoverable binary sidecar (session_writer.py)
+    - Samples stamped on the shared session clock; answers the slot
+      machine's sync handshake and writes *_clock.json next to each
+      recording (session_clock.py)
     - Individual motor BPM, lub/dub effect control
     - Enable/disable lub and dub per motor
     - Sync button for all motors
+    - Motor changes coalesced into one serial write per 50 ms
+      (motor_scheduler.py)
+    - Ack round-trip latency panel (p50/p95/p99, timeouts); a summary is
+      saved next to each recording as *_commands.json (command_tracker.py)
+    - Slot-machine spin/win/loss events over the local event bus
+      (event_bus.py): written as markers to *_events.jsonl while recording,
+      and optionally setting the motor BPM (SLOT_EVENT_BPM), with
+      publish-to-apply latency (once the slot machine has synced its
+      clock) shown under the latency panel
 """
 
 import matplotlib
 matplotlib.use('TkAgg')
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from matplotlib.animation import FuncAnimation
 import tkinter as tk
 from tkinter import ttk
 import serial
 import serial.tools.list_ports
-from collections import deque
+import sys
 import time
-import csv
+import queue
 from datetime import datetime
 import os
-
-# Select port
-ports = list(serial.tools.list_ports.comports())
-print("Available ports:")
-for i, p in enumerate(ports):
-    print(f"{i}: {p}")
-
-port_num = int(input("Select port number: "))
-ser = serial.Serial(ports[port_num].device, 115200, timeout=0.01)
+import numpy as np
+from gsr_pyramid import MinMaxPyramid
+from gsr_reader import GSRReader, NO_DEVICE_TIME
+from event_bus import EventLog, EventSubscriber
+from gsr_scr import SCRDetector
+from session_clock import ClockServer, now, write_clock_file
+from session_writer import SessionWriter, find_unfinished, recover_session
+from motor_scheduler import MotorCommandScheduler
+from command_tracker import CommandTracker
+from live_plot import LivePlot
+
+# Serial protocol - must match BINARY_FRAMES in integrated_code.ino
+BINARY_FRAMES = False
+GSR_INTERVAL = 0.01 if BINARY_FRAMES else 0.1  # Seconds between samples
+FRAME_INTERVAL_MS = 33  # Plot refresh (~30 FPS)
+MAX_PLOT_POINTS = 2000  # Points drawn per frame at any zoom level
+ZOOM_SPANS = {"10 s": 10, "50 s": 50, "5 min": 300, "20 min": 1200, "Whole": None}
+SLOT_EVENT_BPM = {"win": 90, "loss": 60}  # Motor BPM after each outcome (when enabled)
+SLOT_REACTION_POLL_MS = 10  # GUI-thread check for queued BPM reactions
+
+# Select port (or pass a device path, e.g. from esp32_emulator.py)
+if len(sys.argv) > 1:
+    port = sys.argv[1]
+else:
+    ports = list(serial.tools.list_ports.comports())
+    print("Available ports:")
+    for i, p in enumerate(ports):
+        print(f"{i}: {p}")
+
+    port_num = int(input("Select port number: "))
+    port = ports[port_num].device
+ser = serial.Serial(port, 115200, timeout=0.01)
 print("Connected! Waiting for ESP32...")
 time.sleep(2)
 print("Starting integrated system...\n")
 
+# Acks ("M<ch>:<bpm>", "Synced") are matched to the commands that caused them
+command_tracker = CommandTracker(timeout=1.0)
+
+# Serial ingest runs on its own thread; plot and recorder read from its buffer
+reader = GSRReader(ser, binary=BINARY_FRAMES, on_line=command_tracker.on_line)
+reader.start()
+
+# The slot machine syncs its clock with ours at session start
+clock_server = ClockServer()
+clock_server.start()
+if clock_server.error is not None:
+    print(f"⚠️ Clock sync server unavailable ({clock_server.error})")
+
 # Create GSR-data folder structure
 if not os.path.exists('GSR-data'):
     os.makedirs('GSR-data')
 if not os.path.exists('GSR-data/experiments'):
     os.makedirs('GSR-data/experiments')
 
+# Finish sessions left behind by a crash or a killed process
+for bin_path in find_unfinished('GSR-data/experiments'):
+    print(f"⚠️ Recovered {recover_session(bin_path)} samples from unfinished session "
+          f"{bin_path[:-len('.bin')]}.csv")
+
 # ===== GSR DATA =====
-gsr_times = deque(maxlen=500)
-gsr_values = deque(maxlen=500)
+# Every plotted sample, with min/max levels for zoomed-out views
+plot_pyramid = MinMaxPyramid()
 gsr_count = 0
-
-# Recording state
+plot_cursor = 0
+scr_detector = SCRDetector()  # Same detector and parameters as gsr_features.py, on raw (uncleaned) values
+scr_times = []  # Peak time / moving-average value of each response
+scr_values = []
+plot_origin_ms = None  # Device time of the first plotted sample
+
+# Recording state - phase/state are stored as indexes into these lists
+PHASES = ["Baseline", "Trial", "Post"]
+STATES = ["A", "B"]
 recording = False
-recorded_data = []
+session_writer = None  # Streams the recording to disk (session_writer.py)
+recorded_dropped = 0
+record_cursor = 0
 start_time = None
 current_phase = "Baseline"
 current_state = "A"
 
+# Slot-machine events - the subscriber thread writes markers itself and
+# leaves motor reactions to the GUI thread
+slot_event_log = None  # Markers of the current recording (event_bus.EventLog)
+slot_reactions = queue.Queue()
+slot_bpm_active = False  # Mirrors the "Slot events drive BPM" checkbox
+
+def send_command(cmd):
+    """Write a command to the ESP32 immediately"""
+    ser.write(cmd)
+    ser.flush()  # Ensure it's sent immediately
+
+def effect_value(var):
+    """Effect number from an entry, or None while it is not a valid number"""
+    try:
+        return int(var.get())
+    except ValueError:
+        return None
+
 def update_motor(ch):
-    """Send motor configuration to ESP32"""
+    """Queue motor configuration; motor_scheduler coalesces and sends it"""
     if not motor_vars[ch]['enabled'].get():
-        cmd = f"{ch}:0:0:0:0:0\n"
-        ser.write(cmd.encode())
-        print(f"Sent: {cmd.strip()}")
+        motor_scheduler.set_motor(ch, 0, 0, 0, 0, 0)
     else:
         bpm = motor_vars[ch]['bpm'].get()
-        lub_effect = motor_vars[ch]['lub_effect'].get()
-        dub_effect = motor_vars[ch]['dub_effect'].get()
+        lub_effect = effect_value(motor_vars[ch]['lub_effect'])
+        dub_effect = effect_value(motor_vars[ch]['dub_effect'])
         lub_en = 1 if motor_vars[ch]['lub_enabled'].get() else 0
         dub_en = 1 if motor_vars[ch]['dub_enabled'].get() else 0
         
-        cmd = f"{ch}:{bpm}:{lub_effect}:{dub_effect}:{lub_en}:{dub_en}\n"
-        ser.write(cmd.encode())
-        ser.flush()  # Ensure it's sent immediately
-        print(f"Sent: {cmd.strip()}")
+        motor_scheduler.set_motor(ch, bpm, lub_effect, dub_effect, lub_en, dub_en)
 
 def sync_motors():
     """Synchronize all motors"""
-    ser.write(b"S\n")
+    motor_scheduler.sync()
     print("Motors synchronized!")
 
+def handle_slot_event(event):
+    """Slot-machine event (subscriber thread): marker now, motors via the GUI thread"""
+    log = slot_event_log
+    if log is not None:
+        log.write(event)
+    if slot_bpm_active and event['type'] in SLOT_EVENT_BPM:
+        slot_reactions.put(event)  # Tk is only touched from the GUI thread
+    elif log is not None:
+        slot_subscriber.applied(event)
+
+def poll_slot_reactions():
+    """Apply queued BPM reactions right away instead of in the next 50 ms window"""
+    while True:
+        try:
+            event = slot_reactions.get_nowait()
+        except queue.Empty:
+            break
+        bpm = SLOT_EVENT_BPM[event['type']]
+        for ch in range(6):
+            if motor_vars[ch]['enabled'].get():
+                motor_vars[ch]['bpm'].set(bpm)
+                bpm_labels[ch].config(text=str(bpm))
+                update_motor(ch)
+        motor_scheduler.flush()
+        slot_subscriber.applied(event)
+    root.after(SLOT_REACTION_POLL_MS, poll_slot_reactions)
+
+def set_slot_bpm(enabled):
+    global slot_bpm_active
+    slot_bpm_active = enabled
+
+def drain_recording():
+    """Hand newly arrived samples to the session writer with the current phase"""
+    global record_cursor, recorded_dropped
+    samples, record_cursor, lost = reader.buffer.read_since(record_cursor)
+    if lost:
+        print(f"⚠️ Recorder fell behind - {lost} samples lost")
+    keep = samples['arrival'] >= start_time
+    n = int(keep.sum())
+    if n == 0:
+        return
+    columns = {name: values[keep] for name, values in samples.items()}
+    columns['phase'] = np.full(n, PHASES.index(current_phase), dtype=np.uint8)
+    columns['state'] = np.full(n, STATES.index(current_state), dtype=np.uint8)
+    session_writer.write(columns)
+    recorded_dropped += int(columns['gap'].sum())
+
 def set_phase(phase):
     """Set current experiment phase"""
     global current_phase
     if recording:
+        # Samples that arrived before the click belong to the old phase
+        drain_recording()
         current_phase = phase
         print(f"Phase changed to: {phase}")
 
@@ -110,7 +240,7 @@ def set_state(state):
 
 def toggle_recording():
     """Start/stop GSR recording"""
-    global recording, recorded_data, start_time, gsr_count, current_phase
+    global recording, session_writer, recorded_dropped, record_cursor, start_time, gsr_count, current_phase, plot_origin_ms, slot_event_log
     
     if not recording:
         # Validate user ID
@@ -119,12 +249,30 @@ def toggle_recording():
             status_label.config(text="⚠️ Enter Participant ID first!", fg="red")
             return
         
+        start_time = now()
+        timestamp = datetime.fromtimestamp(start_time).strftime("%Y%m%d_%H%M%S")
+        filename = f"GSR-data/experiments/gsr_{user_id}_State{current_state}_{timestamp}.csv"
+        try:
+            session_writer = SessionWriter(
+                filename, meta={'user_id': user_id, 'state': current_state,
+                                'phases': PHASES, 'states': STATES},
+                clock=reader.clock, start_time=start_time)
+        except OSError as e:
+            status_label.config(text=f"⚠️ Cannot write {filename}: {e}", fg="red")
+            return
+        session_writer.start()
+        slot_event_log = EventLog(filename.replace('.csv', '_events.jsonl'), start_time)
+        
         recording = True
-        recorded_data = []
+        recorded_dropped = 0
         gsr_count = 0
-        gsr_times.clear()
-        gsr_values.clear()
-        start_time = time.time()
+        plot_origin_ms = None
+        plot_pyramid.clear()
+        scr_detector.reset()
+        scr_times.clear()
+        scr_values.clear()
+        record_cursor = reader.buffer.total
+        command_tracker.reset_stats()
         current_phase = "Baseline"  # Always start with Baseline
         
         record_btn.config(text="⏹ STOP & SAVE", bg="#DC143C")
@@ -139,7 +287,9 @@ def toggle_recording():
         print(f"User ID: {user_id}")
         print(f"State: {current_state}")
         print(f"Phase: {current_phase}")
+        print(f"Writing to: {os.path.abspath(filename)}")
     else:
+        drain_recording()
         recording = False
         record_btn.config(text="▶ START RECORDING", bg="#228B22")
         
@@ -148,84 +298,84 @@ def toggle_recording():
         state_b_btn.config(state="normal")
         user_id_entry.config(state="normal")
         
-        if len(recorded_data) > 0:
-            save_gsr_data()
-            status_label.config(text=f"✅ Saved {len(recorded_data)} samples", fg="green")
+        samples = save_gsr_data()
+        if samples > 0:
+            status_label.config(text=f"✅ Saved {samples} samples", fg="green")
         else:
             status_label.config(text="⚠️ No data recorded", fg="orange")
         
         print("=== RECORDING STOPPED ===\n")
 
 def save_gsr_data():
-    """Save GSR data to CSV"""
-    user_id = user_id_var.get().strip()
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"GSR-data/experiments/gsr_{user_id}_State{current_state}_{timestamp}.csv"
-    filepath = os.path.abspath(filename)
-    
-    with open(filename, 'w', newline='') as f:
-        writer = csv.writer(f)
-        writer.writerow(['Time (s)', 'Phase', 'State', 'GSR Value'])
-        writer.writerows(recorded_data)
+    """Finish the streamed recording and write the command latency summary"""
+    global slot_event_log
+    samples = session_writer.close()
+    event_log, slot_event_log = slot_event_log, None
+    event_log.close()
+    filename = session_writer.csv_path
     
-    print(f"\n✓ Saved to: {filepath}")
-    print(f"  Samples: {len(recorded_data)}")
-    print(f"  Duration: {recorded_data[-1][0]:.1f}s\n")
-
-def update_plot(frame):
-    """Update GSR plot and read serial data"""
-    global gsr_count, start_time
+    command_tracker.expire()
+    summary_file = command_tracker.write_summary(filename.replace('.csv', '_commands.json'))
+    write_clock_file(filename, start_time=start_time, handshakes=clock_server.handshakes)
     
-    # Read all available serial data
-    while ser.in_waiting:
-        try:
-            line = ser.readline().decode('utf-8').strip()
-            
-            if line.startswith('G:'):
-                # GSR data
-                val = int(line[2:])
-                gsr_count += 1
-                current_time = gsr_count * 0.1
-                gsr_times.append(current_time)
-                gsr_values.append(val)
-                
-                if recording and start_time is not None:
-                    recording_time = time.time() - start_time
-                    recorded_data.append([recording_time, current_phase, current_state, val])
-                    
-        except Exception as e:
-            pass
+    if session_writer.error is not None:
+        print(f"\n⚠️ Recording incomplete ({session_writer.error}) - "
+              f"run session_writer.py to recover {session_writer.bin_path}")
+    print(f"\n✓ Saved to: {os.path.abspath(filename)}")
+    print(f"  Binary sidecar: {os.path.abspath(session_writer.bin_path)}")
+    print(f"  Command latency: {command_tracker.stats_text()}")
+    print(f"  Latency summary: {os.path.abspath(summary_file)}")
+    print(f"  Clock sync: {len(clock_server.handshakes)} slot-machine handshakes served")
+    print(f"  Slot events: {event_log.markers} markers → {os.path.abspath(event_log.path)}")
+    print(f"  Event latency: {slot_subscriber.stats_text()}")
+    print(f"  Samples: {samples}")
+    print(f"  Dropped: {session_writer.dropped} (see 'Gap' column)")
+    print(f"  Clock drift: {reader.clock.drift_ppm:.1f} ppm")
+    print(f"  Duration: {now() - start_time:.1f}s\n")
+    return samples
+
+def update_plot():
+    """Update GSR plot from samples buffered by the reader thread"""
+    global gsr_count, plot_cursor, plot_origin_ms
     
-    # Update GSR plot
-    ax.clear()
-    if len(gsr_values) > 0:
-        ax.plot(list(gsr_times), list(gsr_values), 'b-', linewidth=2)
-        
-        ax.text(0.02, 0.98, f'Current: {gsr_values[-1]}',
-                transform=ax.transAxes, fontsize=12,
-                verticalalignment='top', fontweight='bold',
-                bbox=dict(boxstyle='round', facecolor='lightblue', alpha=0.8))
-        
-        if recording:
-            ax.text(0.98, 0.98, f'RECORDING ● | Phase: {current_phase} | State: {current_state}',
-                    transform=ax.transAxes, fontsize=11,
-                    verticalalignment='top', horizontalalignment='right',
-                    fontweight='bold', color='red',
-                    bbox=dict(boxstyle='round', facecolor='white', alpha=0.8))
+    samples, plot_cursor, _ = reader.buffer.read_since(plot_cursor)
+    n = len(samples['value'])
+    if n:
+        device_ms = samples['device_ms']
+        if device_ms[-1] == NO_DEVICE_TIME:
+            # Old firmware: assume the nominal sample interval
+            new_times = (gsr_count + 1 + np.arange(n)) * GSR_INTERVAL
+        else:
+            if plot_origin_ms is None:
+                plot_origin_ms = int(device_ms[0])
+            new_times = (device_ms - plot_origin_ms) / 1000.0
+        gsr_count += n
+        plot_pyramid.extend(new_times, samples['value'])
+        for event in scr_detector.extend(new_times, samples['value']):
+            scr_times.append(event['peak_time'])
+            scr_values.append(event['peak_value'])
     
-    ax.set_ylim(0, 4096)
-    ax.set_xlabel('Time (s)')
-    ax.set_ylabel('GSR Value')
-    ax.set_title('GSR Monitor')
-    ax.grid(True, alpha=0.3)
+    if recording and start_time is not None:
+        drain_recording()
     
-    # Set fixed window - show last 50 seconds
-    if len(gsr_times) > 0:
-        current_time = gsr_times[-1]
-        if current_time > 50:
-            ax.set_xlim(current_time - 50, current_time)
-        else:
-            ax.set_xlim(0, 50)
+    # Update GSR plot (persistent artists + blitting, see live_plot.py)
+    # Bounded number of points whatever the zoom or session length
+    latest = plot_pyramid.latest
+    span = ZOOM_SPANS[zoom_var.get()]
+    t0 = None if span is None or latest is None else latest[0] - span
+    gsr_times, gsr_values = plot_pyramid.query(t0, MAX_PLOT_POINTS)
+    value_text = f'Current: {latest[1]}' if latest is not None else ''
+    status_text = ''
+    if recording:
+        status_text = (f'RECORDING ● | Phase: {current_phase} | State: {current_state} | '
+                       f'SCRs: {scr_detector.count} | Dropped: {recorded_dropped}')
+    live_plot.update(gsr_times, gsr_values, value_text, status_text,
+                     markers=(scr_times, scr_values))
+
+def animate():
+    """Render loop - serial reading no longer depends on it"""
+    update_plot()
+    root.after(FRAME_INTERVAL_MS, animate)
 
 # ===== CREATE GUI =====
 root = tk.Tk()
@@ -244,6 +394,11 @@ for i in range(6):
         'dub_enabled': tk.BooleanVar(value=True)
     })
 
+# Motor commands are coalesced into one write per 50 ms window
+motor_scheduler = MotorCommandScheduler(
+    send=send_command, schedule=root.after, tracker=command_tracker,
+    on_flush=lambda s: command_stats_label.config(text=s.stats_text()))
+
 # User ID variable
 user_id_var = tk.StringVar()
 
@@ -344,12 +499,27 @@ post_btn = tk.Button(phase_buttons, text="3️⃣ POST",
                     relief=tk.RAISED, bd=3)
 post_btn.pack(side=tk.LEFT, padx=5)
 
+# Zoom row
+zoom_frame = tk.Frame(gsr_control, bg='lightgray')
+zoom_frame.pack(side=tk.TOP, pady=(8, 0))
+
+tk.Label(zoom_frame, text="VIEW:", font=("Arial", 11, "bold"),
+         bg='lightgray', fg='#333').pack(side=tk.LEFT, padx=5)
+
+zoom_var = tk.StringVar(value="50 s")
+for zoom_name in ZOOM_SPANS:
+    tk.Radiobutton(zoom_frame, text=zoom_name, variable=zoom_var, value=zoom_name,
+                   command=lambda: live_plot.set_window(ZOOM_SPANS[zoom_var.get()]),
+                   font=("Arial", 10), bg='lightgray',
+                   indicatoron=False, width=7).pack(side=tk.LEFT, padx=2)
+
 # GSR plot
 fig, ax = plt.subplots(figsize=(7, 7))
 fig.tight_layout(pad=3.0)
 
 canvas = FigureCanvasTkAgg(fig, master=left_frame)
 canvas.get_tk_widget().pack(side=tk.TOP, fill=tk.BOTH, expand=True)
+live_plot = LivePlot(fig, ax, window=50)
 
 # ===== RIGHT SIDE: HAPTIC CONTROLS =====
 right_frame = tk.Frame(main_frame, width=650)
@@ -376,6 +546,7 @@ canvas_scroll.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
 scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
 
 # Create motor controls
+bpm_labels = []
 for ch in range(6):
     frame = tk.Frame(scrollable_frame, relief=tk.RAISED, borderwidth=2, padx=10, pady=8)
     frame.pack(fill=tk.X, padx=5, pady=5)
@@ -406,6 +577,7 @@ for ch in range(6):
     bpm_label = tk.Label(row2, text=str(motor_vars[ch]['bpm'].get()),
                         font=("Arial", 9, "bold"), width=4)
     bpm_label.pack(side=tk.LEFT)
+    bpm_labels.append(bpm_label)
     
     def make_bpm_callback(ch, label):
         def callback(val):
@@ -487,8 +659,38 @@ sync_btn = tk.Button(sync_frame, text="SYNC ALL", command=sync_motors,
                     width=15, height=2)
 sync_btn.pack()
 
+command_stats_label = tk.Label(sync_frame, text="", font=("Arial", 8), fg="gray")
+command_stats_label.pack()
+
+latency_label = tk.Label(sync_frame, text="", font=("Arial", 9, "bold"), fg="#333")
+latency_label.pack()
+
+slot_bpm_var = tk.BooleanVar(value=False)
+tk.Checkbutton(sync_frame, text="Slot events drive BPM", variable=slot_bpm_var,
+               command=lambda: set_slot_bpm(slot_bpm_var.get()), font=("Arial", 9)
+               ).pack()
+
+slot_latency_label = tk.Label(sync_frame, text="", font=("Arial", 8), fg="gray")
+slot_latency_label.pack()
+
+def update_latency_panel():
+    """Refresh command round-trip latency (p50/p95/p99) and timeouts"""
+    command_tracker.expire()
+    latency_label.config(text=command_tracker.stats_text())
+    slot_latency_label.config(text=f"Slot events: {slot_subscriber.stats_text()}")
+    root.after(500, update_latency_panel)
+
+# Spin outcomes from the slot machine (event_bus.py)
+slot_subscriber = EventSubscriber(on_event=handle_slot_event)
+slot_subscriber.start()
+if slot_subscriber.error is not None:
+    print(f"⚠️ Slot-machine events unavailable ({slot_subscriber.error})")
+root.after(SLOT_REACTION_POLL_MS, poll_slot_reactions)
+
+update_latency_panel()
+
 # Animation
-ani = FuncAnimation(fig, update_plot, interval=100, cache_frame_data=False)
+root.after(FRAME_INTERVAL_MS, animate)
 
 # Send initial motor values
 root.after(100, lambda: [update_motor(i) for i in range(6)])
@@ -497,7 +699,14 @@ def on_closing():
     global recording
     if recording:
         print("\nClosing while recording. Saving...")
+        drain_recording()
         save_gsr_data()
+    motor_scheduler.flush()
+    print(f"Motor commands: {motor_scheduler.stats_text()}")
+    print(f"Plot: {live_plot.stats_text()}")
+    reader.stop()
+    clock_server.stop()
+    slot_subscriber.stop()
     ser.close()
     root.destroy()
 
@@ -0,0 +1,152 @@
+"""
+Blitting Renderer for the Live GSR Plot
+
+PURPOSE:
+    The live monitors used to call ax.clear() every frame and rebuild the
+    line, text boxes, labels, title and grid. LivePlot creates those artists
+    once. Each frame it only updates the line data and texts and blits the
+    axes area over a cached background. A full redraw happens only when the
+    x-window scrolls (in steps) or the window is resized.
+
+USAGE:
+    plot = LivePlot(fig, ax, window=50)
+
+    def animate():
+        plot.update(times, values, value_text="Current: 2650",
+                    status_text="RECORDING ●")
+        root.after(33, animate)
+
+    plot.update(times, values, markers=(scr_times, scr_values))  # SCR peaks
+    plot.fps, plot.ms_per_frame    # Render rate and cost per frame
+    plot.set_window(None)          # Zoom out to the whole session
+
+NOTE:
+    Drive it with root.after() rather than FuncAnimation - FuncAnimation
+    without blit=True requests a full canvas redraw after every frame.
+"""
+
+import time
+
+
+class LivePlot:
+    """Persistent-artist GSR plot redrawn with blitting"""
+
+    def __init__(self, fig, ax, window=50, ylim=(0, 4096), title='GSR Monitor',
+                 scroll_step=10, fontsize=12, status_fontsize=11):
+        self.fig = fig
+        self.ax = ax
+        self.canvas = fig.canvas
+        self.window = window
+        self.scroll_step = scroll_step
+
+        # Static parts - drawn into the cached background
+        ax.set_ylim(*ylim)
+        ax.set_xlim(0, window)
+        ax.set_xlabel('Time (s)')
+        ax.set_ylabel('GSR Value')
+        ax.set_title(title)
+        ax.grid(True, alpha=0.3)
+
+        # Dynamic parts - drawn on top of the background every frame
+        self.line, = ax.plot([], [], 'b-', linewidth=2, animated=True)
+        self.markers, = ax.plot([], [], 'rv', markersize=8, animated=True)
+        self.value_text = ax.text(0.02, 0.98, '', transform=ax.transAxes,
+                                  fontsize=fontsize, verticalalignment='top',
+                                  fontweight='bold', animated=True,
+                                  bbox=dict(boxstyle='round', facecolor='lightblue', alpha=0.8))
+        self.status_text = ax.text(0.98, 0.98, '', transform=ax.transAxes,
+                                   fontsize=status_fontsize, verticalalignment='top',
+                                   horizontalalignment='right', fontweight='bold',
+                                   color='red', animated=True,
+                                   bbox=dict(boxstyle='round', facecolor='white', alpha=0.8))
+        self.fps_text = ax.text(0.99, 0.01, '', transform=ax.transAxes,
+                                fontsize=8, color='gray', horizontalalignment='right',
+                                verticalalignment='bottom', animated=True)
+        self.artists = [self.line, self.markers, self.value_text, self.status_text, self.fps_text]
+
+        self.background = None
+        self._latest = 0.0
+        self.canvas.mpl_connect('draw_event', self._on_draw)
+
+        # Frame timing (exponential moving averages)
+        self.fps = 0.0
+        self.ms_per_frame = 0.0
+        self.frames = 0
+        self.full_redraws = 0
+        self._last_frame = None
+
+    def _on_draw(self, event):
+        """Full redraw happened (scroll, resize) - recapture the background"""
+        self.background = self.canvas.copy_from_bbox(self.ax.bbox)
+        self._draw_artists()
+
+    def _draw_artists(self):
+        for artist in self.artists:
+            self.ax.draw_artist(artist)
+
+    def set_window(self, window, scroll_step=None):
+        """
+        Change the visible span in seconds (None = whole session). The
+        x-window scrolls by scroll_step, a fifth of the span by default.
+        """
+        self.window = window
+        if window is not None:
+            self.scroll_step = scroll_step if scroll_step is not None else window / 5.0
+        self._scroll_to(self._latest, force=True)
+        self.background = None  # Full redraw on the next frame
+
+    def _scroll_to(self, latest_time, force=False):
+        """Move the x-window in steps; return True if the limits changed"""
+        xmin, xmax = self.ax.get_xlim()
+        if self.window is None:
+            # Whole session: grow the axis by half again when it fills up,
+            # shrink it back when a new recording starts from zero
+            if not force and xmax / 3.0 <= latest_time <= xmax:
+                return False
+            self.ax.set_xlim(0, max(latest_time * 1.5, 10.0))
+            return True
+        if not force and latest_time <= xmax and latest_time >= xmin:
+            return False
+        if latest_time <= self.window:
+            new_min = 0
+        else:
+            new_min = latest_time - self.window + self.scroll_step
+        self.ax.set_xlim(new_min, new_min + self.window)
+        return True
+
+    def update(self, times, values, value_text='', status_text='', markers=None):
+        """Render one frame; markers = (times, values) of points to flag"""
+        start = time.perf_counter()
+
+        self.line.set_data(times, values)
+        self.markers.set_data(*(markers if markers is not None else ([], [])))
+        if len(times):
+            self._latest = times[-1]
+        self.value_text.set_text(value_text)
+        self.value_text.set_visible(bool(value_text))
+        self.status_text.set_text(status_text)
+        self.status_text.set_visible(bool(status_text))
+        self.fps_text.set_text(f'{self.fps:.0f} FPS | {self.ms_per_frame:.1f} ms/frame')
+
+        if (len(times) and self._scroll_to(times[-1])) or self.background is None:
+            self.full_redraws += 1
+            self.canvas.draw()
+        else:
+            self.canvas.restore_region(self.background)
+            self._draw_artists()
+            self.canvas.blit(self.ax.bbox)
+
+        # Timing
+        end = time.perf_counter()
+        cost_ms = (end - start) * 1000.0
+        self.ms_per_frame = cost_ms if self.frames == 0 else 0.9 * self.ms_per_frame + 0.1 * cost_ms
+        if self._last_frame is not None:
+            interval = end - self._last_frame
+            if interval > 0:
+                self.fps = 1.0 / interval if self.frames == 1 else 0.9 * self.fps + 0.1 / interval
+        self._last_frame = end
+        self.frames += 1
+
+    def stats_text(self):
+        return (f"{self.frames} frames, {self.fps:.1f} FPS, "
+                f"{self.ms_per_frame:.2f} ms/frame, {self.full_redraws} full redraws")
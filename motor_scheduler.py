@@ -0,0 +1,137 @@
+"""
+Debounced, Coalescing Motor Command Scheduler
+
+PURPOSE:
+    The haptic GUIs change motor settings on every slider tick and every
+    keystroke in the lub/dub entries. Instead of writing a full command
+    line per event, the scheduler keeps the last desired state of each
+    motor and sends at most one write per coalescing window, containing
+    only the fields that actually changed since the last write.
+
+FRAME FORMATS:
+    multi_frame=True  (integrated_code.ino):
+        "U<ch><fields>;<ch><fields>...\\n" with fields
+        B<bpm> L<lub effect> D<dub effect> l<lub en> d<dub en>
+        e.g. "U0B72;3B90D5\\n"
+    multi_frame=False (older firmware, e.g. mux_test.ino):
+        one "CH:BPM:LUB:DUB:LUB_EN:DUB_EN\\n" line per changed motor,
+        all sent in a single write
+
+USAGE:
+    scheduler = MotorCommandScheduler(send=ser.write, schedule=root.after)
+    scheduler.set_motor(ch, bpm, lub_effect, dub_effect, lub_en, dub_en)
+    scheduler.sync()            # flushes pending changes, then sends "S"
+    print(scheduler.stats_text())
+
+    Pass tracker=CommandTracker() (command_tracker.py) to match every write
+    with the acks the firmware sends back.
+"""
+
+FIELDS = ('bpm', 'lub_effect', 'dub_effect', 'lub_en', 'dub_en')
+FIELD_CODES = {'bpm': 'B', 'lub_effect': 'L', 'dub_effect': 'D',
+               'lub_en': 'l', 'dub_en': 'd'}
+
+
+class MotorCommandScheduler:
+    """Coalesces per-motor updates into one write per window"""
+
+    def __init__(self, send, schedule, window_ms=50, num_motors=6,
+                 multi_frame=True, on_flush=None, tracker=None):
+        self.send = send
+        self.tracker = tracker
+        self.schedule = schedule
+        self.window_ms = window_ms
+        self.multi_frame = multi_frame
+        self.on_flush = on_flush
+        self.desired = [dict() for _ in range(num_motors)]
+        self.sent = [None] * num_motors  # Unknown until first write
+        self._flush_pending = False
+
+        self.events = 0          # set_motor() calls
+        self.writes = 0          # Motor command writes actually made
+        self.frames_skipped = 0  # Windows that ended with nothing changed
+        self.syncs = 0
+
+    def set_motor(self, ch, bpm, lub_effect, dub_effect, lub_en, dub_en):
+        """
+        Record the desired state of one motor. Fields that are None (e.g.
+        an effect entry that is empty while typing) keep their last value.
+        """
+        self.events += 1
+        new = dict(zip(FIELDS, (bpm, lub_effect, dub_effect, lub_en, dub_en)))
+        self.desired[ch].update({k: v for k, v in new.items() if v is not None})
+        if not self._flush_pending:
+            self._flush_pending = True
+            self.schedule(self.window_ms, self.flush)
+
+    def changes(self):
+        """Return {ch: {field: value}} of fields that differ from what was sent"""
+        changed = {}
+        for ch, desired in enumerate(self.desired):
+            sent = self.sent[ch]
+            if sent is None:
+                # First write must carry the full configuration
+                if len(desired) == len(FIELDS):
+                    changed[ch] = dict(desired)
+                continue
+            diff = {k: v for k, v in desired.items() if sent.get(k) != v}
+            if diff:
+                changed[ch] = diff
+        return changed
+
+    def encode(self, changed):
+        """Build the bytes for one write"""
+        if self.multi_frame:
+            parts = []
+            for ch, fields in changed.items():
+                parts.append(str(ch) + "".join(f"{FIELD_CODES[k]}{fields[k]}"
+                                               for k in FIELDS if k in fields))
+            return ("U" + ";".join(parts) + "\n").encode()
+
+        lines = []
+        for ch in changed:
+            d = self.desired[ch]
+            lines.append(f"{ch}:{d['bpm']}:{d['lub_effect']}:{d['dub_effect']}:"
+                         f"{d['lub_en']}:{d['dub_en']}\n")
+        return "".join(lines).encode()
+
+    def flush(self):
+        """Send everything that changed since the last write"""
+        self._flush_pending = False
+        changed = self.changes()
+        if not changed:
+            self.frames_skipped += 1
+            return
+
+        cmd = self.encode(changed)
+        for ch, fields in changed.items():
+            if self.sent[ch] is None:
+                self.sent[ch] = {}
+            self.sent[ch].update(fields)
+        if self.tracker is not None:
+            # Firmware acks each updated motor with "M<ch>:<bpm>"
+            self.tracker.track([f"M{ch}:{self.sent[ch]['bpm']}" for ch in changed],
+                               label=cmd.decode().strip())
+        self.send(cmd)
+        self.writes += 1
+        print(f"Sent: {cmd.decode().strip()}")
+
+        if self.on_flush is not None:
+            self.on_flush(self)
+
+    def sync(self):
+        """Flush pending changes first so the sync applies to them"""
+        self.flush()
+        if self.tracker is not None:
+            self.tracker.track(["Synced"], label="S")
+        self.send(b"S\n")
+        self.syncs += 1
+
+    @property
+    def writes_saved(self):
+        """Writes avoided compared with one write per event"""
+        return max(0, self.events - self.writes)
+
+    def stats_text(self):
+        return (f"{self.events} changes → {self.writes} writes "
+                f"({self.writes_saved} saved)")
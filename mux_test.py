@@ -25,18 +25,23 @@ CREATED: Initial testing before GUI development
 
 import serial
 import serial.tools.list_ports
+import sys
 import time
 import threading
 
 # BPM settings for 6 channels
 BPM = [40, 40, 40, 40, 40, 40]  # Ch0-Ch5
 
-# Select port
-ports = list(serial.tools.list_ports.comports())
-for i, p in enumerate(ports):
-    print(f"{i}: {p}")
+# Select port (or pass a device path, e.g. from esp32_emulator.py)
+if len(sys.argv) > 1:
+    port = sys.argv[1]
+else:
+    ports = list(serial.tools.list_ports.comports())
+    for i, p in enumerate(ports):
+        print(f"{i}: {p}")
+    port = ports[int(input("Port: "))].device
 
-ser = serial.Serial(ports[int(input("Port: "))].device, 115200, timeout=0.01)
+ser = serial.Serial(port, 115200, timeout=0.01)
 print("Waiting for ESP32...")
 time.sleep(3)
 
@@ -9,82 +9,38 @@ PURPOSE:
     4. Phase markers (Baseline, Trial, Post)
 
 USAGE:
-    python plot_cleaned_trial.py
+    python plot_cleaned_trial.py                        # latest session of USER_ID
+    python plot_cleaned_trial.py <participant> [timestamp]
 """
 
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
-from scipy.interpolate import interp1d
-from scipy.signal import medfilt
 import os
+import sys
+from gsr_catalog import find_sessions, open_catalog
+from gsr_cleaning import TARGET_SAMPLE_RATE, remove_spikes, resample_uniform
+from gsr_store import load_session
 
-# Configuration
-USER_ID = "62206"
-TIMESTAMP = "20251120_163627"
-INPUT_FILE = f"GSR-data/experiments/gsr_{USER_ID}_StateA_{TIMESTAMP}.csv"
+# Configuration (command line arguments override these)
+USER_ID = sys.argv[1] if len(sys.argv) > 1 else "62206"
+TIMESTAMP = sys.argv[2] if len(sys.argv) > 2 else None  # None = latest session
+
+# Find the recording in the catalog (gsr_catalog.py) instead of building its name
+sessions = find_sessions(open_catalog(), kind='experiment', participant=USER_ID,
+                         timestamp=TIMESTAMP)
+if not sessions:
+    sys.exit(f"No experiment recording found for participant {USER_ID}"
+             + (f" at {TIMESTAMP}" if TIMESTAMP else ""))
+TIMESTAMP = sessions[-1]['timestamp']
+INPUT_FILE = sessions[-1]['path']
 OUTPUT_PLOT = f"GSR-data/plots/cleaned_{USER_ID}_{TIMESTAMP}.png"
 
-TARGET_SAMPLE_RATE = 5  # Hz
-MEDIAN_FILTER_SIZE = 5  # Odd number for median filter
-RATE_CHANGE_THRESHOLD = 500  # Max allowed change between samples
 ROLLING_WINDOW_SEC = 5  # Seconds for rolling average
 
 # Ensure output directory exists
 os.makedirs("GSR-data/plots", exist_ok=True)
 
-def remove_spikes(times, values):
-    """
-    Remove spike artifacts using two-pass approach:
-    1. Median filter to remove sharp spikes
-    2. Rate-of-change filter to catch remaining large jumps
-    """
-    times = np.array(times)
-    values = np.array(values)
-    
-    # Pass 1: Apply median filter
-    values_filtered = medfilt(values, kernel_size=MEDIAN_FILTER_SIZE)
-    
-    # Pass 2: Detect remaining spikes by rate of change
-    spike_mask = np.zeros(len(values), dtype=bool)
-    
-    for i in range(1, len(values_filtered)):
-        rate_of_change = abs(values_filtered[i] - values_filtered[i-1])
-        if rate_of_change > RATE_CHANGE_THRESHOLD:
-            spike_mask[i] = True
-    
-    # Interpolate detected spikes from neighbors
-    if np.any(spike_mask):
-        spike_indices = np.where(spike_mask)[0]
-        good_indices = np.where(~spike_mask)[0]
-        
-        if len(good_indices) > 1:
-            interpolator = interp1d(good_indices, values_filtered[good_indices], 
-                                   kind='linear', fill_value='extrapolate')
-            values_filtered[spike_indices] = interpolator(spike_indices)
-    
-    num_spikes = np.sum(spike_mask)
-    
-    return times, values_filtered, num_spikes
-
-def resample_uniform(times, values, target_hz=5):
-    """Resample data to uniform sampling rate"""
-    if len(times) < 2:
-        return times, values
-    
-    start_time = times[0]
-    end_time = times[-1]
-    duration = end_time - start_time
-    
-    num_samples = int(duration * target_hz) + 1
-    uniform_times = np.linspace(start_time, end_time, num_samples)
-    
-    interpolator = interp1d(times, values, kind='linear', 
-                           bounds_error=False, fill_value='extrapolate')
-    uniform_values = interpolator(uniform_times)
-    
-    return uniform_times, uniform_values
-
 def calculate_rolling_average(values, window_samples):
     """Calculate rolling average"""
     return pd.Series(values).rolling(window=window_samples, center=True, min_periods=1).mean().values
@@ -96,11 +52,11 @@ def main():
     
     # Read data
     print(f"\nReading: {INPUT_FILE}")
-    df = pd.read_csv(INPUT_FILE)
-    times = df['Time (s)'].values
-    values = df['GSR Value'].values
-    phases = df['Phase'].values
-    state = df['State'].values[0]
+    data = load_session(INPUT_FILE)
+    times = data['Time (s)']
+    values = data['GSR Value']
+    phases = data['Phase']
+    state = data['State'][0]
     
     print(f"  Original samples: {len(values)}")
     print(f"  Duration: {times[-1]:.1f}s")
@@ -3,112 +3,111 @@ GSR Data Processing Script
 
 PURPOSE:
     Process recorded GSR data files by:
-    1. Removing interference spikes from haptic motors
-    2. Resampling to uniform 5Hz sampling rate
-    3. Generating individual plots for manual inspection
+    1. Removing interference spikes from haptic motors (gsr_cleaning.py)
+    2. Resampling to uniform 5Hz sampling rate (gsr_cleaning.py)
+    3. Generating individual plots for manual inspection (--plots)
 
 USAGE:
-    python process_gsr_data.py
+    python process_gsr_data.py               # one worker process per CPU
+    python process_gsr_data.py --workers 1   # serial, in this process
+    python process_gsr_data.py --force       # ignore the cache, redo everything
+    python process_gsr_data.py --chunk-size 65536   # stream long recordings
+    python process_gsr_data.py --plots       # also render plots (separate stage)
+
+    Unchanged inputs are skipped (gsr_cache.py): a file is only processed
+    again when its contents or the pipeline parameters change. Plots are
+    only redrawn when the PNG is older than the recording or its output.
+
+INPUT:
+    GSR-data/gsr_*.csv (Time, GSR Value) and
+    GSR-data/experiments/gsr_*.csv (with Phase/State columns)
 
 OUTPUT:
     - Cleaned CSV files in GSR-data/processed/
-    - Individual plots in GSR-data/plots/
+    - Individual plots in GSR-data/plots/ (with --plots)
+
+NOTE:
+    Input floats are parsed exactly (load_session(), gsr_streaming.py use
+    float_precision='round_trip'), where pandas' default parser can be off
+    by an ulp. Processed CSVs are therefore not bit-identical to those of
+    the original read_csv() pipeline: about 1 ulp in Time (s) and up to
+    ~1.5e-10 in the values on the committed data (GSR-data/processed/ was
+    regenerated with this code).
 """
 
 import pandas as pd
 import numpy as np
+import matplotlib
+matplotlib.use('Agg')  # Plots are only saved to PNG, never shown
 import matplotlib.pyplot as plt
-from scipy.interpolate import interp1d
-from scipy.signal import medfilt
+import argparse
+import io
 import os
+from concurrent.futures import ProcessPoolExecutor
+import time
+from contextlib import redirect_stdout
+from functools import partial
 from pathlib import Path
+from gsr_cache import ProcessingCache
+from gsr_cleaning import TARGET_SAMPLE_RATE, remove_spikes, resample_uniform
+from gsr_store import load_session
+from gsr_streaming import process_stream
 
 # Configuration
 INPUT_DIR = "GSR-data"
+EXPERIMENTS_DIR = "GSR-data/experiments"
 OUTPUT_DIR = "GSR-data/processed"
 PLOT_DIR = "GSR-data/plots"
-TARGET_SAMPLE_RATE = 5  # Hz
-MEDIAN_FILTER_SIZE = 5  # Use odd number for median filter
-RATE_CHANGE_THRESHOLD = 500  # Max allowed change between consecutive samples
+CACHE_MANIFEST = os.path.join(OUTPUT_DIR, ".cache.json")
 
 # Create output directories
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 os.makedirs(PLOT_DIR, exist_ok=True)
 
-def remove_spikes(times, values):
-    """
-    Remove spike artifacts using a two-pass approach:
-    1. Median filter to remove sharp spikes
-    2. Rate-of-change filter to catch remaining large jumps
-    
-    Returns: cleaned times and values arrays (preserves all time points)
-    """
-    times = np.array(times)
-    values = np.array(values)
-    
-    # Pass 1: Apply median filter to smooth out spikes
-    # This replaces spikes with the median of surrounding values
-    values_filtered = medfilt(values, kernel_size=MEDIAN_FILTER_SIZE)
-    
-    # Pass 2: Detect remaining spikes by rate of change
-    # GSR changes slowly, so large jumps are likely artifacts
-    spike_mask = np.zeros(len(values), dtype=bool)
-    
-    for i in range(1, len(values_filtered)):
-        rate_of_change = abs(values_filtered[i] - values_filtered[i-1])
-        if rate_of_change > RATE_CHANGE_THRESHOLD:
-            spike_mask[i] = True
-    
-    # For detected spikes, interpolate from neighbors
-    if np.any(spike_mask):
-        spike_indices = np.where(spike_mask)[0]
-        good_indices = np.where(~spike_mask)[0]
-        
-        if len(good_indices) > 1:
-            # Interpolate spike values from good values
-            interpolator = interp1d(good_indices, values_filtered[good_indices], 
-                                   kind='linear', fill_value='extrapolate')
-            values_filtered[spike_indices] = interpolator(spike_indices)
-    
-    num_spikes_removed = np.sum(spike_mask)
-    
-    return times, values_filtered, num_spikes_removed
-
-def resample_uniform(times, values, target_hz=5):
+def output_paths(filepath):
+    """(timestamp, processed CSV, plot PNG) for an input file"""
+    timestamp = os.path.basename(filepath).replace('gsr_', '').replace('.csv', '')
+    return (timestamp,
+            os.path.join(OUTPUT_DIR, f"processed_{timestamp}.csv"),
+            os.path.join(PLOT_DIR, f"plot_{timestamp}.png"))
+
+def process_file_chunked(filepath, chunk_size):
     """
-    Resample data to uniform sampling rate using linear interpolation.
-    
-    Returns: uniform time array and interpolated values
+    Process a single GSR data file in chunks (gsr_streaming.py): same CSV
+    output as process_file(), memory bounded by chunk_size.
     """
-    if len(times) < 2:
-        return times, values
-    
-    # Create uniform time array
-    start_time = times[0]
-    end_time = times[-1]
-    duration = end_time - start_time
+    timestamp, output_file, _ = output_paths(filepath)
     
-    num_samples = int(duration * target_hz) + 1
-    uniform_times = np.linspace(start_time, end_time, num_samples)
-    
-    # Interpolate values
-    interpolator = interp1d(times, values, kind='linear', 
-                           bounds_error=False, fill_value='extrapolate')
-    uniform_values = interpolator(uniform_times)
+    print(f"\nProcessing: {os.path.basename(filepath)} (chunks of {chunk_size} samples)")
+    stats = process_stream(filepath, output_file, chunk_size, TARGET_SAMPLE_RATE)
+    print(f"  Original: {stats['samples']} samples ({stats['spikes']} spikes smoothed)")
+    print(f"  After resampling to {TARGET_SAMPLE_RATE}Hz: {stats['final_samples']} samples")
+    print(f"  Saved to: {output_file}")
     
-    return uniform_times, uniform_values
+    return {
+        'timestamp': timestamp,
+        'original_samples': stats['samples'],
+        'spikes_smoothed': stats['spikes'],
+        'final_samples': stats['final_samples'],
+        'duration': stats['duration'],
+        'mean_gsr': stats['mean_gsr'],
+        'std_gsr': stats['std_gsr'],
+        'output_file': output_file
+    }
 
-def process_file(filepath):
+def process_file(filepath, chunk_size=None):
     """Process a single GSR data file"""
-    filename = os.path.basename(filepath)
-    timestamp = filename.replace('gsr_', '').replace('.csv', '')
+    if chunk_size:
+        return process_file_chunked(filepath, chunk_size)
     
-    print(f"\nProcessing: {filename}")
+    timestamp, output_file, _ = output_paths(filepath)
     
-    # Read data
-    df = pd.read_csv(filepath)
-    times = df['Time (s)'].values
-    values = df['GSR Value'].values
+    print(f"\nProcessing: {os.path.basename(filepath)}")
+    
+    # Read data (memory-mapped .gsrc if converted, see gsr_store.py)
+    data = load_session(filepath, columns=['Time (s)', 'GSR Value'])
+    times = data['Time (s)']
+    values = data['GSR Value']
     
     print(f"  Original: {len(values)} samples")
     
@@ -121,7 +120,6 @@ def process_file(filepath):
     print(f"  After resampling to {TARGET_SAMPLE_RATE}Hz: {len(values_uniform)} samples")
     
     # Step 3: Save processed data
-    output_file = os.path.join(OUTPUT_DIR, f"processed_{timestamp}.csv")
     processed_df = pd.DataFrame({
         'Time (s)': times_uniform,
         'GSR Value': values_uniform
@@ -129,7 +127,40 @@ def process_file(filepath):
     processed_df.to_csv(output_file, index=False)
     print(f"  Saved to: {output_file}")
     
-    # Step 4: Create plot
+    return {
+        'timestamp': timestamp,
+        'original_samples': len(values),
+        'spikes_smoothed': num_spikes,
+        'final_samples': len(values_uniform),
+        'duration': times_uniform[-1],
+        'mean_gsr': np.mean(values_uniform),
+        'std_gsr': np.std(values_uniform),
+        'output_file': output_file
+    }
+
+def plot_is_current(filepath):
+    """True if the plot exists and is newer than the recording and its output"""
+    _, output_file, plot_file = output_paths(filepath)
+    try:
+        return os.path.getmtime(plot_file) >= max(os.path.getmtime(filepath),
+                                                  os.path.getmtime(output_file))
+    except OSError:
+        return False
+
+def render_plot(filepath):
+    """Plot a processed file: raw vs spike-removed, then the resampled output"""
+    timestamp, output_file, plot_file = output_paths(filepath)
+    
+    print(f"\nPlotting: {os.path.basename(filepath)}")
+    
+    data = load_session(filepath, columns=['Time (s)', 'GSR Value'])
+    times = data['Time (s)']
+    values = data['GSR Value']
+    times_clean, values_clean, _ = remove_spikes(times, values)
+    processed = load_session(output_file)
+    times_uniform = processed['Time (s)']
+    values_uniform = processed['GSR Value']
+    
     fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(14, 10))
     
     # Plot 1: Original vs Spike-removed
@@ -161,62 +192,149 @@ def process_file(filepath):
     fig.tight_layout()
     
     # Save plot
-    plot_file = os.path.join(PLOT_DIR, f"plot_{timestamp}.png")
     plt.savefig(plot_file, dpi=150, bbox_inches='tight')
-    plt.close()
+    plt.close(fig)
     
     print(f"  Plot saved to: {plot_file}")
-    
-    return {
-        'timestamp': timestamp,
-        'original_samples': len(values),
-        'spikes_smoothed': num_spikes,
-        'final_samples': len(values_uniform),
-        'duration': times_uniform[-1],
-        'mean_gsr': np.mean(values_uniform),
-        'std_gsr': np.std(values_uniform)
-    }
+    return plot_file
+
+def run_captured(func, filepath, **kwargs):
+    """
+    Run func(filepath) with its output captured, so logs from parallel
+    workers don't interleave, and a failure only affects its own file.
+
+    Returns: (result or None, log text, seconds)
+    """
+    log = io.StringIO()
+    start = time.perf_counter()
+    with redirect_stdout(log):
+        try:
+            result = func(filepath, **kwargs)
+        except Exception as e:
+            print(f"  ERROR processing {Path(filepath).name}: {e}")
+            result = None
+    return result, log.getvalue(), time.perf_counter() - start
+
+def run_stage(task, files, workers):
+    """task(file) for each file, yielded in input order; in a process pool if workers > 1"""
+    if workers <= 1:
+        yield from map(task, files)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        yield from pool.map(task, files)
+
+def find_input_files():
+    """Legacy recordings, then experiment recordings, each sorted by name"""
+    return (sorted(Path(INPUT_DIR).glob("gsr_*.csv")) +
+            sorted(Path(EXPERIMENTS_DIR).glob("gsr_*.csv")))
 
 def main():
     """Process all GSR files in the directory"""
+    parser = argparse.ArgumentParser(description="Clean and resample GSR recordings")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="Worker processes (1 = serial, default: CPU count)")
+    parser.add_argument('--force', action='store_true',
+                        help="Reprocess every file (and redraw every plot), even if cached")
+    parser.add_argument('--chunk-size', type=int, default=None,
+                        help="Stream each file in chunks of this many samples")
+    parser.add_argument('--plots', action='store_true',
+                        help="Render plots for inspection after processing")
+    args = parser.parse_args()
+    
     print("=" * 60)
     print("GSR Data Processing")
     print("=" * 60)
     
     # Find all GSR CSV files
-    input_files = sorted(Path(INPUT_DIR).glob("gsr_*.csv"))
+    input_files = find_input_files()
+    
+    # Skip files whose contents and pipeline parameters are unchanged
+    cache = ProcessingCache(CACHE_MANIFEST, reuse=not args.force)
+    cached = {filepath: cache.lookup(filepath) for filepath in input_files}
+    todo = [filepath for filepath in input_files if cached[filepath] is None]
+    workers = max(1, min(args.workers, len(todo)))
     
-    print(f"\nFound {len(input_files)} files to process")
+    print(f"\nFound {len(input_files)} files, {len(todo)} to process "
+          f"({workers} worker{'s' if workers > 1 else ''})")
     
-    # Process each file
+    # Process each file; results and logs come back in input order
     results = []
+    processed = []
+    failed = []
+    compute_time = 0.0
+    stage_start = time.perf_counter()
+    outcomes = run_stage(partial(run_captured, process_file, chunk_size=args.chunk_size),
+                         todo, workers)
     for filepath in input_files:
-        try:
-            result = process_file(filepath)
+        result = cached[filepath]
+        if result is not None:
+            print(f"\nUnchanged: {filepath.name} (cached)")
             results.append(result)
-        except Exception as e:
-            print(f"  ERROR processing {filepath.name}: {e}")
+            processed.append(filepath)
+            continue
+        result, log, seconds = next(outcomes)
+        compute_time += seconds
+        print(log, end='')
+        if result is None:
+            failed.append(filepath.name)
+        else:
+            cache.store(filepath, [result['output_file']], result)
+            results.append(result)
+            processed.append(filepath)
+    compute_wall = time.perf_counter() - stage_start
+    cache.prune(input_files)
+    cache.save()
+    
+    # Plots: a separate stage, only for missing or outdated PNGs
+    to_plot = []
+    plot_time = plot_wall = 0.0
+    if args.plots:
+        to_plot = [f for f in processed if args.force or not plot_is_current(f)]
+        plot_workers = max(1, min(args.workers, len(to_plot)))
+        print(f"\nRendering {len(to_plot)} plots, {len(processed) - len(to_plot)} up to date "
+              f"({plot_workers} worker{'s' if plot_workers > 1 else ''})")
+        stage_start = time.perf_counter()
+        for filepath, (plot_file, log, seconds) in zip(
+                to_plot, run_stage(partial(run_captured, render_plot), to_plot, plot_workers)):
+            plot_time += seconds
+            print(log, end='')
+            if plot_file is None:
+                failed.append(f"{filepath.name} (plot)")
+        plot_wall = time.perf_counter() - stage_start
     
     # Create summary
     print("\n" + "=" * 60)
     print("PROCESSING SUMMARY")
     print("=" * 60)
-    print(f"\nSuccessfully processed {len(results)} files")
+    print(f"\nSuccessfully processed {len(results)} files ({cache.report()})")
+    if failed:
+        print(f"Failed: {len(failed)} ({', '.join(failed)})")
     print(f"\nProcessed files saved to: {os.path.abspath(OUTPUT_DIR)}")
-    print(f"Plots saved to: {os.path.abspath(PLOT_DIR)}")
-    
-    # Summary table
-    print("\n" + "-" * 80)
-    print(f"{'Timestamp':<17} {'Duration':<10} {'Samples':<8} {'Spikes':<8} {'Mean GSR':<10}")
-    print("-" * 80)
+    if args.plots:
+        print(f"Plots saved to: {os.path.abspath(PLOT_DIR)}")
+    
+    # Summary table (experiment names are longer than plain timestamps)
+    width = max([17] + [len(r['timestamp']) for r in results])
+    print("\n" + "-" * (width + 63))
+    print(f"{'Timestamp':<{width}} {'Duration':<10} {'Samples':<8} {'Spikes':<8} {'Mean GSR':<10}")
+    print("-" * (width + 63))
     for r in results:
-        print(f"{r['timestamp']:<17} {r['duration']:>8.1f}s  {r['final_samples']:>6}   "
+        print(f"{r['timestamp']:<{width}} {r['duration']:>8.1f}s  {r['final_samples']:>6}   "
               f"{r['spikes_smoothed']:>6}   {r['mean_gsr']:>8.1f}")
-    print("-" * 80)
+    print("-" * (width + 63))
+    
+    # Where the time went (per-file seconds summed over workers, and wall clock)
+    print(f"\nTiming: processing {len(todo)} files {compute_time:.2f}s (wall {compute_wall:.2f}s)", end='')
+    if args.plots:
+        print(f", plotting {len(to_plot)} files {plot_time:.2f}s (wall {plot_wall:.2f}s)")
+    else:
+        print(", plotting skipped (--plots)")
     
     print("\n✓ Processing complete!")
-    print(f"\nNext step: Review plots in '{PLOT_DIR}' to identify experiments\n")
+    if args.plots:
+        print(f"\nNext step: Review plots in '{PLOT_DIR}' to identify experiments\n")
+    else:
+        print(f"\nNext step: Run with --plots to review recordings in '{PLOT_DIR}'\n")
 
 if __name__ == "__main__":
     main()
-
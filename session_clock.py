@@ -0,0 +1,216 @@
+"""
+Shared High-Resolution Session Clock for the Slot Machine and GSR Recorder
+
+PURPOSE:
+    Spins (Slot-Machine with gui/app_gui.py) and GSR samples
+    (integrated_code.py) are stamped in two processes. time.time() can be
+    stepped or slewed by NTP mid-session, and the recording CSV only keeps
+    seconds relative to its start, so spin-to-physiology alignment was good
+    to about a second. Both programs now stamp everything with now():
+    - anchor: one (wall clock, perf_counter) pair captured at import,
+      retried until both reads fall within a few microseconds
+    - now() = anchor wall time + perf_counter elapsed since the anchor:
+      Unix seconds, monotonic, sub-microsecond resolution
+    A UDP handshake on localhost measures what is left - the offset between
+    the two programs' anchors - NTP-style from the fastest of a few round
+    trips. The recorder answers (ClockServer), the slot machine asks at
+    session start (handshake()).
+
+CLOCK FILES:
+    <session>_clock.json is written next to each recording / slot log:
+        anchor       wall_ns, perf_ns, uncertainty_ns, pid
+        start_time   recording start on this clock (recorder only)
+        handshake    offset_s, rtt_s: recorder clock = slot clock + offset_s
+                     (slot machine only; null if no recorder was running)
+        handshakes   slot-machine handshakes served so far (recorder only)
+    gsr_catalog.py and gsr_epochs.py use them when present, and fall back to
+    filename timestamps for older sessions.
+
+USAGE:
+    from session_clock import now, ClockServer, handshake
+    server = ClockServer(); server.start()         # GSR recorder
+    sync = handshake()                             # slot machine
+    t = now()
+
+    python session_clock.py            # show this process's anchor, ask a running recorder
+    python session_clock.py --serve    # stand-alone clock server
+"""
+
+import argparse
+import json
+import os
+import socket
+import struct
+import threading
+import time
+
+SYNC_HOST = '127.0.0.1'
+SYNC_PORT = 47800
+SYNC_ROUNDS = 8          # Round trips per handshake; the fastest one is used
+SYNC_TIMEOUT = 0.2       # Seconds to wait for each reply
+ANCHOR_TRIES = 50
+SYNC_MESSAGE = struct.Struct('<4sId')  # magic, round, server time (0 in requests)
+SYNC_MAGIC = b'CLK1'
+
+
+class SessionClock:
+    """Wall-clock anchored perf_counter: monotonic Unix seconds"""
+
+    def __init__(self):
+        self.capture()
+
+    def capture(self, tries=ANCHOR_TRIES):
+        """Take the tightest (wall, perf_counter) pair out of a few reads"""
+        best = None
+        for _ in range(tries):
+            before = time.perf_counter_ns()
+            wall = time.time_ns()
+            after = time.perf_counter_ns()
+            if best is None or after - before < best[2]:
+                best = (wall, (before + after) // 2, after - before)
+        self.wall_ns, self.perf_ns, self.uncertainty_ns = best
+
+    def now(self):
+        """Current time in Unix seconds on this clock"""
+        return (self.wall_ns + time.perf_counter_ns() - self.perf_ns) / 1e9
+
+    def anchor(self):
+        return {'wall_ns': self.wall_ns, 'perf_ns': self.perf_ns,
+                'uncertainty_ns': self.uncertainty_ns, 'pid': os.getpid()}
+
+
+clock = SessionClock()
+now = clock.now
+
+
+class ClockServer(threading.Thread):
+    """Answers handshake requests with this process's now()"""
+
+    def __init__(self, host=SYNC_HOST, port=SYNC_PORT):
+        super().__init__(daemon=True)
+        self.handshakes = []  # {'peer', 'time'} per handshake served
+        self.error = None
+        self._stop_event = threading.Event()
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            self._sock.bind((host, port))
+        except OSError as e:
+            # Another recorder already serves; spins still get stamped
+            self.error = e
+        self._sock.settimeout(0.5)
+
+    def run(self):
+        if self.error is not None:
+            return
+        while not self._stop_event.is_set():
+            try:
+                data, peer = self._sock.recvfrom(SYNC_MESSAGE.size)
+            except socket.timeout:
+                continue
+            except OSError as e:
+                self.error = e
+                break
+            received = now()
+            if len(data) != SYNC_MESSAGE.size:
+                continue
+            magic, round_number, _ = SYNC_MESSAGE.unpack(data)
+            if magic != SYNC_MAGIC:
+                continue
+            self._sock.sendto(SYNC_MESSAGE.pack(SYNC_MAGIC, round_number, received), peer)
+            if round_number == 0:
+                self.handshakes.append({'peer': f"{peer[0]}:{peer[1]}", 'time': received})
+
+    def stop(self):
+        self._stop_event.set()
+        if self.is_alive():
+            self.join()
+        self._sock.close()
+
+
+def handshake(host=SYNC_HOST, port=SYNC_PORT, rounds=SYNC_ROUNDS, timeout=SYNC_TIMEOUT):
+    """
+    Offset of the clock server from this process: server time = local
+    now() + offset_s. Returns {'offset_s', 'rtt_s', 'rounds'} from the
+    fastest round trip, or None if no server answers.
+    """
+    best = None
+    answered = 0
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.settimeout(timeout)
+        for round_number in range(rounds):
+            sent = now()
+            try:
+                sock.sendto(SYNC_MESSAGE.pack(SYNC_MAGIC, round_number, 0.0), (host, port))
+                while True:
+                    data, _ = sock.recvfrom(SYNC_MESSAGE.size)
+                    received = now()
+                    magic, reply_round, server_time = SYNC_MESSAGE.unpack(data)
+                    if magic == SYNC_MAGIC and reply_round == round_number:
+                        break
+            except (socket.timeout, ConnectionError, struct.error):
+                if answered == 0:
+                    return None  # Nobody listening - don't wait for every round
+                continue
+            answered += 1
+            rtt = received - sent
+            if best is None or rtt < best[1]:
+                best = (server_time - (sent + received) / 2, rtt)
+    return {'offset_s': best[0], 'rtt_s': best[1], 'rounds': answered}
+
+
+def clock_path(csv_path):
+    """<session>_clock.json next to a session CSV"""
+    return str(csv_path)[:-len('.csv')] + '_clock.json'
+
+
+def write_clock_file(csv_path, **fields):
+    """Write this process's anchor plus fields next to a session CSV"""
+    path = clock_path(csv_path)
+    with open(path, 'w') as f:
+        json.dump(dict(anchor=clock.anchor(), **fields), f, indent=1)
+    return path
+
+
+def read_clock_file(csv_path):
+    """Clock file of a session CSV as a dict, or None for older sessions"""
+    try:
+        with open(clock_path(csv_path)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Session clock anchor and handshake")
+    parser.add_argument('--serve', action='store_true', help="Run a clock server until Ctrl+C")
+    parser.add_argument('--port', type=int, default=SYNC_PORT)
+    args = parser.parse_args()
+
+    anchor = clock.anchor()
+    print(f"Anchor: wall {anchor['wall_ns'] / 1e9:.6f} s, "
+          f"captured within {anchor['uncertainty_ns'] / 1000:.1f} µs")
+    if args.serve:
+        server = ClockServer(port=args.port)
+        if server.error is not None:
+            print(f"Cannot serve on port {args.port}: {server.error}")
+            return
+        server.start()
+        print(f"Serving on {SYNC_HOST}:{args.port} (Ctrl+C to stop)")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            server.stop()
+            print(f"Served {len(server.handshakes)} handshakes")
+        return
+
+    sync = handshake(port=args.port)
+    if sync is None:
+        print(f"No clock server on {SYNC_HOST}:{args.port}")
+    else:
+        print(f"Server offset {sync['offset_s'] * 1000:+.3f} ms, "
+              f"round trip {sync['rtt_s'] * 1e6:.0f} µs ({sync['rounds']} rounds)")
+
+
+if __name__ == "__main__":
+    main()
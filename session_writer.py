@@ -0,0 +1,299 @@
+"""
+Streaming, Crash-Safe GSR Session Writer
+
+PURPOSE:
+    Recordings used to live in memory until STOP was pressed, so a crash, a
+    USB unplug or a killed process lost the whole participant session.
+    SessionWriter appends samples to disk on its own thread while the
+    session runs:
+    1. <name>.bin - compact binary sidecar: header, fixed 32-byte records,
+       footer written only on a clean close
+    2. <name>.csv - the usual CSV, streamed as samples arrive and rewritten
+       from the .bin on close with the final clock drift estimate
+    Both files are flushed every chunk and fsync'd every few seconds.
+
+BINARY LAYOUT (little-endian):
+    header:  b"GSRBIN1\\0", u32 metadata length, metadata JSON
+             (user_id, state, start_time, phases, states)
+    records: RECORD_DTYPE (arrival f8, value u2, seq i8, device_ms i8,
+             gap u4, phase u1, state u1) - phase/state index the metadata lists
+    footer:  32 bytes - b"GSREND1\\0", u64 record count, u64 dropped, padding
+
+USAGE:
+    writer = SessionWriter("GSR-data/experiments/gsr_P001_StateA_....csv",
+                           meta={'user_id': 'P001', 'state': 'A', ...},
+                           clock=reader.clock, start_time=start_time)
+    writer.start()
+    writer.write(columns)        # dict of arrays, from the GUI thread
+    writer.close()               # footer + final CSV
+
+    python session_writer.py GSR-data/experiments   # recover unfinished files
+
+RECOVERY:
+    A .bin without a footer belongs to a session that never closed cleanly.
+    recover_session() drops a trailing partial record, rebuilds the clock
+    estimate from the records, rewrites the CSV and adds the footer.
+"""
+
+import csv
+import glob
+import json
+import os
+import queue
+import struct
+import sys
+import threading
+import time
+
+import numpy as np
+
+from gsr_reader import NO_DEVICE_TIME
+from gsr_timebase import ClockSync
+
+MAGIC = b"GSRBIN1\0"
+FOOTER_MAGIC = b"GSREND1\0"
+RECORD_DTYPE = np.dtype([('arrival', '<f8'), ('value', '<u2'), ('seq', '<i8'),
+                         ('device_ms', '<i8'), ('gap', '<u4'),
+                         ('phase', 'u1'), ('state', 'u1')])
+FOOTER = struct.Struct('<8sQQ8x')  # Same size as one record
+CSV_HEADER = ['Time (s)', 'Phase', 'State', 'GSR Value',
+              'Device Time (s)', 'Seq', 'Gap']
+
+assert FOOTER.size == RECORD_DTYPE.itemsize
+
+
+def csv_rows(records, meta, clock, first_ms):
+    """CSV rows for records; device times are mapped with clock"""
+    device_ms = records['device_ms']
+    has_device = device_ms != NO_DEVICE_TIME
+    times = np.where(has_device, clock.to_host(device_ms),
+                     records['arrival']) - meta['start_time']
+    device_times = (device_ms - first_ms) / 1000.0
+    phases, states = meta['phases'], meta['states']
+    for t, phase, state, val, device_t, seq, gap, has_t in zip(
+            times.tolist(), records['phase'].tolist(), records['state'].tolist(),
+            records['value'].tolist(), device_times.tolist(),
+            records['seq'].tolist(), records['gap'].tolist(), has_device.tolist()):
+        yield [t, phases[phase], states[state], val,
+               device_t if has_t else '', seq if has_t else '', gap]
+
+
+def first_device_ms(records):
+    """Device time of the first record that has one (0 if none do)"""
+    has_device = records['device_ms'] != NO_DEVICE_TIME
+    return int(records['device_ms'][has_device][0]) if has_device.any() else 0
+
+
+def write_csv(path, records, meta, clock):
+    """Write a complete CSV atomically (temp file + rename)"""
+    tmp = path + '.tmp'
+    with open(tmp, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(CSV_HEADER)
+        writer.writerows(csv_rows(records, meta, clock, first_device_ms(records)))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def records_offset(data, bin_path=''):
+    """Byte offset of the first record, from the start of a .bin file"""
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{bin_path}: not a GSR session file")
+    meta_len, = struct.unpack_from('<I', data, len(MAGIC))
+    return len(MAGIC) + 4 + meta_len
+
+
+def read_session(bin_path):
+    """
+    Read a .bin sidecar.
+
+    Returns: (meta, records, footer) where footer is None for a session
+    that was not closed cleanly. A trailing partial record is ignored.
+    """
+    with open(bin_path, 'rb') as f:
+        data = f.read()
+    offset = records_offset(data, bin_path)
+    meta = json.loads(data[len(MAGIC) + 4:offset].decode('utf-8'))
+
+    body = data[offset:]
+    n = len(body) // RECORD_DTYPE.itemsize
+    footer = None
+    if n and len(body) % RECORD_DTYPE.itemsize == 0:
+        magic, count, dropped = FOOTER.unpack_from(body, (n - 1) * RECORD_DTYPE.itemsize)
+        if magic == FOOTER_MAGIC and count == n - 1:
+            footer = {'samples': count, 'dropped': dropped}
+            n -= 1
+    records = np.frombuffer(body, RECORD_DTYPE, count=n)
+    return meta, records, footer
+
+
+def read_meta(bin_path):
+    """Metadata header of a .bin sidecar, without reading its records"""
+    with open(bin_path, 'rb') as f:
+        head = f.read(len(MAGIC) + 4)
+        if len(head) < len(MAGIC) + 4:
+            raise ValueError(f"{bin_path}: not a GSR session file")
+        offset = records_offset(head, bin_path)
+        return json.loads(f.read(offset - len(head)).decode('utf-8'))
+
+
+def clock_from_records(records):
+    """Rebuild the device clock estimate from recorded arrival times"""
+    clock = ClockSync()
+    has_device = records['device_ms'] != NO_DEVICE_TIME
+    for device_ms, arrival in zip(records['device_ms'][has_device].tolist(),
+                                  records['arrival'][has_device].tolist()):
+        clock.add(device_ms, arrival)
+    return clock
+
+
+def recover_session(bin_path):
+    """
+    Finish a session that was not closed cleanly: truncate a partial
+    record, rewrite the CSV and append the footer. Returns the record count.
+    """
+    meta, records, footer = read_session(bin_path)
+    if footer is not None:
+        return footer['samples']
+
+    with open(bin_path, 'rb') as f:
+        offset = records_offset(f.read(len(MAGIC) + 4), bin_path)
+    write_csv(bin_path[:-len('.bin')] + '.csv', records, meta, clock_from_records(records))
+
+    dropped = int(records['gap'].sum())
+    with open(bin_path, 'r+b') as f:
+        f.truncate(offset + len(records) * RECORD_DTYPE.itemsize)
+        f.seek(0, os.SEEK_END)
+        f.write(FOOTER.pack(FOOTER_MAGIC, len(records), dropped))
+        f.flush()
+        os.fsync(f.fileno())
+    return len(records)
+
+
+def find_unfinished(folder):
+    """.bin sidecars in folder whose session never closed cleanly"""
+    unfinished = []
+    for path in sorted(glob.glob(os.path.join(folder, '*.bin'))):
+        try:
+            if read_session(path)[2] is None:
+                unfinished.append(path)
+        except (OSError, ValueError, struct.error):
+            continue
+    return unfinished
+
+
+class SessionWriter(threading.Thread):
+    """Appends recorded samples to a CSV and a binary sidecar on a thread"""
+
+    def __init__(self, csv_path, meta, clock, start_time, fsync_interval=2.0):
+        super().__init__(daemon=True)
+        self.csv_path = csv_path
+        self.bin_path = csv_path[:-len('.csv')] + '.bin'
+        self.meta = dict(meta, start_time=start_time)
+        self.clock = clock
+        self.fsync_interval = fsync_interval
+        self.samples = 0
+        self.dropped = 0
+        self.error = None
+        self._first_ms = None
+        self._queue = queue.Queue()
+        self._last_fsync = time.monotonic()
+
+        # Open here so a bad path fails on the GUI thread, not silently later
+        self._bin = open(self.bin_path, 'wb')
+        meta_bytes = json.dumps(self.meta).encode('utf-8')
+        self._bin.write(MAGIC + struct.pack('<I', len(meta_bytes)) + meta_bytes)
+        self._csv_file = open(self.csv_path, 'w', newline='')
+        self._csv = csv.writer(self._csv_file)
+        self._csv.writerow(CSV_HEADER)
+        self._sync_files()
+
+    def write(self, columns):
+        """Queue a batch of samples (dict of equal-length arrays)"""
+        self._queue.put(columns)
+
+    def run(self):
+        while True:
+            item = self._queue.get()
+            batch = [item]
+            # Take everything already queued so one chunk is one write
+            while item is not None:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                batch.append(item)
+            done = batch[-1] is None
+            batch = [b for b in batch if b is not None]
+            try:
+                if batch:
+                    self._append(batch)
+            except Exception as e:
+                # Disk full, USB drive removed... keep the GUI running
+                self.error = e
+                print(f"⚠️ Session writer failed: {e}")
+                return
+            if done:
+                return
+
+    def _append(self, batch):
+        n = sum(len(columns['value']) for columns in batch)
+        records = np.empty(n, RECORD_DTYPE)
+        for name in RECORD_DTYPE.names:
+            records[name] = np.concatenate([columns[name] for columns in batch])
+
+        if self._first_ms is None and (records['device_ms'] != NO_DEVICE_TIME).any():
+            self._first_ms = first_device_ms(records)
+
+        self._bin.write(records.tobytes())
+        self._csv.writerows(csv_rows(records, self.meta, self.clock, self._first_ms or 0))
+        self._bin.flush()
+        self._csv_file.flush()
+        self.samples += n
+        self.dropped += int(records['gap'].sum())
+
+        if time.monotonic() - self._last_fsync >= self.fsync_interval:
+            self._sync_files()
+
+    def _sync_files(self):
+        for f in (self._bin, self._csv_file):
+            f.flush()
+            os.fsync(f.fileno())
+        self._last_fsync = time.monotonic()
+
+    def close(self):
+        """
+        Write everything queued, add the footer and rewrite the CSV with the
+        final clock estimate. Returns the number of samples recorded.
+        """
+        self._queue.put(None)
+        if self.is_alive():
+            self.join()
+        if self.error is not None:
+            # Leave the .bin without a footer so it can be recovered later
+            self._bin.close()
+            self._csv_file.close()
+            return self.samples
+
+        self._bin.write(FOOTER.pack(FOOTER_MAGIC, self.samples, self.dropped))
+        self._sync_files()
+        self._bin.close()
+        self._csv_file.close()
+
+        meta, records, _ = read_session(self.bin_path)
+        write_csv(self.csv_path, records, meta, self.clock)
+        return self.samples
+
+
+def main():
+    folder = sys.argv[1] if len(sys.argv) > 1 else 'GSR-data/experiments'
+    unfinished = find_unfinished(folder)
+    if not unfinished:
+        print(f"No unfinished sessions in {folder}")
+    for path in unfinished:
+        print(f"Recovered {recover_session(path)} samples: {path[:-len('.bin')]}.csv")
+
+
+if __name__ == "__main__":
+    main()
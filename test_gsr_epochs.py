@@ -0,0 +1,72 @@
+"""
+Alignment of legacy GSR recordings with slot-machine sessions
+
+Uses the committed 2025-10-30 data: gsr_20251030_163147.csv was named when
+it was saved (204 s long, so it covers 16:28:23-16:31:47) and slot session
+20251030_162044 spins from 16:28:28 to 16:31:17. The files were named in
+the recording machine's local time, which matches UTC on their Unix
+timestamps.
+
+USAGE:
+    python -m pytest test_gsr_epochs.py
+"""
+
+import os
+import time
+
+import pytest
+
+from gsr_catalog import describe_gsr, open_catalog, parse_filename
+from gsr_epochs import align_sessions, study_epochs
+
+REPO = os.path.dirname(os.path.abspath(__file__))
+GSR_FILE = "GSR-data/gsr_20251030_163147.csv"
+SLOT_SESSION = "20251030_162044"
+
+
+@pytest.fixture
+def repo_catalog(tmp_path, monkeypatch):
+    monkeypatch.setenv('TZ', 'UTC')
+    time.tzset()
+    monkeypatch.chdir(REPO)
+    conn = open_catalog(str(tmp_path / 'catalog.sqlite'))
+    yield conn
+    conn.close()
+    monkeypatch.undo()
+    time.tzset()
+
+
+def test_legacy_filename_is_end_time(repo_catalog):
+    info, _ = describe_gsr(GSR_FILE, parse_filename('gsr', os.path.basename(GSR_FILE)))
+    end = time.mktime(time.strptime('20251030_163147', '%Y%m%d_%H%M%S'))
+    assert info['duration_s'] == pytest.approx(204, abs=1)
+    assert info['started_at'] == pytest.approx(end - info['duration_s'], abs=1e-3)
+
+
+def test_legacy_pair_aligns(repo_catalog):
+    pairs = {slot['timestamp']: (spins, gsr, shared)
+             for slot, spins, gsr, shared in align_sessions(repo_catalog)}
+    spins, gsr, shared = pairs[SLOT_SESSION]
+    assert gsr['timestamp'] == '20251030_163147'
+    # Every spin falls inside the recording
+    assert gsr['started_at'] <= spins['timestamp'].min()
+    assert spins['timestamp'].max() <= gsr['started_at'] + gsr['duration_s']
+    assert shared > 180
+
+    lags, epochs, events = study_epochs(repo_catalog, participant='001')
+    assert (events['slot_session'] == SLOT_SESSION).sum() > 0
+
+
+def test_streamed_filename_is_start_time(tmp_path):
+    from gsr_timebase import ClockSync
+    from session_writer import SessionWriter
+
+    start = 1761841703.25
+    csv_path = str(tmp_path / 'gsr_P001_StateA_20251030_162823.csv')
+    writer = SessionWriter(csv_path, meta={'user_id': 'P001', 'state': 'A',
+                                           'phases': ['Baseline'], 'states': ['A']},
+                           clock=ClockSync(), start_time=start)
+    writer.start()
+    writer.close()
+    info, _ = describe_gsr(csv_path, parse_filename('experiment', os.path.basename(csv_path)))
+    assert info['started_at'] == start